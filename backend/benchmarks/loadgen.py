@@ -0,0 +1,209 @@
+"""
+Gerador de carga assíncrono para a API (httpx + asyncio).
+
+Roda cenários ponderados contra um backend já populado (python -m benchmarks.seed),
+mede latência por endpoint e compara com os limites de thresholds.json. Sai com
+código 1 quando algum limite é violado, para uso em CI.
+
+    python -m benchmarks.loadgen --base-url http://localhost:8000 --duration 30 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+
+from benchmarks.seed import BENCH_ADMIN_EMAIL, BENCH_PASSWORD
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name: str, elapsed_ms: float, ok: bool):
+        self.latencies[name].append(elapsed_ms)
+        if not ok:
+            self.errors[name] += 1
+
+    def summary(self, duration_s: float) -> dict:
+        result = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            result[name] = {
+                "requests": len(values),
+                "rps": len(values) / duration_s,
+                "error_rate": self.errors[name] / len(values),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+            }
+        return result
+
+
+class Scenarios:
+    """Cada cenário faz uma requisição e devolve a resposta; ENDPOINTS dá a chave de cada um nas estatísticas."""
+
+    ENDPOINTS = {
+        "login": "POST /auth/login",
+        "create_delivery": "POST /create_delivery",
+        "update_location": "PUT /vehicle_location/{id}",
+        "list_vehicles": "GET /vehicles",
+        "list_products": "GET /products/",
+    }
+
+    def __init__(self, client: httpx.AsyncClient, token: str, ids: dict, rng: random.Random):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.ids = ids
+        self.rng = rng
+
+    async def login(self):
+        response = await self.client.post("/auth/login", params={"email": BENCH_ADMIN_EMAIL, "password": BENCH_PASSWORD})
+        return response
+
+    async def create_delivery(self):
+        response = await self.client.post("/create_delivery", headers=self.headers, json={
+            "fk_id_produto": self.rng.choice(self.ids["products"]),
+            "fk_id_ponto_entrega": self.rng.choice(self.ids["points"]),
+            "quantidade": 1,
+        })
+        return response
+
+    async def update_location(self):
+        response = await self.client.put(f"/vehicle_location/{self.rng.choice(self.ids['locations'])}", headers=self.headers, json={
+            "latitude": -23.55 + self.rng.uniform(-0.1, 0.1),
+            "longitude": -46.63 + self.rng.uniform(-0.1, 0.1),
+            "data_hora": datetime.utcnow().isoformat(),
+        })
+        return response
+
+    async def list_vehicles(self):
+        response = await self.client.get("/vehicles", headers=self.headers)
+        return response
+
+    async def list_products(self):
+        response = await self.client.get("/products/", headers=self.headers, params={"limit": 50})
+        return response
+
+
+# Peso relativo de cada cenário na carga
+MIX = {
+    "update_location": 50,
+    "list_vehicles": 20,
+    "list_products": 15,
+    "create_delivery": 10,
+    "login": 5,
+}
+
+
+async def _fetch_ids(client: httpx.AsyncClient, headers: dict) -> dict:
+    # Ids válidos para montar as requisições (a partir dos dados do seed)
+    products = (await client.get("/products/", headers=headers, params={"limit": 1000})).json()
+    points = (await client.get("/distribution_points/", headers=headers, params={"limit": 1000})).json()
+    vehicles = (await client.get("/vehicles", headers=headers)).json()
+    return {
+        "products": [p["id"] for p in products],
+        "points": [p["id"] for p in points],
+        "locations": [v["fk_id_localizacao"] for v in vehicles if v.get("fk_id_localizacao")],
+    }
+
+
+async def run(base_url: str, duration: float, concurrency: int, seed: int, mix: dict) -> dict:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        login = await client.post("/auth/login", params={"email": BENCH_ADMIN_EMAIL, "password": BENCH_PASSWORD})
+        login.raise_for_status()
+        token = login.json()["access_token"]
+        ids = await _fetch_ids(client, {"Authorization": f"Bearer {token}"})
+
+        names, weights = zip(*mix.items())
+        deadline = time.perf_counter() + duration
+
+        async def worker(worker_id: int):
+            scenarios = Scenarios(client, token, ids, random.Random(seed + worker_id))
+            while time.perf_counter() < deadline:
+                scenario = scenarios.rng.choices(names, weights)[0]
+                # Mesma chave para respostas e falhas de transporte: ambas contam nos limites
+                name = Scenarios.ENDPOINTS[scenario]
+                start = time.perf_counter()
+                try:
+                    response = await getattr(scenarios, scenario)()
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                stats.record(name, (time.perf_counter() - start) * 1000, ok)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return stats.summary(time.perf_counter() - started)
+
+
+def check_thresholds(summary: dict, thresholds: dict) -> list:
+    """Retorna a lista de violações (vazia quando tudo está dentro dos limites)."""
+    failures = []
+    for name, limits in thresholds.items():
+        result = summary.get(name)
+        if result is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "error_rate"):
+            if metric in limits and result[metric] > limits[metric]:
+                failures.append(f"{name}: {metric} {result[metric]:.2f} > {limits[metric]}")
+        if "min_rps" in limits and result["rps"] < limits["min_rps"]:
+            failures.append(f"{name}: rps {result['rps']:.1f} < {limits['min_rps']}")
+    return failures
+
+
+def print_summary(summary: dict):
+    print(f"{'endpoint':32} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, r in summary.items():
+        print(f"{name:32} {r['requests']:7d} {r['rps']:8.1f} {r['error_rate'] * 100:6.2f} "
+              f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API de entregas")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=30, help="Duração em segundos")
+    parser.add_argument("--concurrency", type=int, default=20, help="Clientes simultâneos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", default=None, help='Pesos em JSON, ex: {"login": 1}')
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    parser.add_argument("--output", default=None, help="Salva o resumo em JSON")
+    args = parser.parse_args()
+
+    mix = json.loads(args.mix) if args.mix else MIX
+    summary = asyncio.run(run(args.base_url, args.duration, args.concurrency, args.seed, mix))
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    with open(args.thresholds) as f:
+        failures = check_thresholds(summary, json.load(f))
+    for failure in failures:
+        print(f"REGRESSÃO: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
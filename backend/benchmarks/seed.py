@@ -0,0 +1,146 @@
+"""
+Dados sintéticos e reprodutíveis (mesma semente -> mesmos dados) para os benchmarks.
+
+    python -m benchmarks.seed --clients 5000 --vehicles 2000 --seed 42
+"""
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass, field
+from datetime import date
+from passlib.context import CryptContext
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from services import inventory
+from services.add_to_latlong import _offline_lat_long
+
+BENCH_PASSWORD = "bench"
+BENCH_ADMIN_EMAIL = "bench-admin@bench.local"
+STREETS = ["Rua Augusta", "Av. Paulista", "Rua da Consolação", "Rua Vergueiro", "Av. Rebouças", "Rua Oscar Freire"]
+DISTRICTS = ["Centro", "Pinheiros", "Moema", "Mooca", "Lapa", "Santana", "Butantã", "Ipiranga"]
+WORDS = ["Caixa", "Pacote", "Palete", "Geladeira", "Fogão", "Notebook", "Cadeira", "Mesa", "Livro", "Bicicleta"]
+
+
+@dataclass
+class SeedResult:
+    admin_user_id: int = 0
+    client_ids: list = field(default_factory=list)
+    product_ids: list = field(default_factory=list)
+    point_ids: list = field(default_factory=list)
+    vehicle_ids: list = field(default_factory=list)
+    location_ids: list = field(default_factory=list)
+    driver_user_ids: list = field(default_factory=list)
+
+
+def _address(rng: random.Random):
+    return rng.choice(STREETS), rng.choice(DISTRICTS), rng.randint(1, 3000)
+
+
+async def _bulk(db: AsyncSession, model, rows):
+    # INSERT em lotes com RETURNING id (uma ida ao banco por lote)
+    ids = []
+    for i in range(0, len(rows), 1000):
+        result = await db.execute(insert(model).returning(model.id), rows[i:i + 1000])
+        ids.extend(result.scalars().all())
+    return ids
+
+
+async def reset(db: AsyncSession):
+    tables = ", ".join(f'"{table.name}"' for table in reversed(models.Base.metadata.sorted_tables))
+    await db.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+async def seed(
+    db: AsyncSession,
+    clients: int = 1000,
+    products_per_client: int = 3,
+    points: int = 50,
+    vehicles: int = 500,
+    seed: int = 42,
+) -> SeedResult:
+    rng = random.Random(seed)
+    # Um único hash para todos os usuários sintéticos: o bcrypt não entra no tempo de seed
+    password_hash = CryptContext(schemes=["bcrypt"]).hash(BENCH_PASSWORD)
+    result = SeedResult()
+
+    def user(email, **flags):
+        return {"email": email, "password_hash": password_hash, "salt": "", "is_client": False,
+                "is_driver": False, "is_employee": False, **flags}
+
+    [result.admin_user_id] = await _bulk(db, models.User, [user(BENCH_ADMIN_EMAIL, is_employee=True)])
+
+    client_user_ids = await _bulk(db, models.User, [user(f"cliente{i}@bench.local", is_client=True) for i in range(clients)])
+    client_rows = []
+    for i, user_id in enumerate(client_user_ids):
+        rua, bairro, numero = _address(rng)
+        lat, lon = _offline_lat_long(f"{rua}, {numero}, {bairro}")
+        client_rows.append({
+            "nome": f"Cliente {rng.choice(WORDS)} {i}", "end_rua": rua, "end_bairro": bairro, "end_numero": numero,
+            "telefone": rng.randint(10 ** 8, 10 ** 9 - 1), "fk_id_usuario": user_id, "latitude": lat, "longitude": lon,
+        })
+    result.client_ids = await _bulk(db, models.Client, client_rows)
+
+    product_rows = [
+        {"nome": f"{rng.choice(WORDS)} {i}-{j}", "descricao": "Produto sintético", "preco": rng.randint(10, 5000),
+         "quantidade_estoque": rng.randint(1, 100), "fk_id_cliente": client_id}
+        for i, client_id in enumerate(result.client_ids)
+        for j in range(products_per_client)
+    ]
+    result.product_ids = await _bulk(db, models.Product, product_rows)
+    await db.execute(insert(models.StockShard), [
+        {"fk_id_produto": product_id, "shard": shard, "quantidade": part}
+        for product_id, row in zip(result.product_ids, product_rows)
+        for shard, part in enumerate(inventory.split(row["quantidade_estoque"]))
+    ])
+
+    point_rows = []
+    for i in range(points):
+        rua, bairro, numero = _address(rng)
+        lat, lon = _offline_lat_long(f"{rua}, {numero}, {bairro}")
+        point_rows.append({"nome": f"Ponto {i}", "end_rua": rua, "end_bairro": bairro, "end_numero": numero,
+                           "tipo": rng.choice(["deposito", "loja"]), "latitude": lat, "longitude": lon})
+    result.point_ids = await _bulk(db, models.DistributionPoint, point_rows)
+
+    location_rows = []
+    for i in range(vehicles):
+        lat, lon = _offline_lat_long(f"veiculo {seed} {i}")
+        location_rows.append({"latitude": lat, "longitude": lon, "data_hora": date.today()})
+    result.location_ids = await _bulk(db, models.VehicleLocation, location_rows)
+    result.vehicle_ids = await _bulk(db, models.Vehicle, [
+        {"placa": f"BEN{i:04d}", "modelo": rng.choice(["Van", "Caminhão", "Moto"]), "capacidade": rng.randint(100, 1000),
+         "fk_id_localizacao": location_id, "is_available": True}
+        for i, location_id in enumerate(result.location_ids)
+    ])
+
+    result.driver_user_ids = await _bulk(db, models.User, [user(f"motorista{i}@bench.local", is_driver=True) for i in range(vehicles)])
+    await _bulk(db, models.Driver, [
+        {"nome": f"Motorista {i}", "habilitacao": f"{rng.randint(10 ** 9, 10 ** 10 - 1)}", "telefone": rng.randint(10 ** 8, 10 ** 9 - 1),
+         "end_rua": "Rua A", "end_bairro": "Centro", "end_numero": 1, "fk_id_usuario": user_id, "fk_id_veiculo": vehicle_id}
+        for i, (user_id, vehicle_id) in enumerate(zip(result.driver_user_ids, result.vehicle_ids))
+    ])
+
+    await db.commit()
+    return result
+
+
+async def _main(args):
+    from database import async_sessionmaker, engine
+
+    async with async_sessionmaker() as db:
+        await reset(db)
+        result = await seed(db, clients=args.clients, products_per_client=args.products_per_client,
+                            points=args.points, vehicles=args.vehicles, seed=args.seed)
+    await engine.dispose()
+    print(f"{len(result.client_ids)} clientes, {len(result.product_ids)} produtos, "
+          f"{len(result.point_ids)} pontos, {len(result.vehicle_ids)} veículos")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Popula o banco com dados sintéticos (apaga os dados existentes)")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--products-per-client", type=int, default=3)
+    parser.add_argument("--points", type=int, default=50)
+    parser.add_argument("--vehicles", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,49 @@
+"""
+Compressão de respostas: CPU por resposta (tempo do benchmark) e bytes na rede
+(extra_info: raw_bytes, wire_bytes, ratio) de gzip e brotli por tamanho de corpo,
+com listas JSON como as de /vehicles, /clients/ e /products/. Não precisa de banco.
+"""
+import random
+import orjson
+import pytest
+from services import compression
+
+# Número de veículos na lista: ~1 KB, ~10 KB, ~100 KB e ~1 MB de JSON
+SIZES = [10, 100, 1_000, 10_000]
+ENCODINGS = ["gzip"] + (["br"] if compression.brotli else [])
+
+
+def _vehicles_body(n: int) -> bytes:
+    rng = random.Random(n)
+    return orjson.dumps([
+        {"id": i, "placa": f"ABC{rng.randint(0, 9999):04d}", "modelo": rng.choice(["Van", "Truck", "Moto"]),
+         "capacidade": rng.randint(100, 1000), "is_available": rng.random() < 0.5, "fk_id_localizacao": i}
+        for i in range(n)
+    ])
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("n", SIZES)
+def test_compress(benchmark, n, encoding):
+    body = _vehicles_body(n)
+    benchmark.group = f"compress-{len(body) // 1024}kb"
+    compressed = benchmark(compression.compress, body, encoding)
+    benchmark.extra_info.update(
+        raw_bytes=len(body), wire_bytes=len(compressed), ratio=round(len(compressed) / len(body), 3),
+    )
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_streamed_chunks(benchmark, n):
+    """Mesmo corpo em partes de 16 KB pelo compressor incremental, como no streaming do middleware."""
+    body = _vehicles_body(n)
+    chunks = [body[i:i + 16384] for i in range(0, len(body), 16384)]
+    encoding = ENCODINGS[-1]
+
+    def run():
+        compress_chunk, finish = compression.compressor(encoding)
+        return b"".join(compress_chunk(chunk) for chunk in chunks) + finish()
+
+    benchmark.group = f"compress-{len(body) // 1024}kb"
+    compressed = benchmark(run)
+    benchmark.extra_info.update(raw_bytes=len(body), wire_bytes=len(compressed), encoding=encoding)
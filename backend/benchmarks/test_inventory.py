@@ -0,0 +1,82 @@
+"""
+Reservas concorrentes do mesmo produto: UPDATE condicional na linha do Produto (um lock
+só, as transações fazem fila) vs services/inventory.py (shards com SKIP LOCKED).
+
+Cada rodada abre CONCURRENCY transações que reservam 1 unidade e seguram o lock por
+HOLD_SECONDS, como o resto da transação de create_delivery; no fim fazem rollback, então
+o estoque não se esgota entre as rodadas. Precisa do Postgres de BENCH_DATABASE_URL.
+"""
+import asyncio
+import pytest
+from sqlalchemy import delete, insert, update
+import models
+from services import inventory
+
+CONCURRENCY = 12  # Abaixo do pool padrão (5 + 10 de overflow)
+HOLD_SECONDS = 0.005
+
+
+async def _reserve_product_row(db, product_id):
+    P = models.Product
+    result = await db.execute(
+        update(P)
+        .where(P.id == product_id, P.quantidade_estoque >= 1)
+        .values(quantidade_estoque=P.quantidade_estoque - 1)
+        .returning(P.id)
+    )
+    assert result.first()
+
+
+async def _reserve_sharded(db, product_id):
+    assert await inventory.reserve(db, product_id, 1)
+
+
+@pytest.fixture(scope="module")
+def hot_product(run, seeded):
+    """Produto próprio do módulo, removido no fim: o estoque dos produtos do seed fica intacto."""
+    from database import async_sessionmaker
+
+    async def create():
+        async with async_sessionmaker() as db:
+            product_id = await db.scalar(insert(models.Product).values(
+                nome="bench hot product", descricao="Produto do benchmark de reservas", preco=1,
+                quantidade_estoque=10_000, fk_id_cliente=seeded.client_ids[0],
+            ).returning(models.Product.id))
+            await inventory.add_stock(db, product_id, 10_000)
+            await db.commit()
+            return product_id
+
+    async def drop(product_id):
+        async with async_sessionmaker() as db:
+            await db.execute(delete(models.StockShard).where(models.StockShard.fk_id_produto == product_id))
+            await db.execute(delete(models.Product).where(models.Product.id == product_id))
+            await db.commit()
+
+    product_id = run(create())
+    yield product_id
+    run(drop(product_id))
+
+
+def _burst(run, reserve, product_id):
+    from database import async_sessionmaker
+
+    async def one():
+        async with async_sessionmaker() as db:
+            await reserve(db, product_id)
+            await asyncio.sleep(HOLD_SECONDS)
+            await db.rollback()
+
+    async def burst():
+        await asyncio.gather(*(one() for _ in range(CONCURRENCY)))
+
+    return lambda: run(burst())
+
+
+@pytest.mark.benchmark(group="reserve-hot-product")
+def test_reserve_product_row(benchmark, run, hot_product):
+    benchmark.pedantic(_burst(run, _reserve_product_row, hot_product), rounds=20, iterations=1)
+
+
+@pytest.mark.benchmark(group="reserve-hot-product")
+def test_reserve_sharded(benchmark, run, hot_product):
+    benchmark.pedantic(_burst(run, _reserve_sharded, hot_product), rounds=20, iterations=1)
@@ -0,0 +1,113 @@
+"""
+Micro-benchmarks (pytest-benchmark).
+
+    pytest benchmarks --benchmark-autosave                       # grava a linha de base
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Os testes de API usam a aplicação em processo (httpx.ASGITransport) contra o
+Postgres de BENCH_DATABASE_URL; sem ele apenas os benchmarks puros rodam.
+"""
+import math
+import random
+from datetime import datetime
+from benchmarks.seed import BENCH_ADMIN_EMAIL, BENCH_PASSWORD
+from services import eta, geofence, mvt, track
+from services.geodesy import haversine_km
+
+
+def test_haversine(benchmark):
+    rng = random.Random(1)
+    points = [(rng.uniform(-24, -23), rng.uniform(-47, -46)) for _ in range(1000)]
+
+    def nearest():
+        return min(points, key=lambda p: haversine_km(p[0], p[1], -23.55, -46.63))
+
+    benchmark(nearest)
+
+
+def test_mvt_encode_tile(benchmark):
+    rng = random.Random(1)
+    z, (x, y) = 12, mvt.tile_for_point(12, -23.55, -46.63)
+    min_lon, min_lat, max_lon, max_lat = mvt.tile_bounds(z, x, y)
+    features = [
+        (i, rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon), {"nome": f"Cliente {i}"})
+        for i in range(2000)
+    ]
+    data = benchmark(lambda: mvt.encode_tile([mvt.encode_layer("clients", features, z, x, y)]))
+    assert data
+
+
+def test_eta_batch(benchmark):
+    # Um ciclo do cálculo de ETA: 20 mil entregas ativas em 5 mil veículos
+    rng = random.Random(1)
+    rows = []
+    for delivery_id in range(20000):
+        vehicle_id = delivery_id // 4
+        rows.append((delivery_id, vehicle_id, -23.55 + vehicle_id * 1e-5, -46.63, rng.uniform(-23.7, -23.4), rng.uniform(-46.8, -46.4)))
+    result = benchmark(eta.compute_etas, rows, eta.SpeedProfile(), datetime(2026, 1, 1, 8))
+    assert len(result) == len(rows)
+
+
+def test_geofence_containing(benchmark):
+    # 30 mil cercas circulares, mil posições por rodada
+    rng = random.Random(1)
+    index = geofence.FenceIndex(
+        geofence.Fence(i, rng.uniform(-23.7, -23.4), rng.uniform(-46.8, -46.4)) for i in range(30000)
+    )
+    positions = [(rng.uniform(-23.7, -23.4), rng.uniform(-46.8, -46.4)) for _ in range(1000)]
+    benchmark(lambda: [index.containing(lat, lon) for lat, lon in positions])
+
+
+def test_track_compress(benchmark):
+    # Uma hora de posições a 1 Hz -> Douglas-Peucker + blob delta-varint
+    rng = random.Random(1)
+    lat, lon, points = -23.55, -46.63, []
+    for i in range(3600):
+        lat += 0.00005 + rng.gauss(0, 5e-6)
+        lon += 0.00003 * math.sin(i / 300) + rng.gauss(0, 5e-6)
+        points.append((lat, lon, 1.7e9 + i))
+
+    data = benchmark(lambda: track.encode_delta_varint(track.douglas_peucker(points)))
+    assert len(data) < len(points)
+
+
+def test_login(benchmark, api, run):
+    def login():
+        return run(api.post("/auth/login", params={"email": BENCH_ADMIN_EMAIL, "password": BENCH_PASSWORD}))
+
+    response = benchmark.pedantic(login, rounds=20, iterations=1)
+    assert response.status_code == 200
+
+
+def test_create_delivery(benchmark, api, run, seeded):
+    rng = random.Random(2)
+
+    def create():
+        return run(api.post("/create_delivery", json={
+            "fk_id_produto": rng.choice(seeded.product_ids),
+            "fk_id_ponto_entrega": rng.choice(seeded.point_ids),
+            "quantidade": 1,
+        }))
+
+    # Cada entrega ocupa um veículo: as rodadas ficam abaixo da frota do seed
+    response = benchmark.pedantic(create, rounds=200, iterations=1, warmup_rounds=5)
+    assert response.status_code == 200
+
+
+def test_update_vehicle_location(benchmark, api, run, seeded):
+    rng = random.Random(3)
+
+    def update():
+        return run(api.put(f"/vehicle_location/{rng.choice(seeded.location_ids)}", json={
+            "latitude": -23.55 + rng.uniform(-0.1, 0.1),
+            "longitude": -46.63 + rng.uniform(-0.1, 0.1),
+            "data_hora": datetime.utcnow().isoformat(),
+        }))
+
+    response = benchmark.pedantic(update, rounds=300, iterations=1, warmup_rounds=10)
+    assert response.status_code == 200
+
+
+def test_list_vehicles(benchmark, api, run):
+    response = benchmark.pedantic(lambda: run(api.get("/vehicles")), rounds=100, iterations=1)
+    assert response.status_code == 200
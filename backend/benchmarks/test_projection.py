@@ -0,0 +1,60 @@
+"""
+Listagens: hidratação ORM + Pydantic (caminho antigo) vs projeção de colunas + orjson,
+em páginas de 10k linhas. Compare os grupos no relatório do pytest-benchmark.
+"""
+from typing import List
+import orjson
+import pytest
+from sqlalchemy.future import select
+import crud
+import models
+import schemas
+from services.cache import serialize
+
+PAGE = 10_000
+
+
+@pytest.fixture(scope="module")
+def session(run, seeded):
+    from database import async_sessionmaker
+
+    db = async_sessionmaker()
+    yield db
+    run(db.close())
+
+
+@pytest.mark.benchmark(group="vehicles-10k")
+def test_vehicles_orm(benchmark, run, session):
+    async def orm_path():
+        result = await session.execute(select(models.Vehicle).limit(PAGE))
+        body = serialize(List[schemas.Vehicle], result.scalars().all())
+        session.expunge_all()
+        return body
+
+    assert benchmark.pedantic(lambda: run(orm_path()), rounds=10, iterations=1)
+
+
+@pytest.mark.benchmark(group="vehicles-10k")
+def test_vehicles_projection(benchmark, run, session):
+    async def projection_path():
+        return orjson.dumps(await crud.get_vehicles_rows(session))
+
+    assert benchmark.pedantic(lambda: run(projection_path()), rounds=10, iterations=1)
+
+
+@pytest.mark.benchmark(group="clients-10k")
+def test_clients_orm(benchmark, run, session):
+    async def orm_path():
+        body = serialize(List[schemas.Client], await crud.get_clients(session, limit=PAGE))
+        session.expunge_all()
+        return body
+
+    assert benchmark.pedantic(lambda: run(orm_path()), rounds=5, iterations=1)
+
+
+@pytest.mark.benchmark(group="clients-10k")
+def test_clients_projection(benchmark, run, session):
+    async def projection_path():
+        return orjson.dumps(await crud.get_clients_rows(session, limit=PAGE))
+
+    assert benchmark.pedantic(lambda: run(projection_path()), rounds=5, iterations=1)
@@ -0,0 +1,123 @@
+"""
+Custo por chamada das consultas quentes: select(...) montado a cada chamada (caminho
+antigo) vs queries.py. Compare os grupos no relatório do pytest-benchmark.
+
+Os grupos "*-build" medem só o lado Python que antecede o cache de SQL compilado
+(construção da expressão + chave de cache) e rodam sem banco; os demais executam
+a consulta no Postgres de BENCH_DATABASE_URL.
+"""
+import pytest
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload, selectinload
+import models
+import queries
+from benchmarks.seed import BENCH_ADMIN_EMAIL
+from services.geodesy import haversine_km
+
+
+def _user_by_email_select(email):
+    return select(models.User).where(models.User.email == email)
+
+
+def _vehicle_by_driver_select(user_id):
+    return select(models.Vehicle).join(models.Driver).where(models.Driver.fk_id_usuario == user_id)
+
+
+# _generate_cache_key é o que o SQLAlchemy calcula em todo execute para achar o SQL compilado
+@pytest.mark.benchmark(group="user-by-email-build")
+def test_user_by_email_build_select(benchmark):
+    benchmark(lambda: _user_by_email_select("a@b.com")._generate_cache_key())
+
+
+@pytest.mark.benchmark(group="user-by-email-build")
+def test_user_by_email_build_lambda(benchmark):
+    benchmark(lambda: queries.user_by_email("a@b.com")._generate_cache_key())
+
+
+@pytest.mark.benchmark(group="vehicle-by-driver-build")
+def test_vehicle_by_driver_build_select(benchmark):
+    benchmark(lambda: _vehicle_by_driver_select(42)._generate_cache_key())
+
+
+@pytest.mark.benchmark(group="vehicle-by-driver-build")
+def test_vehicle_by_driver_build_lambda(benchmark):
+    benchmark(lambda: queries.vehicle_by_driver_user(42)._generate_cache_key())
+
+
+@pytest.fixture(scope="module")
+def session(run, seeded):
+    from database import async_sessionmaker
+
+    db = async_sessionmaker()
+    yield db
+    run(db.close())
+
+
+def _execute(run, session, stmt_factory, *args):
+    async def go():
+        result = await session.execute(stmt_factory(*args))
+        rows = result.unique().scalars().all()
+        session.expunge_all()
+        return rows
+
+    return lambda: run(go())
+
+
+@pytest.mark.benchmark(group="user-by-email")
+def test_user_by_email_select(benchmark, run, session):
+    assert benchmark(_execute(run, session, _user_by_email_select, BENCH_ADMIN_EMAIL))
+
+
+@pytest.mark.benchmark(group="user-by-email")
+def test_user_by_email_lambda(benchmark, run, session):
+    assert benchmark(_execute(run, session, queries.user_by_email, BENCH_ADMIN_EMAIL))
+
+
+# create_delivery: produto + cliente e todos os veículos disponíveis para escolher o mais
+# próximo em Python (caminho antigo) vs a consulta única de candidatos
+@pytest.mark.benchmark(group="create-delivery-fetch")
+def test_create_delivery_fetch_separate(benchmark, run, seeded, session):
+    async def separate():
+        result = await session.execute(
+            select(models.Product).options(selectinload(models.Product.client)).where(models.Product.id == seeded.product_ids[0])
+        )
+        product = result.scalars().first()
+        client = product.client
+        result = await session.execute(
+            select(models.Vehicle)
+            .options(joinedload(models.Vehicle.location))
+            .where(models.Vehicle.is_available == True)  # noqa: E712
+            .filter(models.Vehicle.capacidade - models.Vehicle.carga >= 1)
+        )
+        best = min(
+            result.scalars().all(),
+            key=lambda v: haversine_km(v.location.latitude, v.location.longitude, client.latitude, client.longitude),
+        )
+        session.expunge_all()
+        return best.id
+
+    assert benchmark.pedantic(lambda: run(separate()), rounds=20, iterations=1)
+
+
+@pytest.mark.benchmark(group="create-delivery-fetch")
+def test_create_delivery_fetch_candidates(benchmark, run, seeded, session):
+    async def candidates():
+        rows = (await session.execute(queries.delivery_candidates(seeded.product_ids[0]))).all()
+        return rows[0].vehicle_id
+
+    assert benchmark.pedantic(lambda: run(candidates()), rounds=20, iterations=1)
+
+
+# Candidatos do estado da frota em memória (services/fleet.py): a consulta do banco só traz produto e cliente
+@pytest.mark.benchmark(group="create-delivery-fetch")
+def test_create_delivery_fetch_fleet(benchmark, run, seeded, session):
+    from services import fleet
+
+    run(fleet.rebuild(session))
+
+    async def from_fleet():
+        rows = (await session.execute(queries.delivery_candidates(seeded.product_ids[0], limit=0))).all()
+        product = rows[0]
+        return fleet.nearest(product.latitude, product.longitude, product.quantidade, queries.DELIVERY_CANDIDATES)[0]
+
+    assert benchmark.pedantic(lambda: run(from_fleet()), rounds=20, iterations=1)
@@ -0,0 +1,75 @@
+"""
+Serialização de respostas: caminho antigo (um model por item + dict + json.dumps,
+como o FastAPI fazia com orm_mode) vs TypeAdapter do Pydantic v2 (dump_json em
+pydantic-core). Não precisa de banco: usa objetos com atributos, como os do ORM.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+import pytest
+from fastapi.encoders import jsonable_encoder
+import schemas
+from services.cache import get_adapter
+
+N = 10_000
+
+
+def _vehicles():
+    rng = random.Random(1)
+    return [
+        SimpleNamespace(id=i, placa=f"ABC{i:04d}", modelo="Van", capacidade=rng.randint(100, 1000),
+                        is_available=bool(i % 2), fk_id_localizacao=i)
+        for i in range(N)
+    ]
+
+
+def _delivery_details():
+    rng = random.Random(2)
+    now = datetime(2026, 1, 1)
+    return [
+        SimpleNamespace(
+            delivery_id=i, status="pending", data_criacao=now.isoformat(),
+            data_entrega=(now + timedelta(hours=rng.randint(1, 48))).isoformat(),
+            vehicle_id=i % 500, vehicle_plate=f"ABC{i % 500:04d}", vehicle_model="Van",
+            product_name=f"Produto {i}", product_quantity=rng.randint(1, 10),
+            distribution_point_name="Ponto 1", distribution_point_lat=-23.5, distribution_point_lon=-46.6,
+            route_id=i, route_description="Rota", client_id=i % 1000, client_name=f"Cliente {i % 1000}",
+            client_email=f"cliente{i % 1000}@example.com",
+        )
+        for i in range(N)
+    ]
+
+
+def _before(schema, items) -> bytes:
+    return json.dumps(jsonable_encoder([schema.model_validate(item).model_dump() for item in items])).encode()
+
+
+def _after(schema, items) -> bytes:
+    adapter = get_adapter(List[schema])
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+
+@pytest.mark.benchmark(group="serialize-vehicles-10k")
+def test_vehicles_before(benchmark):
+    items = _vehicles()
+    benchmark(_before, schemas.Vehicle, items)
+
+
+@pytest.mark.benchmark(group="serialize-vehicles-10k")
+def test_vehicles_after(benchmark):
+    items = _vehicles()
+    assert json.loads(benchmark(_after, schemas.Vehicle, items)) == json.loads(_before(schemas.Vehicle, items))
+
+
+@pytest.mark.benchmark(group="serialize-delivery-details-10k")
+def test_delivery_details_before(benchmark):
+    items = _delivery_details()
+    benchmark(_before, schemas.DeliveryDetailsResponse, items)
+
+
+@pytest.mark.benchmark(group="serialize-delivery-details-10k")
+def test_delivery_details_after(benchmark):
+    items = _delivery_details()
+    assert json.loads(benchmark(_after, schemas.DeliveryDetailsResponse, items)) == json.loads(_before(schemas.DeliveryDetailsResponse, items))
@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update
 from fastapi import HTTPException, status
 import models
 from models import User
@@ -9,6 +10,10 @@ from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from passlib.context import CryptContext
 import uuid
+from datetime import date, datetime
+from services import geo, tile_cache, search, outbox, geofence, inventory
+from services.cache import response_cache
+from services.projection import schema_columns, fetch_rows
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -53,7 +58,7 @@ async def create_client(db: AsyncSession, client: schemas.ClientCreate):
         is_employee=False,
     )
 
-    # Criação do cliente
+    # Criação do cliente (coordenadas preenchidas depois pelo worker, via outbox)
      db_client = models.Client(
         nome=client.nome,
         end_rua=client.end_rua,
@@ -76,6 +81,10 @@ async def create_client(db: AsyncSession, client: schemas.ClientCreate):
 
      db.add(db_client)
      try:
+        await db.flush()
+        for db_product in (db_client.products if client.products else ()):
+            await inventory.add_stock(db, db_product.id, db_product.quantidade_estoque)
+        await outbox.enqueue(db, "geocode_client", {"client_id": db_client.id})
         await db.commit()
         await db.refresh(db_client)
      except IntegrityError:
@@ -85,6 +94,10 @@ async def create_client(db: AsyncSession, client: schemas.ClientCreate):
         )
 
      await db.refresh(db_client, ["products"])
+     search.index_name("clients", db_client.id, db_client.nome)
+     for db_product in db_client.products:
+         search.index_name("products", db_product.id, db_product.nome)
+     await response_cache.invalidate("clients", "products")
 
      return db_client
 
@@ -99,27 +112,29 @@ async def get_clients(db: AsyncSession, skip: int = 0, limit: int = 10):
     clients = result.unique().scalars().all()
     return clients
 
-# Função para obter um cliente pelo ID ou nome
+# Função para obter um cliente pelo ID ou nome (o nome mais relevante na busca aproximada)
 async def get_client_by_id_or_name(db: AsyncSession, client_id: int = None, name: str = None):
-    query = select(models.Client).options(joinedload(models.Client.products))
     if client_id is not None:
-        query = query.filter(models.Client.id == client_id)
+        query = select(models.Client).options(joinedload(models.Client.products)).filter(models.Client.id == client_id)
+        result = await db.execute(query)
+        return result.scalars().first()
     elif name:
-        query = query.filter(models.Client.nome.ilike(f"%{name}%"))
-    else:
-        return None
-
-    result = await db.execute(query)
-    return result.scalars().first()
+        clients = await search.search(db, "clients", name, limit=1)
+        return clients[0] if clients else None
+    return None
 
 # 2. Cadastro de Produtos
 async def create_product(db: AsyncSession, product: schemas.ProductCreate, client_id: int):
-    product_data = product.dict()
+    product_data = product.model_dump()
     product_data.pop("fk_id_cliente", None)
     db_product = models.Product(**product_data, fk_id_cliente=client_id)
     db.add(db_product)
+    await db.flush()
+    await inventory.add_stock(db, db_product.id, db_product.quantidade_estoque)  # Saldo reservável, em shards
     await db.commit()
     await db.refresh(db_product)
+    await response_cache.invalidate("products", "clients")  # Clientes listam seus produtos
+    search.index_name("products", db_product.id, db_product.nome)
     return db_product
 
 async def get_products(db: AsyncSession, skip: int = 0, limit: int = 10):
@@ -137,20 +152,19 @@ async def get_product_by_id(db: AsyncSession, product_id: int):
     result = await db.execute(select(models.Product).where(models.Product.id == product_id))
     return result.scalars().first()
 
-# Buscar produtos por nome
-async def get_product_by_name(db: AsyncSession, name: str):
-    result = await db.execute(select(models.Product).where(models.Product.nome.ilike(f"%{name}%")))
-    return result.scalars().all()
+# Buscar produtos por nome (busca aproximada, ordenada por relevância)
+async def get_product_by_name(db: AsyncSession, name: str, limit: int = search.DEFAULT_LIMIT):
+    return await search.search(db, "products", name, limit=limit)
 
 
 # 3. Cadastro de Veículos
 async def create_vehicle(db: AsyncSession, vehicle: schemas.VehicleCreate):
     # Cria o veículo
-    db_vehicle = models.Vehicle(**vehicle.dict(exclude={"location"}))
+    db_vehicle = models.Vehicle(**vehicle.model_dump(exclude={"location"}))
     
     # Cria a localização associada, se fornecida
     if vehicle.location:
-        location_data = vehicle.location.dict()
+        location_data = vehicle.location.model_dump()
         # Certifique-se de que 'data_hora' está no formato correto
         if isinstance(location_data.get("data_hora"), str):
             from datetime import datetime
@@ -163,6 +177,9 @@ async def create_vehicle(db: AsyncSession, vehicle: schemas.VehicleCreate):
 
     # Carrega o relacionamento 'location' para evitar problemas
     await db.refresh(db_vehicle)
+    if db_vehicle.location:
+        tile_cache.invalidate_point("vehicles", db_vehicle.location.latitude, db_vehicle.location.longitude)
+    await response_cache.invalidate("vehicles")
     return db_vehicle
 
 
@@ -229,10 +246,15 @@ async def get_driver_by_id(db: AsyncSession, driver_id: int):
 
 # 4. Cadastro de Pontos de Distribuição
 async def create_distribution_point(db: AsyncSession, point: schemas.DistributionPointCreate):
-    db_point = models.DistributionPoint(**point.dict())
+    # Geocodificação fica para o worker (outbox), na mesma transação do cadastro
+    db_point = models.DistributionPoint(**point.model_dump())
     db.add(db_point)
+    await db.flush()
+    await outbox.enqueue(db, "geocode_distribution_point", {"point_id": db_point.id})
     await db.commit()
     await db.refresh(db_point)
+    await response_cache.invalidate("distribution_points")
+    geofence.invalidate()  # Cercas poligonais já valem antes da geocodificação
     return db_point
 
 async def get_distribution_points(db: AsyncSession, skip: int = 0, limit: int = 10):
@@ -251,12 +273,52 @@ async def get_distribution_point(db: AsyncSession, point_id: int):
 
 # 5. Importação de Dados de Localização dos Veículos
 async def create_vehicle_location(db: AsyncSession, location: schemas.VehicleLocationCreate):
-    db_location = models.VehicleLocation(**location.dict())
+    db_location = models.VehicleLocation(**location.model_dump())
     db.add(db_location)
     await db.commit()
     await db.refresh(db_location)
     return db_location
 
+# Anexa a posição ao histórico do veículo (LocalizacaoVeiculo guarda só a última)
+async def record_location_history(db: AsyncSession, vehicle_id: int, latitude: float, longitude: float, registered_at: datetime = None):
+    db.add(models.LocationHistory(
+        fk_id_veiculo=vehicle_id, latitude=latitude, longitude=longitude, registrado_em=registered_at or datetime.utcnow()
+    ))
+
+# Lote de posições: a mais recente de cada veículo vira a posição atual (LocalizacaoVeiculo).
+# Retorna as posições substituídas e as novas, para invalidar os tiles; 404 se algum veículo não existe.
+async def update_current_positions(db: AsyncSession, positions):
+    now = datetime.utcnow()
+    latest = {}
+    for vehicle_id, lat, lon, when in positions:
+        when = when or now
+        if vehicle_id not in latest or when >= latest[vehicle_id][2]:
+            latest[vehicle_id] = (lat, lon, when)
+
+    V, L = models.Vehicle, models.VehicleLocation
+    result = await db.execute(
+        select(V.id, V.fk_id_localizacao, L.latitude, L.longitude)
+        .join(L, V.fk_id_localizacao == L.id, isouter=True)
+        .where(V.id.in_(list(latest)))
+    )
+    vehicles = {vehicle_id: (location_id, lat, lon) for vehicle_id, location_id, lat, lon in result.all()}
+    missing = sorted(set(latest) - set(vehicles))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Veículo não encontrado: {missing}")
+
+    moved = []
+    for vehicle_id, (location_id, old_lat, old_lon) in vehicles.items():
+        lat, lon, when = latest[vehicle_id]
+        if location_id is None:
+            db_location = models.VehicleLocation(latitude=lat, longitude=lon, data_hora=when.date())
+            db.add(db_location)
+            await db.flush()
+            await db.execute(update(V).where(V.id == vehicle_id).values(fk_id_localizacao=db_location.id))
+        else:
+            await db.execute(update(L).where(L.id == location_id).values(latitude=lat, longitude=lon, data_hora=when.date()))
+        moved += [(old_lat, old_lon), (lat, lon)]
+    return moved
+
 async def get_vehicle_locations(db: AsyncSession, skip: int = 0, limit: int = 10):
     result = await db.execute(select(models.VehicleLocation).offset(skip).limit(limit))
     return result.scalars().all()
@@ -322,38 +384,77 @@ def update_route(db: AsyncSession, route_id: int, route: schemas.RouteUpdate):
         return None
 
     # Atualiza apenas os campos fornecidos
-    for key, value in route.dict(exclude_unset=True).items():
+    for key, value in route.model_dump(exclude_unset=True).items():
         setattr(existing_route, key, value)
 
     db.commit()
     db.refresh(existing_route)
     return existing_route
 
+# Listagens por projeção (usadas pelos endpoints de lista): só as colunas do
+# schema de resposta, devolvidas como dicts prontos para serializar
+async def get_vehicles_rows(db: AsyncSession):
+    stmt = select(*schema_columns(models.Vehicle, schemas.Vehicle)).order_by(models.Vehicle.id)
+    return await fetch_rows(db, stmt)
+
+async def get_drivers_rows(db: AsyncSession, skip: int = 0, limit: int = 10):
+    stmt = select(*schema_columns(models.Driver, schemas.Driver)).order_by(models.Driver.id).offset(skip).limit(limit)
+    return await fetch_rows(db, stmt)
+
+async def get_products_rows(db: AsyncSession, skip: int = 0, limit: int = 10):
+    stmt = select(*schema_columns(models.Product, schemas.Product)).order_by(models.Product.id).offset(skip).limit(limit)
+    return await fetch_rows(db, stmt)
+
+async def get_distribution_points_rows(db: AsyncSession, skip: int = 0, limit: int = 10):
+    Point = models.DistributionPoint
+    stmt = select(*schema_columns(Point, schemas.DistributionPoint)).order_by(Point.id).offset(skip).limit(limit)
+    return await fetch_rows(db, stmt)
+
+async def get_clients_rows(db: AsyncSession, skip: int = 0, limit: int = 10):
+    # Duas consultas planas (clientes da página e seus produtos) no lugar do joinedload
+    stmt = select(*schema_columns(models.Client, schemas.Client)).order_by(models.Client.id).offset(skip).limit(limit)
+    clients = await fetch_rows(db, stmt)
+    if not clients:
+        return clients
+
+    by_id = {client["id"]: client for client in clients}
+    for client in clients:
+        client["products"] = []
+    products = await fetch_rows(
+        db,
+        select(*schema_columns(models.Product, schemas.Product))
+        .where(models.Product.fk_id_cliente.in_(by_id))
+        .order_by(models.Product.id),
+    )
+    for product in products:
+        by_id[product["fk_id_cliente"]]["products"].append(product)
+    return clients
+
 # 8. Visualização Geográfica de Dados
-async def get_geographic_data(db: AsyncSession):
-    clients = await db.execute(select(models.Cliente))
-    distribution_points = await db.execute(select(models.PontoDistribuicao))
-    vehicles = await db.execute(select(models.Veiculo))
-    routes = await db.execute(select(models.Rota))
+# Visão geral do mapa: uma FeatureCollection por camada, limitada à bbox e agrupada pelo zoom
+async def get_geographic_data(db: AsyncSession, bbox: geo.BBox, zoom: int):
     return {
-        "Clientes": clients.scalars().all(),
-        "Pontos_Distribuicao": distribution_points.scalars().all(),
-        "Veiculos": vehicles.scalars().all(),
-        "Rotas": routes.scalars().all(),
+        layer: await geo.get_layer_features(db, layer, bbox, zoom)
+        for layer in ("clients", "distribution_points", "vehicles")
     }
 
 # 9. Relatório de Entregas por Veículo e por Período
-async def get_deliveries_report(db: AsyncSession, vehicle_id: int):
-    result = await db.execute(
-        select(models.Delivery)
-        .filter(models.Delivery.fk_id_vehicle == vehicle_id)
-        .options(selectinload(models.Delivery.product), selectinload(models.Delivery.distribution_point))
-    )
+# Lê apenas os rollups diários (uma linha por dia), nunca varre a tabela Entrega
+async def _get_rollup_report(db: AsyncSession, model, key_col, key_value: int, start: date, end: date):
+    query = select(model).where(model.dia >= start, model.dia <= end)
+    if key_value is not None:
+        query = query.where(key_col == key_value)
+    result = await db.execute(query.order_by(key_col, model.dia))
     return result.scalars().all()
 
+async def get_deliveries_report(db: AsyncSession, vehicle_id: int = None, start: date = None, end: date = None):
+    model = models.DeliveryVehicleDailyRollup
+    return await _get_rollup_report(db, model, model.fk_id_veiculo, vehicle_id, start, end)
+
+async def get_distribution_point_deliveries_report(db: AsyncSession, point_id: int = None, start: date = None, end: date = None):
+    model = models.DeliveryPointDailyRollup
+    return await _get_rollup_report(db, model, model.fk_id_ponto_entrega, point_id, start, end)
+
 # 10. Visualização Geográfica dos Produtos Entregues
-async def get_delivered_products_map_data(db: AsyncSession):
-    result = await db.execute(
-        select(models.Entrega).filter(models.Entrega.is_delivered == True)
-    )
-    return result.scalars().all()
+async def get_delivered_products_map_data(db: AsyncSession, bbox: geo.BBox, zoom: int):
+    return await geo.get_layer_features(db, "delivered_products", bbox, zoom)
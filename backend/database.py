@@ -3,11 +3,25 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.sql import text
+from fastapi import Request
+import os
 
 
-DATABASE_URL = "postgresql+asyncpg://user:password@db:5432/dbname"
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:password@db:5432/dbname")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Caches de consultas (também usados pelas réplicas de leitura):
+# - query_cache_size: SQL compilado pelo SQLAlchemy, por forma de consulta (todas as conexões);
+# - prepared_statement_cache_size: prepared statements do asyncpg por conexão (0 desliga,
+#   necessário atrás de um pgbouncer em modo transaction).
+ENGINE_OPTIONS = {
+    "echo": os.getenv("DB_ECHO", "0") == "1",  # DB_ECHO=1 loga todo o SQL (caro: só para depuração)
+    "query_cache_size": int(os.getenv("DB_QUERY_CACHE_SIZE", 1200)),
+    "connect_args": {
+        "prepared_statement_cache_size": int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", 500)),
+    },
+}
+
+engine = create_async_engine(DATABASE_URL, **ENGINE_OPTIONS)
 
 async_sessionmaker = sessionmaker(
     bind=engine,
@@ -27,6 +41,18 @@ async def get_db():
         finally:
             await session.close()
 
+
+# Leituras pesadas (listas, relatórios, mapa): réplica com atraso aceitável ou o primário
+async def get_read_db(request: Request):
+    from services import replicas
+
+    factory = replicas.pick(request.headers, request.cookies) or async_sessionmaker
+    async with factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
 async def drop_delivery_table(engine: AsyncEngine):
     try:
         # Drop apenas a tabela Delivery
@@ -0,0 +1,33 @@
+"""
+Modo multi-processo da API: um worker uvicorn por núcleo sob o gunicorn.
+
+    python manage.py bootstrap                  # migrações, uma vez por deploy
+    gunicorn -c gunicorn.conf.py main:app       # WEB_CONCURRENCY=N (padrão: núcleos)
+
+Cada worker tem os próprios caches e índices em memória; services/invalidation.py os
+mantém coerentes por LISTEN/NOTIFY. Estado que precisa ser exato entre workers fica
+fora do processo: RATE_LIMIT_BACKEND=redis para os buckets e CACHE_BACKEND=redis
+opcional para o cache de respostas. Os tiles já ficam em disco (TILE_CACHE_DIR).
+As tarefas periódicas sobre tabelas inteiras (ETA, frota) rodam em um só worker,
+eleito por advisory lock (services/leader.py), que publica o resultado aos outros.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Sem preload: engine, pool de conexões e tarefas do lifespan são criados dentro de cada worker
+preload_app = False
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla os workers aos poucos (limita crescimento de memória sem reiniciar todos juntos)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
@@ -1,69 +1,86 @@
-from fastapi import FastAPI
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.sql import text
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from database import engine, Base, async_sessionmaker, get_db
-from routers import auth, products, clients, distribution, veiculos, driver, delivery, route
-from models import User
-from crud import create_user
-from database import drop_delivery_table
-from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+from services.startup_profile import startup_profile
+
+with startup_profile.phase("imports"):
+    import asyncio
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
+    from sqlalchemy.sql import text
+    from database import engine, async_sessionmaker
+    from services.compression import CompressionMiddleware
+    from services.profiling import ProfilingMiddleware, install_sql_hooks
+    from services.ratelimit import RateLimitMiddleware
+    from services import eta, fleet, invalidation, replicas
+    from services.replicas import ReadYourWritesMiddleware
+    from routers import auth, products, clients, distribution, veiculos, driver, delivery, route, reports, geo, tiles, admin, search, geofence
+    from routers import fleet as fleet_router
 
 origins = [
     "http://localhost",
     "http://localhost:5173",
     "http://127.0.0.1:5173",
 ]
-DATABASE_URL = "postgresql+asyncpg://user:password@db:5432/dbname"
-
-engine = create_async_engine(DATABASE_URL, echo=True)
 
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
 
-async def create_admin_user():
-    async for db in get_db():  
-        result = await db.execute(select(User).where(User.email == "admin@admin.com"))
-        existing_user = result.scalars().first()
-        
-        if not existing_user:  # Evita criar duplicados
-            await create_user(
-                db=db,
-                email="admin@admin.com",
-                password="123",
-                is_employee=True  
-            )
-            print("Usuário administrador criado: admin@admin.com")
-        else:
-            print("Usuário administrador já existe.")
+# O worker não faz bootstrap: migrações e usuário administrador rodam uma vez
+# por deploy com `python manage.py bootstrap`
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.startup = startup_profile.report()
+    # Recalcula em lote os ETAs das entregas em andamento (ETA_REFRESH_SECONDS=0 desliga).
+    # Com vários workers só o eleito por advisory lock calcula e publica (services/leader.py)
+    eta_task = asyncio.create_task(eta.run_eta_loop(async_sessionmaker)) if eta.ETA_REFRESH_SECONDS > 0 else None
+    # LISTEN/NOTIFY: mantém caches e índices em memória coerentes entre os workers
+    invalidation_task = invalidation.start_listener()
+    # Atraso das réplicas de leitura (só com REPLICA_URLS)
+    lag_task = replicas.start_lag_monitor()
+    # Estado da frota em memória, montado agora; o worker eleito o refaz a cada FLEET_REFRESH_SECONDS
+    fleet_task = asyncio.create_task(fleet.run_fleet_loop(async_sessionmaker))
+    yield
+    for task in (eta_task, invalidation_task, lag_task, fleet_task):
+        if task:
+            task.cancel()
+    await replicas.dispose()
+    await engine.dispose()
 
-app = FastAPI()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+with startup_profile.phase("build_app"):
+    # ORJSONResponse como padrão: serialização das respostas em orjson
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
-app.include_router(auth.router, prefix="/auth", tags=["Auth"])
-app.include_router(products.router, tags=["Products"])
-app.include_router(clients.router, tags=["Clients"])
-app.include_router(distribution.router, tags=["Distribution"])
-app.include_router(delivery.router, tags=["Delivery"])
-app.include_router(veiculos.router, tags=["Vehicle"])
-app.include_router(driver.router, tags=["Driver"])
-app.include_router(route.router, tags=["Route"])
+    # Adicionado antes do CORS para ficar dentro dele: as respostas 429/503 também levam os headers de CORS
+    app.add_middleware(RateLimitMiddleware)
+    # Escritas marcam o cliente para ler do primário por alguns segundos (leitura das próprias escritas)
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # gzip/brotli conforme o Accept-Encoding, fora do CORS para comprimir as respostas já completas
+    app.add_middleware(CompressionMiddleware)
+    # Perfilamento opcional por amostragem (PROFILE_SAMPLE_RATE) ou header X-Profile de funcionário
+    app.add_middleware(ProfilingMiddleware)
+    install_sql_hooks(engine)
 
-@app.on_event("startup")
-async def startup_event():
-    await create_tables()
-    # await drop_delivery_table(engine)
-    await create_admin_user()
+    app.include_router(auth.router, prefix="/auth", tags=["Auth"])
+    app.include_router(products.router, tags=["Products"])
+    app.include_router(clients.router, tags=["Clients"])
+    app.include_router(distribution.router, tags=["Distribution"])
+    app.include_router(delivery.router, tags=["Delivery"])
+    app.include_router(veiculos.router, tags=["Vehicle"])
+    app.include_router(driver.router, tags=["Driver"])
+    app.include_router(route.router, tags=["Route"])
+    app.include_router(reports.router, tags=["Reports"])
+    app.include_router(geo.router, tags=["Map"])
+    app.include_router(tiles.router, tags=["Map"])
+    app.include_router(search.router, tags=["Search"])
+    app.include_router(geofence.router, tags=["Geofence"])
+    app.include_router(fleet_router.router, tags=["Fleet"])
+    app.include_router(admin.router, tags=["Admin"])
 
 @app.get("/")
 async def root():
@@ -73,10 +90,13 @@ async def root():
 async def healthcheck():
     try:
         async with async_sessionmaker() as session:
-            await session.execute(text("SELECT 1"))  
+            await session.execute(text("SELECT 1"))
         return {"status": "ok", "database": "connected"}
     except Exception as e:
         return {"status": "error", "database": str(e)}
 
+# Um processo (desenvolvimento); em produção: gunicorn -c gunicorn.conf.py main:app
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,73 @@
+"""
+Comandos de administração, executados uma vez por deploy (fora dos workers da API).
+
+    python manage.py bootstrap                 # migrações + usuário administrador
+    python manage.py migrate                   # apenas alembic upgrade head
+    python manage.py create-admin --email x --password y
+    python manage.py compact-tracks            # compacta o histórico de posições antigo
+"""
+import argparse
+import asyncio
+import os
+from sqlalchemy.future import select
+from database import async_sessionmaker, engine
+from models import User
+
+ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@admin.com")
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "123")
+
+
+def migrate():
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(os.path.join(os.path.dirname(__file__), "alembic.ini")), "head")
+
+
+async def create_admin_user(email: str = ADMIN_EMAIL, password: str = ADMIN_PASSWORD):
+    from crud import create_user
+
+    async with async_sessionmaker() as db:
+        result = await db.execute(select(User).where(User.email == email))
+        existing_user = result.scalars().first()
+
+        if not existing_user:  # Evita criar duplicados
+            await create_user(db=db, email=email, password=password, is_employee=True)
+            print(f"Usuário administrador criado: {email}")
+        else:
+            print("Usuário administrador já existe.")
+    await engine.dispose()
+
+
+async def compact_tracks():
+    from services import track
+
+    async with async_sessionmaker() as db:
+        segments = await track.compact(db)
+    print(f"{segments} trechos de trilha compactados")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Administração do backend")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("bootstrap", help="Aplica as migrações e cria o administrador")
+    subparsers.add_parser("migrate", help="Aplica as migrações pendentes")
+    admin = subparsers.add_parser("create-admin", help="Cria o usuário administrador")
+    admin.add_argument("--email", default=ADMIN_EMAIL)
+    admin.add_argument("--password", default=ADMIN_PASSWORD)
+    subparsers.add_parser("compact-tracks", help="Compacta o histórico de posições antigo em trilhas")
+    args = parser.parse_args()
+
+    if args.command in ("bootstrap", "migrate"):
+        migrate()
+    if args.command == "bootstrap":
+        asyncio.run(create_admin_user())
+    elif args.command == "create-admin":
+        asyncio.run(create_admin_user(args.email, args.password))
+    elif args.command == "compact-tracks":
+        asyncio.run(compact_tracks())
+
+
+if __name__ == "__main__":
+    main()
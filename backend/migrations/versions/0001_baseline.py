@@ -0,0 +1,146 @@
+"""baseline: schema que o create_all criava na inicialização, antes das migrações
+
+Bancos já criados pelo create_all devem ser marcados com
+`alembic stamp 0001_baseline` antes do primeiro `alembic upgrade head`.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "Usuario",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("is_client", sa.Boolean()),
+        sa.Column("is_driver", sa.Boolean()),
+        sa.Column("is_employee", sa.Boolean()),
+        sa.Column("email", sa.String()),
+        sa.Column("password_hash", sa.String()),
+        sa.Column("salt", sa.String()),
+    )
+    op.create_index("ix_Usuario_id", "Usuario", ["id"])
+
+    op.create_table(
+        "Cliente",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String()),
+        sa.Column("end_rua", sa.String()),
+        sa.Column("end_bairro", sa.String()),
+        sa.Column("end_numero", sa.Integer()),
+        sa.Column("telefone", sa.Integer()),
+        sa.Column("fk_id_usuario", sa.Integer(), sa.ForeignKey("Usuario.id")),
+    )
+    op.create_index("ix_Cliente_id", "Cliente", ["id"])
+    op.create_index("ix_Cliente_nome", "Cliente", ["nome"])
+
+    op.create_table(
+        "Produto",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String()),
+        sa.Column("descricao", sa.String()),
+        sa.Column("preco", sa.Integer()),
+        sa.Column("quantidade_estoque", sa.Integer()),
+        sa.Column("fk_id_cliente", sa.Integer(), sa.ForeignKey("Cliente.id")),
+    )
+    op.create_index("ix_Produto_id", "Produto", ["id"])
+
+    op.create_table(
+        "LocalizacaoVeiculo",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("latitude", sa.Float()),
+        sa.Column("longitude", sa.Float()),
+        sa.Column("data_hora", sa.Date()),
+    )
+    op.create_index("ix_LocalizacaoVeiculo_id", "LocalizacaoVeiculo", ["id"])
+
+    op.create_table(
+        "Veiculo",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("placa", sa.String()),
+        sa.Column("modelo", sa.String()),
+        sa.Column("capacidade", sa.Integer()),
+        sa.Column("fk_id_localizacao", sa.Integer(), sa.ForeignKey("LocalizacaoVeiculo.id")),
+        sa.Column("is_available", sa.Boolean()),
+    )
+    op.create_index("ix_Veiculo_id", "Veiculo", ["id"])
+    op.create_index("ix_Veiculo_placa", "Veiculo", ["placa"])
+
+    op.create_table(
+        "Motorista",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String()),
+        sa.Column("habilitacao", sa.String()),
+        sa.Column("telefone", sa.Integer()),
+        sa.Column("end_rua", sa.String()),
+        sa.Column("end_bairro", sa.String()),
+        sa.Column("end_numero", sa.Integer()),
+        sa.Column("fk_id_usuario", sa.Integer(), sa.ForeignKey("Usuario.id")),
+        sa.Column("fk_id_veiculo", sa.Integer(), sa.ForeignKey("Veiculo.id")),
+    )
+    op.create_index("ix_Motorista_id", "Motorista", ["id"])
+
+    op.create_table(
+        "PontoDistribuicao",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String()),
+        sa.Column("end_rua", sa.String()),
+        sa.Column("end_bairro", sa.String()),
+        sa.Column("end_numero", sa.Integer()),
+        sa.Column("tipo", sa.String()),
+    )
+    op.create_index("ix_PontoDistribuicao_id", "PontoDistribuicao", ["id"])
+
+    op.create_table(
+        "Entrega",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fk_id_veiculo", sa.Integer(), sa.ForeignKey("Veiculo.id"), nullable=True),
+        sa.Column("fk_id_produto", sa.Integer(), sa.ForeignKey("Produto.id")),
+        sa.Column("fk_id_ponto_entrega", sa.Integer(), sa.ForeignKey("PontoDistribuicao.id")),
+        sa.Column("status", sa.String()),
+        sa.Column("is_delivered", sa.Boolean()),
+        sa.Column("data_criacao", sa.DateTime(), nullable=True),
+        sa.Column("data_entrega", sa.Date(), nullable=True),
+    )
+    op.create_index("ix_Entrega_id", "Entrega", ["id"])
+
+    op.create_table(
+        "Rota",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("origem", sa.String(), nullable=False),
+        sa.Column("destino", sa.String(), nullable=False),
+        sa.Column("distancia_km", sa.Float()),
+        sa.Column("tempo_estimado", sa.Integer()),
+        sa.Column("fk_id_entrega", sa.Integer(), sa.ForeignKey("Entrega.id")),
+    )
+    op.create_index("ix_Rota_id", "Rota", ["id"])
+
+    op.create_table(
+        "Funcionario",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String()),
+        sa.Column("end_rua", sa.String()),
+        sa.Column("end_bairro", sa.String()),
+        sa.Column("end_numero", sa.Integer()),
+        sa.Column("telefone", sa.Integer()),
+        sa.Column("area", sa.String()),
+        sa.Column("fk_id_usuario", sa.Integer(), sa.ForeignKey("Usuario.id")),
+    )
+    op.create_index("ix_Funcionario_id", "Funcionario", ["id"])
+    op.create_index("ix_Funcionario_nome", "Funcionario", ["nome"])
+
+
+def downgrade():
+    for table in (
+        "Funcionario", "Rota", "Entrega", "PontoDistribuicao", "Motorista", "Veiculo",
+        "LocalizacaoVeiculo", "Produto", "Cliente", "Usuario",
+    ):
+        op.drop_table(table)
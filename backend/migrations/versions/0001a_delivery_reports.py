@@ -0,0 +1,47 @@
+"""Entrega.data_entrega com hora e tabelas de rollup diário dos relatórios
+
+data_entrega passa de date para timestamp para o tempo de entrega manter a hora;
+valores antigos viram meia-noite do mesmo dia. Os rollups (services/rollups.py)
+começam vazios: POST /reports/rebuild os preenche a partir de Entrega.
+
+Revision ID: 0001a_delivery_reports
+Revises: 0001_baseline
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001a_delivery_reports"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+# tabela -> coluna da chave além do dia
+ROLLUPS = {
+    "RelatorioEntregaVeiculoDia": ("fk_id_veiculo", "Veiculo.id"),
+    "RelatorioEntregaPontoDia": ("fk_id_ponto_entrega", "PontoDistribuicao.id"),
+}
+
+
+def upgrade():
+    op.alter_column("Entrega", "data_entrega", type_=sa.DateTime(), existing_nullable=True)
+
+    # Bancos criados pelo create_all depois dessa mudança nos models já têm as tabelas
+    for table, (column, target) in ROLLUPS.items():
+        op.create_table(
+            table,
+            sa.Column(column, sa.Integer(), sa.ForeignKey(target), primary_key=True),
+            sa.Column("dia", sa.Date(), primary_key=True),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("entregues", sa.Integer(), nullable=False),
+            sa.Column("pendentes", sa.Integer(), nullable=False),
+            sa.Column("soma_tempo_entrega_s", sa.Float(), nullable=False),
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    for table in reversed(list(ROLLUPS)):
+        op.drop_table(table)
+    # Perde a hora da entrega
+    op.alter_column("Entrega", "data_entrega", type_=sa.Date(), existing_nullable=True)
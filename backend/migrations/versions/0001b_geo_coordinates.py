@@ -0,0 +1,44 @@
+"""coordenadas de Cliente e PontoDistribuicao e índices (latitude, longitude) para o mapa
+
+As colunas são geocodificadas no cadastro (services/geo.py). IF NOT EXISTS em
+tudo: bancos criados pelo create_all depois dessa mudança nos models já as têm.
+Os índices são criados com CREATE INDEX CONCURRENTLY, sem bloquear escritas.
+
+Revision ID: 0001b_geo_coordinates
+Revises: 0001a_delivery_reports
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0001b_geo_coordinates"
+down_revision = "0001a_delivery_reports"
+branch_labels = None
+depends_on = None
+
+COORDINATE_TABLES = ["Cliente", "PontoDistribuicao"]
+LAT_LON_INDEXES = ["Cliente", "PontoDistribuicao", "LocalizacaoVeiculo"]
+
+
+def upgrade():
+    for table in COORDINATE_TABLES:
+        op.execute(
+            f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS latitude double precision, '
+            'ADD COLUMN IF NOT EXISTS longitude double precision'
+        )
+
+    # CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        for table in LAT_LON_INDEXES:
+            op.create_index(
+                f"ix_{table}_lat_lon", table, ["latitude", "longitude"],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in reversed(LAT_LON_INDEXES):
+            op.drop_index(f"ix_{table}_lat_lon", table_name=table, postgresql_concurrently=True, if_exists=True)
+    for table in reversed(COORDINATE_TABLES):
+        op.drop_column(table, "longitude")
+        op.drop_column(table, "latitude")
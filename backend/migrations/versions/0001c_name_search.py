@@ -0,0 +1,43 @@
+"""pg_trgm e índices de busca por nome em Cliente e Produto
+
+GIN com gin_trgm_ops para a busca aproximada e B-tree em lower(nome) com
+text_pattern_ops para o autocomplete por prefixo (services/search.py). Criados
+com CREATE INDEX CONCURRENTLY, sem bloquear escritas; se um build concorrente
+falhar, o índice fica INVALID e deve ser removido antes de repetir o upgrade.
+
+Revision ID: 0001c_name_search
+Revises: 0001b_geo_coordinates
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0001c_name_search"
+down_revision = "0001b_geo_coordinates"
+branch_labels = None
+depends_on = None
+
+TABLES = ["Cliente", "Produto"]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f"ix_{table}_nome_trgm", table, ["nome"],
+                postgresql_using="gin", postgresql_ops={"nome": "gin_trgm_ops"},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_{table}_nome_prefix" '
+                f'ON "{table}" (lower(nome) text_pattern_ops)'
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f"ix_{table}_nome_prefix", table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.drop_index(f"ix_{table}_nome_trgm", table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,50 @@
+"""índices nas chaves estrangeiras filtradas e índice único em Usuario.email
+
+Criados com CREATE INDEX CONCURRENTLY (fora de transação), sem bloquear
+escritas nas tabelas durante a criação. Se já existirem e-mails duplicados
+em Usuario, o índice único falha e os duplicados devem ser resolvidos antes.
+
+Revision ID: 0002_lookup_indexes
+Revises: 0001c_name_search
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0002_lookup_indexes"
+down_revision = "0001c_name_search"
+branch_labels = None
+depends_on = None
+
+# (tabela, coluna) -> ix_<tabela>_<coluna>, o mesmo nome gerado por index=True nos models
+INDEXES = [
+    ("Entrega", "fk_id_veiculo"),
+    ("Entrega", "fk_id_produto"),
+    ("Entrega", "fk_id_ponto_entrega"),
+    ("Produto", "fk_id_cliente"),
+    ("Motorista", "fk_id_usuario"),
+    ("Motorista", "fk_id_veiculo"),
+    ("Cliente", "fk_id_usuario"),
+    ("Funcionario", "fk_id_usuario"),
+    ("Rota", "fk_id_entrega"),
+]
+
+
+def upgrade():
+    # CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        for table, column in INDEXES:
+            op.create_index(
+                f"ix_{table}_{column}", table, [column],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+        op.create_index(
+            "ix_Usuario_email", "Usuario", ["email"], unique=True,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_Usuario_email", table_name="Usuario", postgresql_concurrently=True, if_exists=True)
+        for table, column in reversed(INDEXES):
+            op.drop_index(f"ix_{table}_{column}", table_name=table, postgresql_concurrently=True, if_exists=True)
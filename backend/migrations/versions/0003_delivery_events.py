@@ -0,0 +1,48 @@
+"""histórico de status das entregas (EventoEntrega) e correção de dados legados
+
+Normaliza o status antigo "Em processo" para "in_progress", preenche
+is_delivered das entregas já entregues e libera os veículos que ficaram
+presos com is_available = false sem nenhuma entrega ativa.
+
+Revision ID: 0003_delivery_events
+Revises: 0002_lookup_indexes
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_delivery_events"
+down_revision = "0002_lookup_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "EventoEntrega",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fk_id_entrega", sa.Integer(), sa.ForeignKey("Entrega.id"), nullable=False),
+        sa.Column("status_anterior", sa.String(), nullable=True),
+        sa.Column("status_novo", sa.String(), nullable=False),
+        sa.Column("chave_idempotencia", sa.String(), nullable=True),
+        sa.Column("fk_id_usuario", sa.Integer(), sa.ForeignKey("Usuario.id"), nullable=True),
+        sa.Column("criado_em", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("fk_id_entrega", "chave_idempotencia", name="uq_EventoEntrega_chave"),
+    )
+    op.create_index("ix_EventoEntrega_fk_id_entrega", "EventoEntrega", ["fk_id_entrega"])
+
+    op.execute("""UPDATE "Entrega" SET status = 'in_progress' WHERE status = 'Em processo'""")
+    op.execute("""UPDATE "Entrega" SET is_delivered = true WHERE status = 'delivered' AND is_delivered IS DISTINCT FROM true""")
+    op.execute("""
+        UPDATE "Veiculo" v SET is_available = true
+        WHERE v.is_available = false
+          AND NOT EXISTS (
+              SELECT 1 FROM "Entrega" e
+              WHERE e.fk_id_veiculo = v.id AND e.status IN ('pending', 'in_progress', 'in_transit')
+          )
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_EventoEntrega_fk_id_entrega", table_name="EventoEntrega")
+    op.drop_table("EventoEntrega")
@@ -0,0 +1,35 @@
+"""tabela Outbox para trabalhos assíncronos executados pelo worker
+
+Revision ID: 0004_outbox
+Revises: 0003_delivery_events
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_outbox"
+down_revision = "0003_delivery_events"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "Outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tipo", sa.String(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("tentativas", sa.Integer(), nullable=False),
+        sa.Column("max_tentativas", sa.Integer(), nullable=False),
+        sa.Column("disponivel_em", sa.DateTime(), nullable=False),
+        sa.Column("criado_em", sa.DateTime(), nullable=False),
+        sa.Column("concluido_em", sa.DateTime(), nullable=True),
+        sa.Column("ultimo_erro", sa.String(), nullable=True),
+    )
+    op.create_index("ix_Outbox_status_disponivel_em", "Outbox", ["status", "disponivel_em"])
+
+
+def downgrade():
+    op.drop_index("ix_Outbox_status_disponivel_em", table_name="Outbox")
+    op.drop_table("Outbox")
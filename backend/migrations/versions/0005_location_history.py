@@ -0,0 +1,34 @@
+"""histórico de posições dos veículos (HistoricoLocalizacao) para os perfis de velocidade do ETA
+
+Revision ID: 0005_location_history
+Revises: 0004_outbox
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_location_history"
+down_revision = "0004_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "HistoricoLocalizacao",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fk_id_veiculo", sa.Integer(), sa.ForeignKey("Veiculo.id"), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.Column("registrado_em", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_HistoricoLocalizacao_veiculo_registrado_em", "HistoricoLocalizacao", ["fk_id_veiculo", "registrado_em"]
+    )
+    op.create_index("ix_HistoricoLocalizacao_registrado_em", "HistoricoLocalizacao", ["registrado_em"])
+
+
+def downgrade():
+    op.drop_index("ix_HistoricoLocalizacao_registrado_em", table_name="HistoricoLocalizacao")
+    op.drop_index("ix_HistoricoLocalizacao_veiculo_registrado_em", table_name="HistoricoLocalizacao")
+    op.drop_table("HistoricoLocalizacao")
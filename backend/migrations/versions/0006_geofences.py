@@ -0,0 +1,39 @@
+"""geocercas dos pontos de distribuição (raio_m, poligono) e tabela EventoGeocerca
+
+Revision ID: 0006_geofences
+Revises: 0005_location_history
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_geofences"
+down_revision = "0005_location_history"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("PontoDistribuicao", sa.Column("raio_m", sa.Float(), nullable=True))
+    op.add_column("PontoDistribuicao", sa.Column("poligono", sa.JSON(), nullable=True))
+
+    op.create_table(
+        "EventoGeocerca",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fk_id_veiculo", sa.Integer(), sa.ForeignKey("Veiculo.id"), nullable=False),
+        sa.Column("fk_id_ponto", sa.Integer(), sa.ForeignKey("PontoDistribuicao.id"), nullable=False),
+        sa.Column("tipo", sa.String(), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.Column("registrado_em", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_EventoGeocerca_veiculo_registrado_em", "EventoGeocerca", ["fk_id_veiculo", "registrado_em"])
+    op.create_index("ix_EventoGeocerca_fk_id_ponto", "EventoGeocerca", ["fk_id_ponto"])
+
+
+def downgrade():
+    op.drop_index("ix_EventoGeocerca_fk_id_ponto", table_name="EventoGeocerca")
+    op.drop_index("ix_EventoGeocerca_veiculo_registrado_em", table_name="EventoGeocerca")
+    op.drop_table("EventoGeocerca")
+    op.drop_column("PontoDistribuicao", "poligono")
+    op.drop_column("PontoDistribuicao", "raio_m")
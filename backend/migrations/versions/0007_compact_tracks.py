@@ -0,0 +1,35 @@
+"""trilhas compactadas dos veículos (TrilhaCompactada)
+
+Revision ID: 0007_compact_tracks
+Revises: 0006_geofences
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_compact_tracks"
+down_revision = "0006_geofences"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "TrilhaCompactada",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fk_id_veiculo", sa.Integer(), sa.ForeignKey("Veiculo.id"), nullable=False),
+        sa.Column("inicio", sa.DateTime(), nullable=False),
+        sa.Column("fim", sa.DateTime(), nullable=False),
+        sa.Column("pontos_originais", sa.Integer(), nullable=False),
+        sa.Column("pontos", sa.Integer(), nullable=False),
+        sa.Column("tolerancia_m", sa.Float(), nullable=False),
+        sa.Column("map_matched", sa.Boolean(), nullable=False),
+        sa.Column("polyline", sa.String(), nullable=False),
+        sa.Column("dados", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("ix_TrilhaCompactada_veiculo_inicio", "TrilhaCompactada", ["fk_id_veiculo", "inicio"])
+
+
+def downgrade():
+    op.drop_index("ix_TrilhaCompactada_veiculo_inicio", table_name="TrilhaCompactada")
+    op.drop_table("TrilhaCompactada")
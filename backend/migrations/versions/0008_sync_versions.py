@@ -0,0 +1,59 @@
+"""versões de sincronização (versao) em Entrega, Rota e EventoEntrega
+
+Revision ID: 0008_sync_versions
+Revises: 0007_compact_tracks
+Create Date: 2026-10-19
+
+Uma sequência global numera cada escrita: o INSERT recebe o próximo valor pelo default
+da coluna e o UPDATE pelo gatilho sync_bump_versao, então qualquer caminho de escrita
+(ORM, UPDATE condicional do ciclo de vida, geocercas) avança a versão.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_sync_versions"
+down_revision = "0007_compact_tracks"
+branch_labels = None
+depends_on = None
+
+TABLES = ("Entrega", "Rota", "EventoEntrega")
+UPDATED_TABLES = ("Entrega", "Rota")  # EventoEntrega é append-only
+
+
+def upgrade():
+    op.execute("CREATE SEQUENCE sync_versao_seq")
+    for table in TABLES:
+        # As linhas existentes recebem versões na ordem de regravação da tabela
+        op.add_column(table, sa.Column(
+            "versao", sa.BigInteger(), nullable=False, server_default=sa.text("nextval('sync_versao_seq')"),
+        ))
+
+    op.execute("""
+        CREATE FUNCTION sync_bump_versao() RETURNS trigger AS $$
+        BEGIN
+            NEW.versao := nextval('sync_versao_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in UPDATED_TABLES:
+        op.execute(
+            f'CREATE TRIGGER "trg_{table}_versao" BEFORE UPDATE ON "{table}" '
+            f"FOR EACH ROW EXECUTE FUNCTION sync_bump_versao()"
+        )
+
+    op.create_index("ix_Entrega_veiculo_versao", "Entrega", ["fk_id_veiculo", "versao"])
+    op.create_index("ix_Rota_versao", "Rota", ["versao"])
+    op.create_index("ix_EventoEntrega_versao", "EventoEntrega", ["versao"])
+
+
+def downgrade():
+    op.drop_index("ix_EventoEntrega_versao", table_name="EventoEntrega")
+    op.drop_index("ix_Rota_versao", table_name="Rota")
+    op.drop_index("ix_Entrega_veiculo_versao", table_name="Entrega")
+    for table in UPDATED_TABLES:
+        op.execute(f'DROP TRIGGER "trg_{table}_versao" ON "{table}"')
+    op.execute("DROP FUNCTION sync_bump_versao()")
+    for table in TABLES:
+        op.drop_column(table, "versao")
+    op.execute("DROP SEQUENCE sync_versao_seq")
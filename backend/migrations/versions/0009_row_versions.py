@@ -0,0 +1,56 @@
+"""versões de linha (versao, atualizado_em) em Cliente, Produto, Veiculo e PontoDistribuicao
+
+Revision ID: 0009_row_versions
+Revises: 0008_sync_versions
+Create Date: 2026-10-19
+
+Validadores HTTP (ETag/Last-Modified) das listas cacheadas: a maior `versao` das
+tabelas de uma lista muda a cada escrita, em qualquer worker. A versão vem da mesma
+sequência da sincronização do motorista; `atualizado_em` é o instante da escrita
+(clock_timestamp, não o início da transação).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_row_versions"
+down_revision = "0008_sync_versions"
+branch_labels = None
+depends_on = None
+
+TABLES = ("Cliente", "Produto", "Veiculo", "PontoDistribuicao")
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column(
+            "versao", sa.BigInteger(), nullable=False, server_default=sa.text("nextval('sync_versao_seq')"),
+        ))
+        op.add_column(table, sa.Column(
+            "atualizado_em", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', clock_timestamp())"),
+        ))
+        op.create_index(f"ix_{table}_versao", table, ["versao"])
+
+    op.execute("""
+        CREATE FUNCTION bump_versao_atualizado_em() RETURNS trigger AS $$
+        BEGIN
+            NEW.versao := nextval('sync_versao_seq');
+            NEW.atualizado_em := timezone('utc', clock_timestamp());
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.execute(
+            f'CREATE TRIGGER "trg_{table}_versao" BEFORE UPDATE ON "{table}" '
+            f"FOR EACH ROW EXECUTE FUNCTION bump_versao_atualizado_em()"
+        )
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER "trg_{table}_versao" ON "{table}"')
+    op.execute("DROP FUNCTION bump_versao_atualizado_em()")
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_versao", table_name=table)
+        op.drop_column(table, "atualizado_em")
+        op.drop_column(table, "versao")
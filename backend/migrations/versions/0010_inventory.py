@@ -0,0 +1,61 @@
+"""estoque em shards (EstoqueShard), reservas por entrega (ReservaEstoque) e Entrega.quantidade
+
+Revision ID: 0010_inventory
+Revises: 0009_row_versions
+Create Date: 2026-10-19
+
+O saldo de cada produto é dividido em SHARDS linhas; as reservas decrementam uma delas
+com UPDATE condicional (services/inventory.py). Os produtos existentes recebem o
+quantidade_estoque atual como saldo, e as entregas existentes a quantidade_estoque
+do produto como quantidade (era a carga exigida do veículo).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_inventory"
+down_revision = "0009_row_versions"
+branch_labels = None
+depends_on = None
+
+SHARDS = 8  # STOCK_SHARDS padrão; o serviço trabalha com os shards que existirem
+
+
+def upgrade():
+    op.create_table(
+        "EstoqueShard",
+        sa.Column("fk_id_produto", sa.Integer(), sa.ForeignKey("Produto.id"), primary_key=True),
+        sa.Column("shard", sa.Integer(), primary_key=True),
+        sa.Column("quantidade", sa.Integer(), nullable=False, server_default="0"),
+        sa.CheckConstraint("quantidade >= 0", name="ck_EstoqueShard_quantidade"),
+    )
+    op.create_table(
+        "ReservaEstoque",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fk_id_entrega", sa.Integer(), sa.ForeignKey("Entrega.id"), nullable=False),
+        sa.Column("fk_id_produto", sa.Integer(), sa.ForeignKey("Produto.id"), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("quantidade", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("criado_em", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_ReservaEstoque_fk_id_entrega", "ReservaEstoque", ["fk_id_entrega"])
+    op.add_column("Entrega", sa.Column("quantidade", sa.Integer(), nullable=True))
+
+    op.execute(f"""
+        INSERT INTO "EstoqueShard" (fk_id_produto, shard, quantidade)
+        SELECT p.id, s.shard,
+               GREATEST(COALESCE(p.quantidade_estoque, 0), 0) / {SHARDS}
+               + CASE WHEN s.shard < GREATEST(COALESCE(p.quantidade_estoque, 0), 0) % {SHARDS} THEN 1 ELSE 0 END
+        FROM "Produto" p CROSS JOIN generate_series(0, {SHARDS - 1}) AS s(shard)
+    """)
+    op.execute("""
+        UPDATE "Entrega" e SET quantidade = p.quantidade_estoque
+        FROM "Produto" p WHERE e.fk_id_produto = p.id
+    """)
+
+
+def downgrade():
+    op.drop_column("Entrega", "quantidade")
+    op.drop_index("ix_ReservaEstoque_fk_id_entrega", table_name="ReservaEstoque")
+    op.drop_table("ReservaEstoque")
+    op.drop_table("EstoqueShard")
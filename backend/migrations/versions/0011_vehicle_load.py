@@ -0,0 +1,39 @@
+"""carga atual do veículo (Veiculo.carga)
+
+Revision ID: 0011_vehicle_load
+Revises: 0010_inventory
+Create Date: 2026-10-19
+
+O veículo passa a aceitar entregas enquanto a carga somada couber na capacidade, em vez
+de ficar indisponível na primeira. A carga inicial é a soma das quantidades das entregas
+ativas; is_available passa a indicar capacidade restante.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_vehicle_load"
+down_revision = "0010_inventory"
+branch_labels = None
+depends_on = None
+
+# delivery_lifecycle.ACTIVE no momento da migração
+ACTIVE = ("pending", "in_progress", "in_transit", "arrived", "Em processo")
+
+
+def upgrade():
+    op.add_column("Veiculo", sa.Column("carga", sa.Integer(), nullable=False, server_default="0"))
+    active = ", ".join(f"'{status}'" for status in ACTIVE)
+    op.execute(f"""
+        UPDATE "Veiculo" v SET carga = a.carga
+        FROM (
+            SELECT fk_id_veiculo, SUM(COALESCE(quantidade, 0)) AS carga
+            FROM "Entrega" WHERE status IN ({active}) AND fk_id_veiculo IS NOT NULL
+            GROUP BY fk_id_veiculo
+        ) a
+        WHERE v.id = a.fk_id_veiculo
+    """)
+    op.execute('UPDATE "Veiculo" SET is_available = carga < capacidade WHERE capacidade IS NOT NULL')
+
+
+def downgrade():
+    op.drop_column("Veiculo", "carga")
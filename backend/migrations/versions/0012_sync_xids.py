@@ -0,0 +1,67 @@
+"""transação de escrita (xid_escrita) em Entrega, Rota e EventoEntrega
+
+Revision ID: 0012_sync_xids
+Revises: 0011_vehicle_load
+Create Date: 2026-10-19
+
+O cursor da sincronização do motorista passa a ser um xid: `versao` é atribuída na
+escrita, não no commit, e uma transação lenta pode confirmar uma versão abaixo de um
+cursor já entregue. Com o xid de quem escreveu em cada linha, o cursor é o xmin do
+snapshot da leitura (services/driver_sync.py): toda transação ainda em andamento tem
+xid maior ou igual a ele. O gatilho da 0008 passa a gravar também o xid no UPDATE.
+Requer Postgres 13+ (xid8).
+"""
+from alembic import op
+
+revision = "0012_sync_xids"
+down_revision = "0011_vehicle_load"
+branch_labels = None
+depends_on = None
+
+TABLES = ("Entrega", "Rota", "EventoEntrega")
+# (índice, tabela, colunas)
+INDEXES = [
+    ("ix_Entrega_veiculo_xid", "Entrega", ["fk_id_veiculo", "xid_escrita"]),
+    ("ix_Rota_xid", "Rota", ["xid_escrita"]),
+    ("ix_EventoEntrega_xid", "EventoEntrega", ["xid_escrita"]),
+]
+
+
+def upgrade():
+    for table in TABLES:
+        # As linhas existentes ficam com o xid da migração: a próxima sincronização de cada app as reenvia
+        op.execute(
+            f'ALTER TABLE "{table}" ADD COLUMN xid_escrita xid8 NOT NULL DEFAULT pg_current_xact_id()'
+        )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sync_bump_versao() RETURNS trigger AS $$
+        BEGIN
+            NEW.versao := nextval('sync_versao_seq');
+            NEW.xid_escrita := pg_current_xact_id();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    # CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sync_bump_versao() RETURNS trigger AS $$
+        BEGIN
+            NEW.versao := nextval('sync_versao_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.drop_column(table, "xid_escrita")
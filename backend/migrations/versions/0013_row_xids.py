@@ -0,0 +1,61 @@
+"""transação de escrita (xid_escrita) em Cliente, Produto, Veiculo e PontoDistribuicao
+
+Revision ID: 0013_row_xids
+Revises: 0012_sync_xids
+Create Date: 2026-10-19
+
+Validadores HTTP das listas (services/row_versions.py): como no cursor da 0012, `versao`
+é atribuída na escrita e uma transação lenta pode confirmar abaixo do máximo já visto,
+sem mudar o ETag. O maior xid de escrita só serve de validador quando está abaixo do
+xmin do snapshot: toda transação ainda em andamento confirma com xid maior. O gatilho
+da 0009 passa a gravar também o xid no UPDATE. Requer Postgres 13+ (xid8).
+"""
+from alembic import op
+
+revision = "0013_row_xids"
+down_revision = "0012_sync_xids"
+branch_labels = None
+depends_on = None
+
+TABLES = ("Cliente", "Produto", "Veiculo", "PontoDistribuicao")
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute(
+            f'ALTER TABLE "{table}" ADD COLUMN xid_escrita xid8 NOT NULL DEFAULT pg_current_xact_id()'
+        )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_versao_atualizado_em() RETURNS trigger AS $$
+        BEGIN
+            NEW.versao := nextval('sync_versao_seq');
+            NEW.atualizado_em := timezone('utc', clock_timestamp());
+            NEW.xid_escrita := pg_current_xact_id();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    # CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(f"ix_{table}_xid", table, ["xid_escrita"], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f"ix_{table}_xid", table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_versao_atualizado_em() RETURNS trigger AS $$
+        BEGIN
+            NEW.versao := nextval('sync_versao_seq');
+            NEW.atualizado_em := timezone('utc', clock_timestamp());
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.drop_column(table, "xid_escrita")
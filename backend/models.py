@@ -1,8 +1,44 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, Date, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, BigInteger, CheckConstraint, String, Boolean, Float, Date, ForeignKey, DateTime, Index, UniqueConstraint, JSON, LargeBinary, FetchedValue, func, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import UserDefinedType
 from database import Base
 from datetime import datetime
 
+
+def sync_version_column(updated: bool = True):
+    """Versão de sincronização (sequência sync_versao_seq; o gatilho da migração 0008 avança no UPDATE)."""
+    return Column(
+        BigInteger, nullable=False,
+        server_default=text("nextval('sync_versao_seq')"),
+        server_onupdate=FetchedValue() if updated else None,
+    )
+
+
+def updated_at_column():
+    """Instante da última escrita (UTC), gravado pelo gatilho da migração 0009."""
+    return Column(
+        DateTime, nullable=False,
+        server_default=text("timezone('utc', clock_timestamp())"),
+        server_onupdate=FetchedValue(),
+    )
+
+
+class XID8(UserDefinedType):
+    """xid8 do Postgres; não tem cast direto de/para bigint (services/driver_sync.py passa por text)."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "xid8"
+
+
+def sync_xid_column(updated: bool = True):
+    """Transação que escreveu a linha (migrações 0012 e 0013; os gatilhos da 0008 e da 0009 gravam no UPDATE)."""
+    return Column(
+        XID8, nullable=False,
+        server_default=text("pg_current_xact_id()"),
+        server_onupdate=FetchedValue() if updated else None,
+    )
+
 class User(Base):
     __tablename__ = "Usuario"
     
@@ -10,7 +46,7 @@ class User(Base):
     is_client = Column(Boolean)
     is_driver = Column(Boolean)
     is_employee = Column(Boolean)
-    email = Column(String)
+    email = Column(String, unique=True, index=True)
     password_hash = Column(String)
     salt = Column(String)
 
@@ -27,9 +63,20 @@ class Client(Base):
     end_bairro = Column(String)
     end_numero = Column(Integer)
     telefone = Column(Integer)
-    fk_id_usuario = Column(Integer, ForeignKey("Usuario.id"))
+    fk_id_usuario = Column(Integer, ForeignKey("Usuario.id"), index=True)
+    latitude = Column(Float, nullable=True)  # Geocodificado a partir do endereço no cadastro
+    longitude = Column(Float, nullable=True)
+    versao = sync_version_column()
+    atualizado_em = updated_at_column()
+    xid_escrita = sync_xid_column()  # Validadores HTTP das listas (services/row_versions.py)
 
     user = relationship("User", back_populates="clients")
+
+    __table_args__ = (
+        Index("ix_Cliente_lat_lon", "latitude", "longitude"),
+        # Busca aproximada por nome (pg_trgm)
+        Index("ix_Cliente_nome_trgm", "nome", postgresql_using="gin", postgresql_ops={"nome": "gin_trgm_ops"}),
+    )
     products = relationship("Product", back_populates="client")
 
 class Product(Base):
@@ -39,11 +86,43 @@ class Product(Base):
     nome = Column(String)
     descricao = Column(String)
     preco = Column(Integer)
-    quantidade_estoque = Column(Integer)
-    fk_id_cliente = Column(Integer, ForeignKey("Cliente.id"))
+    quantidade_estoque = Column(Integer)  # Estoque cadastrado; o saldo reservável fica em EstoqueShard
+    fk_id_cliente = Column(Integer, ForeignKey("Cliente.id"), index=True)
+    versao = sync_version_column()
+    atualizado_em = updated_at_column()
+    xid_escrita = sync_xid_column()  # Validadores HTTP das listas (services/row_versions.py)
 
     client = relationship("Client", back_populates="products")
     deliveries = relationship("Delivery", back_populates="product")
+
+    __table_args__ = (
+        # Busca aproximada por nome (pg_trgm)
+        Index("ix_Produto_nome_trgm", "nome", postgresql_using="gin", postgresql_ops={"nome": "gin_trgm_ops"}),
+    )
+
+class StockShard(Base):
+    """
+    Saldo disponível de um produto dividido em várias linhas (services/inventory.py), para
+    que reservas concorrentes do mesmo produto não disputem o lock de uma linha só.
+    """
+    __tablename__ = "EstoqueShard"
+    __table_args__ = (CheckConstraint("quantidade >= 0", name="ck_EstoqueShard_quantidade"),)
+
+    fk_id_produto = Column(Integer, ForeignKey("Produto.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+class StockReservation(Base):
+    """Parte do estoque reservada por uma entrega, em um shard (uma entrega pode ter várias)."""
+    __tablename__ = "ReservaEstoque"
+
+    id = Column(Integer, primary_key=True)
+    fk_id_entrega = Column(Integer, ForeignKey("Entrega.id"), nullable=False, index=True)
+    fk_id_produto = Column(Integer, ForeignKey("Produto.id"), nullable=False)
+    shard = Column(Integer, nullable=False)
+    quantidade = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="reservada")  # reservada | consumida | liberada
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
     
 class Vehicle(Base):
     __tablename__ = "Veiculo"
@@ -54,6 +133,10 @@ class Vehicle(Base):
     capacidade = Column(Integer)
     fk_id_localizacao = Column(Integer, ForeignKey("LocalizacaoVeiculo.id"))
     is_available = Column(Boolean, default=True)
+    carga = Column(Integer, nullable=False, default=0, server_default="0")  # Soma das quantidades das entregas ativas
+    versao = sync_version_column()
+    atualizado_em = updated_at_column()
+    xid_escrita = sync_xid_column()  # Validadores HTTP das listas (services/row_versions.py)
 
     drivers = relationship("Driver", back_populates="vehicle")
     location = relationship("VehicleLocation", back_populates="vehicle", foreign_keys=[fk_id_localizacao], remote_side="VehicleLocation.id", lazy="joined")
@@ -69,8 +152,8 @@ class Driver(Base):
     end_rua = Column(String)
     end_bairro = Column(String)
     end_numero = Column(Integer)
-    fk_id_usuario = Column(Integer, ForeignKey("Usuario.id"))
-    fk_id_veiculo = Column(Integer, ForeignKey("Veiculo.id"))
+    fk_id_usuario = Column(Integer, ForeignKey("Usuario.id"), index=True)
+    fk_id_veiculo = Column(Integer, ForeignKey("Veiculo.id"), index=True)
     
     user = relationship("User", back_populates="drivers")
     vehicle = relationship("Vehicle", back_populates="drivers")
@@ -84,8 +167,18 @@ class DistributionPoint(Base):
     end_bairro = Column(String)
     end_numero = Column(Integer)
     tipo = Column(String)
+    latitude = Column(Float, nullable=True)  # Geocodificado a partir do endereço no cadastro
+    longitude = Column(Float, nullable=True)
+    # Geocerca do ponto: polígono [[lon, lat], ...] quando definido, senão círculo de raio_m em volta do ponto
+    raio_m = Column(Float, nullable=True)
+    poligono = Column(JSON, nullable=True)
+    versao = sync_version_column()
+    atualizado_em = updated_at_column()
+    xid_escrita = sync_xid_column()  # Validadores HTTP das listas (services/row_versions.py)
 
     deliveries = relationship("Delivery", back_populates="distribution_point")
+
+    __table_args__ = (Index("ix_PontoDistribuicao_lat_lon", "latitude", "longitude"),)
     
 class VehicleLocation(Base):
     __tablename__ = "LocalizacaoVeiculo"
@@ -97,6 +190,40 @@ class VehicleLocation(Base):
     
     vehicle = relationship("Vehicle", back_populates="location", uselist=False)
 
+    __table_args__ = (Index("ix_LocalizacaoVeiculo_lat_lon", "latitude", "longitude"),)
+
+class LocationHistory(Base):
+    """Posições recebidas de cada veículo (LocalizacaoVeiculo guarda só a última)."""
+    __tablename__ = "HistoricoLocalizacao"
+    __table_args__ = (
+        Index("ix_HistoricoLocalizacao_veiculo_registrado_em", "fk_id_veiculo", "registrado_em"),
+        Index("ix_HistoricoLocalizacao_registrado_em", "registrado_em"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    fk_id_veiculo = Column(Integer, ForeignKey("Veiculo.id"), nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    registrado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class CompactTrack(Base):
+    """Trecho do histórico de um veículo já simplificado e codificado (services/track.py)."""
+    __tablename__ = "TrilhaCompactada"
+    __table_args__ = (
+        Index("ix_TrilhaCompactada_veiculo_inicio", "fk_id_veiculo", "inicio"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    fk_id_veiculo = Column(Integer, ForeignKey("Veiculo.id"), nullable=False)
+    inicio = Column(DateTime, nullable=False)
+    fim = Column(DateTime, nullable=False)
+    pontos_originais = Column(Integer, nullable=False)
+    pontos = Column(Integer, nullable=False)
+    tolerancia_m = Column(Float, nullable=False)
+    map_matched = Column(Boolean, nullable=False, default=False)
+    polyline = Column(String, nullable=False)  # Encoded Polyline (lat, lon)
+    dados = Column(LargeBinary, nullable=False)  # (lat, lon, epoch) em deltas zigzag-varint
+
 class Route(Base):
     __tablename__ = "Rota"
     
@@ -105,7 +232,9 @@ class Route(Base):
     destino = Column(String, nullable=False)
     distancia_km = Column(Float)
     tempo_estimado = Column(Integer)  
-    fk_id_entrega = Column(Integer, ForeignKey("Entrega.id"))
+    fk_id_entrega = Column(Integer, ForeignKey("Entrega.id"), index=True)
+    versao = sync_version_column()
+    xid_escrita = sync_xid_column()
 
     delivery = relationship("Delivery", back_populates="route")
     
@@ -113,18 +242,42 @@ class Delivery(Base):
     __tablename__ = "Entrega"
     
     id = Column(Integer, primary_key=True, index=True)
-    fk_id_veiculo = Column(Integer, ForeignKey("Veiculo.id"), nullable=True)
-    fk_id_produto = Column(Integer, ForeignKey("Produto.id"))
-    fk_id_ponto_entrega = Column(Integer, ForeignKey("PontoDistribuicao.id"))
-    status = Column(String, default="pending")  # Exemplo: "pending", "in_progress", "delivered"
+    fk_id_veiculo = Column(Integer, ForeignKey("Veiculo.id"), nullable=True, index=True)
+    fk_id_produto = Column(Integer, ForeignKey("Produto.id"), index=True)
+    fk_id_ponto_entrega = Column(Integer, ForeignKey("PontoDistribuicao.id"), index=True)
+    status = Column(String, default="pending")  # Ver services/delivery_lifecycle.py para os estados e transições
     is_delivered = Column(Boolean, default=False)
     data_criacao = Column(DateTime, default=datetime.utcnow, nullable=True)  # Data da criação
-    data_entrega = Column(Date, nullable=True)  # Data de entrega (será preenchida quando status for "delivered")
-    
+    data_entrega = Column(DateTime, nullable=True)  # Data de entrega (será preenchida quando status for "delivered")
+    quantidade = Column(Integer, nullable=True)  # Unidades do produto levadas (reservadas no estoque)
+    versao = sync_version_column()  # Sincronização incremental do app do motorista (GET /driver/sync)
+    xid_escrita = sync_xid_column()
+
     vehicle = relationship("Vehicle", back_populates="deliveries")
     product = relationship("Product", back_populates="deliveries")
     distribution_point = relationship("DistributionPoint", back_populates="deliveries")
     route = relationship("Route", back_populates="delivery")
+    events = relationship("DeliveryEvent", back_populates="delivery", order_by="DeliveryEvent.id")
+
+class DeliveryEvent(Base):
+    """Histórico append-only das mudanças de status de uma entrega."""
+    __tablename__ = "EventoEntrega"
+    __table_args__ = (
+        # Retentativas do app do motorista com a mesma chave não geram um segundo evento
+        UniqueConstraint("fk_id_entrega", "chave_idempotencia", name="uq_EventoEntrega_chave"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    fk_id_entrega = Column(Integer, ForeignKey("Entrega.id"), nullable=False, index=True)
+    status_anterior = Column(String, nullable=True)
+    status_novo = Column(String, nullable=False)
+    chave_idempotencia = Column(String, nullable=True)
+    fk_id_usuario = Column(Integer, ForeignKey("Usuario.id"), nullable=True)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    versao = sync_version_column(updated=False)
+    xid_escrita = sync_xid_column(updated=False)
+
+    delivery = relationship("Delivery", back_populates="events")
 
 class Employee(Base):
     __tablename__ = "Funcionario"
@@ -136,6 +289,69 @@ class Employee(Base):
     end_numero = Column(Integer)
     telefone = Column(Integer)
     area = Column(String)
-    fk_id_usuario = Column(Integer, ForeignKey("Usuario.id"))
+    fk_id_usuario = Column(Integer, ForeignKey("Usuario.id"), index=True)
 
     user = relationship("User", back_populates="employees")
+
+# Rollups diários de entregas (mantidos incrementalmente por services/rollups.py)
+# O dia é o da criação da entrega; a chave (fk, dia) atende direto as consultas por período.
+class DeliveryVehicleDailyRollup(Base):
+    __tablename__ = "RelatorioEntregaVeiculoDia"
+
+    fk_id_veiculo = Column(Integer, ForeignKey("Veiculo.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    entregues = Column(Integer, nullable=False, default=0)
+    pendentes = Column(Integer, nullable=False, default=0)
+    soma_tempo_entrega_s = Column(Float, nullable=False, default=0)  # soma de (data_entrega - data_criacao)
+
+class DeliveryPointDailyRollup(Base):
+    __tablename__ = "RelatorioEntregaPontoDia"
+
+    fk_id_ponto_entrega = Column(Integer, ForeignKey("PontoDistribuicao.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    entregues = Column(Integer, nullable=False, default=0)
+    pendentes = Column(Integer, nullable=False, default=0)
+    soma_tempo_entrega_s = Column(Float, nullable=False, default=0)
+
+class GeofenceEvent(Base):
+    """Entrada/saída de um veículo na geocerca de um ponto de distribuição."""
+    __tablename__ = "EventoGeocerca"
+    __table_args__ = (
+        Index("ix_EventoGeocerca_veiculo_registrado_em", "fk_id_veiculo", "registrado_em"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    fk_id_veiculo = Column(Integer, ForeignKey("Veiculo.id"), nullable=False)
+    fk_id_ponto = Column(Integer, ForeignKey("PontoDistribuicao.id"), nullable=False, index=True)
+    tipo = Column(String, nullable=False)  # arrival | departure
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    registrado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class OutboxJob(Base):
+    """
+    Trabalho pendente gravado na mesma transação da escrita que o originou
+    e executado depois pelo worker (worker.py). Ver services/outbox.py.
+    """
+    __tablename__ = "Outbox"
+    __table_args__ = (
+        # O worker busca por status e disponivel_em, na ordem de chegada
+        Index("ix_Outbox_status_disponivel_em", "status", "disponivel_em"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="pending")  # pending | running | done | dead
+    tentativas = Column(Integer, nullable=False, default=0)
+    max_tentativas = Column(Integer, nullable=False, default=5)
+    disponivel_em = Column(DateTime, nullable=False, default=datetime.utcnow)  # próxima execução (ou fim do lease quando running)
+    criado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    concluido_em = Column(DateTime, nullable=True)
+    ultimo_erro = Column(String, nullable=True)
+
+# Autocomplete por prefixo: lower(nome) LIKE 'abc%' usa B-tree com text_pattern_ops
+Index("ix_Cliente_nome_prefix", func.lower(Client.nome).label("nome_lower"), postgresql_ops={"nome_lower": "text_pattern_ops"})
+Index("ix_Produto_nome_prefix", func.lower(Product.nome).label("nome_lower"), postgresql_ops={"nome_lower": "text_pattern_ops"})
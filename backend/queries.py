@@ -0,0 +1,108 @@
+"""
+Consultas dos caminhos quentes (login, veículo do motorista, criação de entrega).
+
+As buscas simples são lambda statements: um select(...) montado a cada chamada é reconstruído e tem a chave de cache calculada
+percorrendo a árvore inteira da expressão antes de achar o SQL já compilado. Com
+lambda_stmt a construção fica em cache pelo código da lambda: nas chamadas seguintes o
+SQLAlchemy só extrai das variáveis da closure os valores dos parâmetros. Do lado do
+banco, o asyncpg prepara cada SQL uma vez por conexão (cache em database.py,
+DB_PREPARED_STATEMENT_CACHE_SIZE).
+
+Nas lambdas os valores variáveis entram apenas como variáveis da closure (viram
+parâmetros); condicionais que mudam a forma da consulta ficam fora da lambda.
+"""
+from sqlalchemy import DateTime, Integer, func, insert, lambda_stmt, literal, select, true, update
+import models
+
+
+def user_by_email(email: str):
+    return lambda_stmt(lambda: select(models.User).where(models.User.email == email))
+
+
+def vehicle_by_driver_user(user_id: int):
+    return lambda_stmt(
+        lambda: select(models.Vehicle)
+        .join(models.Driver)
+        .where(models.Driver.fk_id_usuario == user_id)
+    )
+
+
+# create_delivery: uma consulta para os dados e uma instrução para a gravação
+
+DELIVERY_CANDIDATES = 5  # veículos mais próximos tentados, em ordem, se outro pedido levar o primeiro
+
+
+def delivery_candidates(product_id: int, quantity: int = 1, limit: int = DELIVERY_CANDIDATES):
+    """
+    Produto, cliente (coordenadas e endereço) e os `limit` veículos mais próximos do
+    cliente com capacidade restante para `quantity`, numa única consulta: uma linha por candidato, uma linha com vehicle_id nulo sem
+    candidatos (ou sem coordenadas do cliente) e nenhuma linha se o produto não existe.
+    Com limit=0 traz só produto e cliente (candidatos vindos de services/fleet.py).
+    """
+    P, C, V, L = models.Product, models.Client, models.Vehicle, models.VehicleLocation
+    product = (
+        select(
+            P.id.label("product_id"), literal(quantity, Integer).label("quantidade"), C.id.label("client_id"),
+            C.latitude, C.longitude, C.end_rua, C.end_bairro, C.end_numero,
+        )
+        .outerjoin(C, P.fk_id_cliente == C.id)
+        .where(P.id == product_id)
+        .cte("product")
+    )
+    # Distância equiretangular ao quadrado: mesma ordem da haversine nas distâncias urbanas
+    dlat = L.latitude - product.c.latitude
+    dlon = (L.longitude - product.c.longitude) * func.cos(func.radians(product.c.latitude))
+    vehicles = (
+        select(V.id.label("vehicle_id"))
+        .join(L, V.fk_id_localizacao == L.id)
+        .where(
+            V.is_available == True,  # noqa: E712
+            V.capacidade - V.carga >= product.c.quantidade,
+            L.latitude.isnot(None), L.longitude.isnot(None),
+        )
+        .order_by(dlat * dlat + dlon * dlon)
+        .limit(limit)
+        .lateral("vehicles")
+    )
+    return select(product, vehicles.c.vehicle_id).outerjoin(vehicles, true())
+
+
+def insert_delivery(vehicle_id: int, product_id: int, point_id: int, quantity: int, status: str, created_at):
+    """
+    Soma a quantidade à carga do veículo (só se ainda couber na capacidade), cria a
+    entrega já com ele e o evento inicial, numa instrução só. Sem linha no resultado,
+    outro pedido ocupou a capacidade e nada foi gravado.
+    """
+    V, D, E = models.Vehicle, models.Delivery, models.DeliveryEvent
+    taken = (
+        update(V)
+        .where(V.id == vehicle_id, V.is_available == True, V.carga + quantity <= V.capacidade)  # noqa: E712
+        # No SET as colunas valem o que tinham antes do UPDATE
+        .values(carga=V.carga + quantity, is_available=V.carga + quantity < V.capacidade)
+        .returning(V.id)
+        .cte("taken")
+    )
+    delivery = (
+        insert(D)
+        .from_select(
+            ["status", "is_delivered", "fk_id_veiculo", "fk_id_produto", "fk_id_ponto_entrega", "quantidade", "data_criacao"],
+            select(
+                literal(status), literal(False), taken.c.id, literal(product_id),
+                literal(point_id), literal(quantity, Integer), literal(created_at, DateTime),
+            ),
+        )
+        .returning(
+            D.id, D.status, D.fk_id_veiculo, D.fk_id_produto, D.fk_id_ponto_entrega,
+            D.quantidade, D.data_criacao, D.data_entrega,
+        )
+        .cte("delivery")
+    )
+    event = (
+        insert(E)
+        .from_select(
+            ["fk_id_entrega", "status_novo", "criado_em"],
+            select(delivery.c.id, delivery.c.status, delivery.c.data_criacao),
+        )
+        .cte("event")
+    )
+    return select(delivery).add_cte(event)
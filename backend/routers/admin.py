@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from services import invalidation, outbox, profiling, ratelimit, replicas
+from services.cache import response_cache
+from .auth import is_employee
+
+router = APIRouter()
+
+# Métricas do cache de respostas (hits, misses, 304 e taxa de acerto por namespace)
+@router.get("/admin/cache/stats", dependencies=[Depends(is_employee)])
+async def cache_stats():
+    return response_cache.metrics()
+
+# Controle de admissão por regra: aceitas, limitadas (429), descartadas (503) e em andamento
+@router.get("/admin/ratelimit", dependencies=[Depends(is_employee)])
+async def ratelimit_stats():
+    return ratelimit.metrics()
+
+# Canal de invalidação entre workers deste processo: publicadas, recebidas, perdidas e reconexões
+@router.get("/admin/invalidation", dependencies=[Depends(is_employee)])
+async def invalidation_stats():
+    return invalidation.stats()
+
+# Réplicas de leitura: atraso medido, se estão no rodízio e leituras servidas por cada uma
+@router.get("/admin/replicas", dependencies=[Depends(is_employee)])
+async def replica_stats():
+    return replicas.stats()
+
+# Tempos das fases de inicialização deste worker (detalhados com STARTUP_PROFILE=1)
+@router.get("/admin/startup", dependencies=[Depends(is_employee)])
+async def startup_timings(request: Request):
+    return getattr(request.app.state, "startup", {})
+
+# Últimos profiles capturados pelo ProfilingMiddleware (resumo)
+@router.get("/admin/profiles", dependencies=[Depends(is_employee)])
+async def list_profiles():
+    return profiling.list_profiles()
+
+# Profile completo: árvore de chamadas e SQL executado
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(is_employee)])
+async def get_profile(profile_id: int):
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile não encontrado.")
+    return profile
+
+# Fila da outbox: contagem por status e idade do job pendente mais antigo
+@router.get("/admin/outbox", dependencies=[Depends(is_employee)])
+async def outbox_stats(db: AsyncSession = Depends(get_db)):
+    return await outbox.stats(db)
+
+# Jobs que esgotaram as tentativas (dead-letter)
+@router.get("/admin/outbox/dead", dependencies=[Depends(is_employee)])
+async def outbox_dead(limit: int = 50, db: AsyncSession = Depends(get_db)):
+    jobs = await outbox.list_dead(db, limit)
+    return [
+        {"id": job.id, "tipo": job.tipo, "payload": job.payload, "tentativas": job.tentativas,
+         "criado_em": job.criado_em, "ultimo_erro": job.ultimo_erro}
+        for job in jobs
+    ]
+
+# Devolve um job da dead-letter para a fila
+@router.post("/admin/outbox/{job_id}/retry", dependencies=[Depends(is_employee)])
+async def outbox_retry(job_id: int, db: AsyncSession = Depends(get_db)):
+    if not await outbox.retry(db, job_id):
+        raise HTTPException(status_code=404, detail="Job não encontrado na dead-letter.")
+    return {"id": job_id, "status": outbox.PENDING}
@@ -5,9 +5,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from database import get_db
-from models import User
+import queries
 from jose import JWTError
-from sqlalchemy.future import select
 from fastapi.security import OAuth2PasswordBearer
 import uuid
 import os
@@ -58,7 +57,7 @@ def decode_access_token(token: str):
 
 @router.post("/login")
 async def login(email: str, password: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == email))
+    result = await db.execute(queries.user_by_email(email))
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
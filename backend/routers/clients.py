@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
@@ -9,7 +9,8 @@ sys.path.append("backend")
 import crud
 import schemas
 import models
-from database import get_db
+from database import get_db, get_read_db
+from services.cache import response_cache
 from fastapi import APIRouter, Depends
 
 
@@ -24,9 +25,11 @@ async def create_client(client: schemas.ClientCreate, db: AsyncSession = Depends
 
 # Endpoint para listar clientes
 @router.get("/clients/", response_model=List[schemas.Client], dependencies=[Depends(is_employee)])
-async def read_clients(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    clients = await crud.get_clients(db, skip=skip, limit=limit)
-    return clients
+async def read_clients(request: Request, skip: int = 0, limit: int = 10, db: Session = Depends(get_read_db)):
+    async def load():
+        return await crud.get_clients_rows(db, skip=skip, limit=limit)
+
+    return await response_cache.respond(request, "clients", f"list:{skip}:{limit}", load, db=db)
 
 @router.get("/client/", response_model=schemas.Client, dependencies=[Depends(is_employee)])
 async def read_client(
@@ -1,18 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session, joinedload, selectinload
+from fastapi import APIRouter, HTTPException, Depends, Header
+from sqlalchemy.orm import Session
 import sys
+import asyncio
+from sqlalchemy import update
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 sys.path.append("backend")
 import crud 
 import models
+import queries
 from services.add_to_latlong import get_lat_long_from_address
-from database import get_db
-from models import Delivery, Vehicle, Product, DistributionPoint, Route, Client
-from schemas import DeliveryCreate, DeliveryResponse, DeliveryDetailsResponse
-from geopy.distance import geodesic
+from services.rollups import record_delivery_created
+from services import tile_cache, delivery_lifecycle, eta, fleet, inventory
+from services.cache import response_cache
+from database import get_db, get_read_db
+from .auth import get_current_user
+from models import Delivery, DeliveryEvent, Vehicle, Product, DistributionPoint, Route, Client
+from schemas import DeliveryCreate, DeliveryResponse, DeliveryDetailsResponse, DeliveryEventResponse, DeliveryEta
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -20,121 +26,155 @@ router = APIRouter()
 
 @router.post("/create_delivery", response_model=DeliveryResponse)
 async def create_delivery(delivery_data: DeliveryCreate, db: AsyncSession = Depends(get_db)):
-    # 1. Buscar o produto e obter o cliente relacionado
-    result = await db.execute(
-        select(Product).options(selectinload(Product.client)).where(Product.id == delivery_data.fk_id_produto)
-    )
-    product = result.scalars().first()
-
-    if not product:
+    # 1. Produto, cliente e veículos candidatos (com capacidade restante, do mais próximo) numa consulta;
+    #    com o estado da frota em memória os candidatos vêm dele e a consulta traz só produto e cliente
+    from_fleet = fleet.ready()
+    candidates_limit = 0 if from_fleet else queries.DELIVERY_CANDIDATES
+    rows = (await db.execute(queries.delivery_candidates(
+        delivery_data.fk_id_produto, delivery_data.quantidade, candidates_limit,
+    ))).all()
+    if not rows:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
-    client = product.client
-    if not client:
+    client = rows[0]
+    if client.client_id is None:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
+    quantity = delivery_data.quantidade  # Validada no schema (>= 1, padrão 1)
+
+    # 2. Coordenadas salvas no cadastro; geocodifica só se faltarem (geocodificação pendente na outbox)
+    geocoded_now = client.latitude is None or client.longitude is None
+    if geocoded_now:
+        try:
+            origin_lat, origin_lon = await asyncio.to_thread(
+                get_lat_long_from_address, client.end_rua, client.end_bairro, client.end_numero
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await db.execute(
+            update(Client).where(Client.id == client.client_id).values(latitude=origin_lat, longitude=origin_lon)
+        )
+        if not from_fleet:
+            # Sem coordenadas não havia como ordenar os veículos: repete a consulta, agora com elas
+            rows = (await db.execute(queries.delivery_candidates(delivery_data.fk_id_produto, delivery_data.quantidade))).all()
+    else:
+        origin_lat, origin_lon = client.latitude, client.longitude
 
-    # 2. Obter a localização do cliente
-    try:
-        origin_lat, origin_lon = get_lat_long_from_address(client.end_rua, client.end_bairro, client.end_numero)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-    # 3. Calcular a capacidade total necessária para a entrega
-    total_capacity_needed = product.quantidade_estoque
-
-    # 4. Buscar veículos disponíveis
-    result = await db.execute(
-        select(Vehicle)
-        .options(joinedload(Vehicle.location))  # Carregar localização junto
-        .where(Vehicle.is_available == True)
-        .filter(Vehicle.capacidade >= total_capacity_needed)
-    )
-    available_vehicles = result.scalars().all()
-
-    if not available_vehicles:
+    if from_fleet:
+        vehicle_ids = fleet.nearest(origin_lat, origin_lon, quantity, queries.DELIVERY_CANDIDATES)
+    else:
+        vehicle_ids = [row.vehicle_id for row in rows if row.vehicle_id is not None]
+    if not vehicle_ids:
         raise HTTPException(status_code=404, detail="Nenhum veículo disponível")
 
-    best_vehicle = None
-    min_distance = float('inf')
-
-    # 5. Verificar a disponibilidade de veículos e calcular a distância
-    for vehicle in available_vehicles:
-        vehicle_location = (vehicle.location.latitude, vehicle.location.longitude)
-        vehicle_distance = geodesic(vehicle_location, (origin_lat, origin_lon)).kilometers
-
-        if vehicle_distance < min_distance:
-            best_vehicle = vehicle
-            min_distance = vehicle_distance
-
-    if not best_vehicle:
-        raise HTTPException(status_code=400, detail="Nenhum veículo com capacidade suficiente encontrado")
-
-    # 6. Criar a entrega com fk_id_veiculo inicialmente como None
-    new_delivery = Delivery(
-        status="Em processo", 
-        fk_id_veiculo=None,  # Inicialmente sem veículo
-        fk_id_produto=delivery_data.fk_id_produto,
-        fk_id_ponto_entrega=delivery_data.fk_id_ponto_entrega,
-        data_criacao=datetime.utcnow()
-    )
-
-    db.add(new_delivery)
-    await db.commit()
-    await db.refresh(new_delivery)
+    # 3. Reserva o estoque antes do veículo (409 sem saldo); a ordem dos locks, estoque e
+    #    depois veículo, é a mesma do cancelamento (delivery_lifecycle)
+    pieces = await inventory.reserve(db, delivery_data.fk_id_produto, quantity)
+
+    # 4. Soma a quantidade à carga do veículo e cria a entrega com o evento inicial numa
+    #    instrução; se outro pedido ocupou a capacidade nesse meio tempo, tenta o próximo candidato
+    async def assign(vehicle_ids):
+        for vehicle_id in vehicle_ids:
+            result = await db.execute(queries.insert_delivery(
+                vehicle_id, delivery_data.fk_id_produto, delivery_data.fk_id_ponto_entrega,
+                quantity, delivery_lifecycle.IN_PROGRESS, datetime.utcnow(),
+            ))
+            delivery = result.first()
+            if delivery:
+                return delivery
+        return None
+
+    delivery = await assign(vehicle_ids)
+    if delivery is None and from_fleet:
+        # Estado da frota atrasado em relação ao banco: tenta os candidatos do banco
+        rows = (await db.execute(queries.delivery_candidates(delivery_data.fk_id_produto, delivery_data.quantidade))).all()
+        delivery = await assign([row.vehicle_id for row in rows if row.vehicle_id not in (None, *vehicle_ids)])
+    if delivery is None:
+        await db.rollback()  # Desfaz também a reserva do estoque
+        raise HTTPException(status_code=404, detail="Nenhum veículo disponível")
 
-    # 7. Atualizar a entrega com o veículo mais próximo
-    best_vehicle.is_available = False  # Marca o veículo como não disponível
-    new_delivery.fk_id_veiculo = best_vehicle.id  # Associa o veículo à entrega
+    await inventory.record_reservation(db, delivery.id, delivery_data.fk_id_produto, pieces)
+    await record_delivery_created(db, delivery)  # Atualiza os rollups na mesma transação
     await db.commit()
 
-    await db.refresh(best_vehicle)
+    if geocoded_now:
+        tile_cache.invalidate_point("clients", origin_lat, origin_lon)
+        await response_cache.invalidate("clients")
+    await response_cache.invalidate("vehicles")  # carga e is_available mudaram
+    await fleet.sync_vehicles(db, [delivery.fk_id_veiculo])
 
     return DeliveryResponse(
-        id=new_delivery.id,
-        status=new_delivery.status,
-        fk_id_veiculo=best_vehicle.id,
-        # vehicle=best_vehicle,  # Incluindo o veículo completo no retorno
-        route=None,  
-        data_criacao=new_delivery.data_criacao,
-        data_entrega=new_delivery.data_entrega  # O valor de 'data_entrega' será None, mas você pode preenchê-lo mais tarde
+        id=delivery.id,
+        status=delivery.status,
+        fk_id_veiculo=delivery.fk_id_veiculo,
+        fk_id_produto=delivery.fk_id_produto,
+        fk_id_ponto_entrega=delivery.fk_id_ponto_entrega,
+        quantidade=delivery.quantidade,
+        route=None,
+        data_criacao=delivery.data_criacao,
+        data_entrega=delivery.data_entrega,
     )
 
 
-
-
 @router.put("/update_delivery/{delivery_id}", response_model=DeliveryResponse)
-async def update_delivery_status(delivery_id: int, status: str, db: AsyncSession = Depends(get_db)):
-    # Buscar a entrega no banco
-    result = await db.execute(select(Delivery).filter(Delivery.id == delivery_id))
-    delivery = result.scalars().first()
+async def update_delivery_status(
+    delivery_id: int,
+    status: str,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    # Transição validada pela máquina de estados; retentativas com a mesma Idempotency-Key não repetem efeitos.
+    # O usuário fica registrado no EventoEntrega (trilha de auditoria)
+    delivery, applied = await delivery_lifecycle.transition(
+        db, delivery_id, status, idempotency_key, user_id=current_user["id"]
+    )
+    await db.commit()
 
-    if not delivery:
-        raise HTTPException(status_code=404, detail="Entrega não encontrada")
+    if applied:
+        if delivery.status == delivery_lifecycle.DELIVERED:
+            # O produto entregue passa a aparecer no ponto de entrega
+            point = await db.get(DistributionPoint, delivery.fk_id_ponto_entrega)
+            if point:
+                tile_cache.invalidate_point("delivered_products", point.latitude, point.longitude)
+        await response_cache.invalidate("vehicles")  # carga pode ter mudado
+        await fleet.sync_vehicles(db, [delivery.fk_id_veiculo])
 
-    # Atualizar o status
-    delivery.status = status
-    
-    # Se o status for "delivered", atualizar a data_entrega
-    if status == "delivered" and not delivery.data_entrega:
-        delivery.data_entrega = datetime.utcnow()  # Preenche a data de entrega com a hora atual
-    
-    await db.commit()
-    await db.refresh(delivery)
-    
     return DeliveryResponse(
         id=delivery.id,
         status=delivery.status,
+        is_delivered=bool(delivery.is_delivered),
         fk_id_veiculo=delivery.fk_id_veiculo,
         fk_id_produto=delivery.fk_id_produto,
         fk_id_ponto_entrega=delivery.fk_id_ponto_entrega,
+        quantidade=delivery.quantidade,
         data_criacao=delivery.data_criacao,
         data_entrega=delivery.data_entrega
     )
 
 
+@router.get("/deliveries/{delivery_id}/events", response_model=List[DeliveryEventResponse])
+async def get_delivery_events(delivery_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(DeliveryEvent).where(DeliveryEvent.fk_id_entrega == delivery_id).order_by(DeliveryEvent.id)
+    )
+    events = result.scalars().all()
+    if not events and await db.get(Delivery, delivery_id) is None:
+        raise HTTPException(status_code=404, detail="Entrega não encontrada")
+    return events
+
+
+
+@router.get("/deliveries/{delivery_id}/eta", response_model=DeliveryEta)
+async def get_delivery_eta(delivery_id: int):
+    # Lido do último ciclo do cálculo em lote (services/eta.py), sem consultar o banco
+    result = eta.get_eta(delivery_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="ETA indisponível para esta entrega")
+    return result
+
 
 @router.get("/deliveries", response_model=List[DeliveryDetailsResponse])
-async def get_deliveries(user_role: str, user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_deliveries(user_role: str, user_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Retorna entregas baseadas no papel do usuário.
     - user_role: 'motorista', 'cliente', ou 'funcionario'.
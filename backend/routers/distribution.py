@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 import crud
 import schemas
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db
+from database import get_db, get_read_db
+from services.cache import response_cache
 from .auth import is_employee
 
 router = APIRouter()
@@ -15,9 +16,11 @@ async def create_distribution_point(point: schemas.DistributionPointCreate, db:
 
 # Endpoint para listar todos os pontos de distribuição
 @router.get("/distribution_points/", response_model=List[schemas.DistributionPoint], dependencies=[Depends(is_employee)])
-async def read_distribution_points(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    points = await crud.get_distribution_points(db, skip=skip, limit=limit)
-    return points
+async def read_distribution_points(request: Request, skip: int = 0, limit: int = 10, db: Session = Depends(get_read_db)):
+    async def load():
+        return await crud.get_distribution_points_rows(db, skip=skip, limit=limit)
+
+    return await response_cache.respond(request, "distribution_points", f"list:{skip}:{limit}", load, db=db)
 
 # Endpoint para obter um ponto de distribuição específico
 @router.get("/distribution_point/{point_id}", response_model=schemas.DistributionPoint, dependencies=[Depends(is_employee)])
@@ -4,12 +4,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from typing import List
 import sys
-from .auth import is_employee
+from .auth import is_employee, is_driver, get_current_user
 sys.path.append("backend")
 import crud
 import schemas
 import models
-from database import get_db
+from database import get_db, get_read_db
+from fastapi.responses import ORJSONResponse
+from services import driver_sync
 
 # Criação do roteador
 router = APIRouter()
@@ -25,9 +27,9 @@ async def create_driver(driver: schemas.DriverCreate, db: AsyncSession = Depends
 
 # Endpoint para listar todos os motoristas
 @router.get("/drivers/", response_model=List[schemas.Driver], dependencies=[Depends(is_employee)])
-async def list_drivers(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
-    drivers = await crud.get_drivers(db, skip=skip, limit=limit)
-    return drivers
+async def list_drivers(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
+    drivers = await crud.get_drivers_rows(db, skip=skip, limit=limit)
+    return ORJSONResponse(drivers)
 
 # Endpoint para obter motorista por ID
 @router.get("/driver/{driver_id}/", response_model=schemas.Driver, dependencies=[Depends(is_employee)])
@@ -35,4 +37,17 @@ async def get_driver_by_id(driver_id: int, db: AsyncSession = Depends(get_db)):
     driver = await crud.get_driver_by_id(db, driver_id=driver_id)
     if not driver:
         raise HTTPException(status_code=404, detail="Motorista não encontrado")
-    return driver
\ No newline at end of file
+    return driver
+
+# Sincronização do app do motorista: veículo, entregas, rotas e mudanças de status desde a
+# cursor `since` (0 = completa), em listas colunares
+@router.get("/driver/sync", dependencies=[Depends(is_driver)])
+async def driver_sync_changes(
+    since: int = Query(0, ge=0, description="`version` da última resposta (0 = sincronização completa)"),
+    limit: int = Query(500, ge=1, le=driver_sync.MAX_LIMIT),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),  # Primário: uma réplica atrasada faria o cursor pular mudanças
+):
+    changes = await driver_sync.sync(db, current_user["id"], since, limit)
+    # Comprimida pelo CompressionMiddleware conforme o Accept-Encoding
+    return ORJSONResponse(changes, headers={"Cache-Control": "private, no-store"})
@@ -0,0 +1,16 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from services import fleet
+from .auth import is_employee
+
+router = APIRouter()
+
+# Painel da frota: resumo por status e veículos (capacidade, carga, posição) em formato
+# colunar, lidos do estado em memória (services/fleet.py), sem consultar o banco
+@router.get("/fleet/state", dependencies=[Depends(is_employee)])
+async def get_fleet_state(status: Optional[str] = None):
+    if status is not None and status not in fleet.STATUS_NAMES:
+        raise HTTPException(status_code=422, detail=f"Status inválido: {status}")
+    if not fleet.ready():
+        raise HTTPException(status_code=503, detail="Estado da frota ainda não carregado.")
+    return fleet.snapshot(status)
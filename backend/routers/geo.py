@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+import crud
+from database import get_read_db
+from services import geo
+from .auth import is_employee
+
+router = APIRouter()
+
+
+def _parse_bbox(bbox: str) -> geo.BBox:
+    try:
+        return geo.BBox.parse(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Visão geral: clientes, pontos de distribuição e veículos dentro da bbox
+@router.get("/map/overview", dependencies=[Depends(is_employee)])
+async def map_overview(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(12, ge=0, le=22, description="Zoom do mapa (define o agrupamento)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await crud.get_geographic_data(db, _parse_bbox(bbox), zoom)
+
+
+# Produtos entregues, posicionados no ponto de entrega
+@router.get("/map/delivered_products", dependencies=[Depends(is_employee)])
+async def map_delivered_products(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(12, ge=0, le=22, description="Zoom do mapa (define o agrupamento)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await crud.get_delivered_products_map_data(db, _parse_bbox(bbox), zoom)
+
+
+# Uma única camada: clients, distribution_points, vehicles ou delivered_products
+@router.get("/map/{layer}", dependencies=[Depends(is_employee)])
+async def map_layer(
+    layer: str,
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(12, ge=0, le=22, description="Zoom do mapa (define o agrupamento)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if layer not in geo.LAYERS:
+        raise HTTPException(status_code=404, detail=f"Camada desconhecida: {layer}")
+    return await geo.get_layer_features(db, layer, _parse_bbox(bbox), zoom)
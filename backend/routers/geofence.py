@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import List, Optional
+from database import get_db, get_read_db
+import crud
+import models
+import schemas
+from services import fleet, geofence, tile_cache
+from .auth import is_employee
+
+router = APIRouter()
+
+# Lote de posições (rastreadores/app do motorista): avaliadas em memória contra as geocercas,
+# só os eventos de chegada/saída vão para o banco
+@router.post("/geofence/positions", response_model=List[schemas.GeofenceEventResponse], dependencies=[Depends(is_employee)])
+async def post_positions(positions: List[schemas.GeofencePosition], db: AsyncSession = Depends(get_db)):
+    batch = [(p.vehicle_id, p.latitude, p.longitude, p.timestamp) for p in positions]
+    if not batch:
+        return []
+    # Valida os veículos (404) antes de gravar o histórico e os eventos, que têm FK para Veiculo
+    moved = await crud.update_current_positions(db, batch)
+    for vehicle_id, lat, lon, when in batch:
+        await crud.record_location_history(db, vehicle_id, lat, lon, when)
+    events, states = await geofence.process_positions(db, batch)
+    await db.commit()
+    geofence.apply_states(states)
+    for lat, lon in moved:
+        tile_cache.invalidate_point("vehicles", lat, lon)
+    fleet.move(batch)
+    return events
+
+@router.get("/geofence/events", response_model=List[schemas.GeofenceEventResponse], dependencies=[Depends(is_employee)])
+async def get_events(
+    vehicle_id: Optional[int] = None,
+    point_id: Optional[int] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(models.GeofenceEvent).order_by(models.GeofenceEvent.id.desc()).limit(limit)
+    if vehicle_id is not None:
+        query = query.where(models.GeofenceEvent.fk_id_veiculo == vehicle_id)
+    if point_id is not None:
+        query = query.where(models.GeofenceEvent.fk_id_ponto == point_id)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+# Tamanho do índice em memória deste worker
+@router.get("/geofence/stats", dependencies=[Depends(is_employee)])
+async def get_stats(db: AsyncSession = Depends(get_db)):
+    await geofence.ensure_loaded(db)
+    return geofence.stats()
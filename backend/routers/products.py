@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 import sys
-from database import get_db
+from database import get_db, get_read_db
 from .auth import get_current_user, is_client, is_employee
 sys.path.append("backend")
 import crud
 import schemas
 import models
+from services import inventory
+from services.cache import response_cache
 
 router = APIRouter()
 
@@ -52,22 +54,45 @@ async def get_my_products(
 
 
 @router.get("/product/{query}", response_model=list[schemas.Product], dependencies=[Depends(is_employee)])
-async def get_product_by_id_or_name(query: str, db: AsyncSession = Depends(get_db)):
-    if query.isdigit():  # Se a query for um número, buscar por ID
-        product = await crud.get_product_by_id(db, int(query))
-        if not product:
-            raise HTTPException(status_code=404, detail="Produto com esse ID não encontrado.")
-        return [product]
-    else:  # Caso contrário, buscar por nome
-        products = await crud.get_product_by_name(db, query)
+async def get_product_by_id_or_name(request: Request, query: str, db: AsyncSession = Depends(get_read_db)):
+    async def load():
+        if query.isdigit():  # Se a query for um número, buscar por ID
+            product = await crud.get_product_by_id(db, int(query))
+            if not product:
+                raise HTTPException(status_code=404, detail="Produto com esse ID não encontrado.")
+            return [product]
+        else:  # Caso contrário, buscar por nome
+            products = await crud.get_product_by_name(db, query)
+            if not products:
+                raise HTTPException(status_code=404, detail="Nenhum produto encontrado com esse nome.")
+            return products
+
+    return await response_cache.respond(request, "products", f"query:{query}", load, list[schemas.Product], db=db)
+
+
+@router.get("/products/", response_model=list[schemas.Product], dependencies=[Depends(is_employee)])
+async def get_all_products(request: Request, skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
+    async def load():
+        products = await crud.get_products_rows(db, skip=skip, limit=limit)
         if not products:
-            raise HTTPException(status_code=404, detail="Nenhum produto encontrado com esse nome.")
+            raise HTTPException(status_code=404, detail="Nenhum produto encontrado.")
         return products
 
+    return await response_cache.respond(request, "products", f"list:{skip}:{limit}", load, db=db)
 
-@router.get("/products/", response_model=list[schemas.Product], dependencies=[Depends(is_employee)])
-async def get_all_products(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
-    products = await crud.get_products(db, skip=skip, limit=limit)
-    if not products:
-        raise HTTPException(status_code=404, detail="Nenhum produto encontrado.")
-    return products
\ No newline at end of file
+# Saldo do estoque: disponível (shards), reservado e consumido pelas entregas
+@router.get("/products/{product_id}/stock", response_model=schemas.ProductStock, dependencies=[Depends(is_employee)])
+async def get_product_stock(product_id: int, db: AsyncSession = Depends(get_db)):
+    if await db.get(models.Product, product_id) is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado.")
+    return await inventory.stock(db, product_id)
+
+
+# Reposição: soma ao saldo reservável, distribuída entre os shards
+@router.post("/products/{product_id}/stock", response_model=schemas.ProductStock, dependencies=[Depends(is_employee)])
+async def replenish_product_stock(product_id: int, data: schemas.StockReplenish, db: AsyncSession = Depends(get_db)):
+    if await db.get(models.Product, product_id) is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado.")
+    await inventory.add_stock(db, product_id, data.quantidade)
+    await db.commit()
+    return await inventory.stock(db, product_id)
@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, timedelta
+from typing import List
+import crud
+import schemas
+from database import get_db, get_read_db
+from services.rollups import rebuild_rollups
+from .auth import is_employee
+
+router = APIRouter()
+
+# Período máximo de um relatório (dias); os rollups deixam até um ano barato
+MAX_REPORT_DAYS = 366
+
+
+def _report_period(start: date, end: date):
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(status_code=400, detail="A data inicial deve ser anterior à data final.")
+    if (end - start).days > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Período máximo de {MAX_REPORT_DAYS} dias.")
+    return start, end
+
+
+def _build_report(rows, start: date, end: date) -> schemas.DeliveryReport:
+    lines: List[schemas.DeliveryReportRow] = []
+    total = delivered = pending = 0
+    lead_time_sum = 0.0
+
+    for row in rows:
+        lines.append(schemas.DeliveryReportRow(
+            dia=row.dia,
+            fk_id_veiculo=getattr(row, "fk_id_veiculo", None),
+            fk_id_ponto_entrega=getattr(row, "fk_id_ponto_entrega", None),
+            total=row.total,
+            entregues=row.entregues,
+            pendentes=row.pendentes,
+            tempo_medio_entrega_s=row.soma_tempo_entrega_s / row.entregues if row.entregues else None,
+        ))
+        total += row.total
+        delivered += row.entregues
+        pending += row.pendentes
+        lead_time_sum += row.soma_tempo_entrega_s
+
+    return schemas.DeliveryReport(
+        inicio=start,
+        fim=end,
+        total=total,
+        entregues=delivered,
+        pendentes=pending,
+        tempo_medio_entrega_s=lead_time_sum / delivered if delivered else None,
+        linhas=lines,
+    )
+
+
+# Entregas por veículo e por dia (todos os veículos se vehicle_id não for informado)
+@router.get("/reports/deliveries/vehicles", response_model=schemas.DeliveryReport, dependencies=[Depends(is_employee)])
+async def deliveries_by_vehicle(
+    vehicle_id: int = Query(None, description="ID do veículo"),
+    start: date = Query(None, description="Data inicial (padrão: 30 dias atrás)"),
+    end: date = Query(None, description="Data final (padrão: hoje)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    start, end = _report_period(start, end)
+    rows = await crud.get_deliveries_report(db, vehicle_id=vehicle_id, start=start, end=end)
+    return _build_report(rows, start, end)
+
+
+# Entregas por ponto de distribuição e por dia
+@router.get("/reports/deliveries/distribution_points", response_model=schemas.DeliveryReport, dependencies=[Depends(is_employee)])
+async def deliveries_by_distribution_point(
+    point_id: int = Query(None, description="ID do ponto de distribuição"),
+    start: date = Query(None, description="Data inicial (padrão: 30 dias atrás)"),
+    end: date = Query(None, description="Data final (padrão: hoje)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    start, end = _report_period(start, end)
+    rows = await crud.get_distribution_point_deliveries_report(db, point_id=point_id, start=start, end=end)
+    return _build_report(rows, start, end)
+
+
+# Recalcula os rollups a partir da tabela Entrega (backfill)
+@router.post("/reports/rebuild", dependencies=[Depends(is_employee)])
+async def rebuild_reports(db: AsyncSession = Depends(get_db)):
+    await rebuild_rollups(db)
+    return {"status": "ok"}
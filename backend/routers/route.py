@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import crud
 import schemas
-from database import get_db
+from database import get_db, get_read_db
 from .auth import is_employee
 
 router = APIRouter()
@@ -16,7 +16,7 @@ async def create_route(route: schemas.RouteCreate, db: AsyncSession = Depends(ge
 
 # Endpoint to list all routes
 @router.get("/routes/", response_model=List[schemas.Route], dependencies=[Depends(is_employee)])
-async def read_routes(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_routes(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
     routes = await crud.get_routes(db, skip=skip, limit=limit)
     return routes
 
@@ -35,7 +35,7 @@ async def update_route(route_id: int, route: schemas.RouteUpdate, db: AsyncSessi
     if not existing_route:
         return None
 
-    for key, value in route.dict(exclude_unset=True).items():
+    for key, value in route.model_dump(exclude_unset=True).items():
         setattr(existing_route, key, value)
 
     db.commit()
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Union
+import schemas
+from database import get_read_db
+from services import search
+from .auth import is_employee
+
+router = APIRouter()
+
+RESPONSE_SCHEMAS = {"clients": schemas.Client, "products": schemas.Product}
+
+
+def _check_entity(entity: str):
+    if entity not in search.ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Entidade de busca desconhecida: {entity}")
+
+
+# Busca aproximada por nome (clients ou products), ordenada por relevância
+@router.get("/search/{entity}", response_model=List[Union[schemas.Client, schemas.Product]], dependencies=[Depends(is_employee)])
+async def search_by_name(
+    entity: str,
+    q: str = Query(..., min_length=1, description="Texto a buscar no nome"),
+    limit: int = Query(search.DEFAULT_LIMIT, ge=1, le=search.MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
+):
+    _check_entity(entity)
+    results = await search.search(db, entity, q, limit=limit)
+    schema = RESPONSE_SCHEMAS[entity]
+    return [schema.model_validate(obj) for obj in results]
+
+
+# Sugestões por prefixo para o autocomplete (apenas id e nome)
+@router.get("/autocomplete/{entity}", response_model=List[schemas.SearchSuggestion], dependencies=[Depends(is_employee)])
+async def autocomplete(
+    entity: str,
+    q: str = Query(..., min_length=1, description="Prefixo do nome"),
+    limit: int = Query(search.DEFAULT_LIMIT, ge=1, le=search.MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
+):
+    _check_entity(entity)
+    return await search.autocomplete(db, entity, q, limit=limit)
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from services import geo, mvt, tile_cache
+from .auth import is_employee
+
+router = APIRouter()
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+async def _render_tile(db: AsyncSession, layer: str, z: int, x: int, y: int) -> bytes:
+    bbox = geo.BBox(*mvt.tile_bounds(z, x, y))
+    collection = await geo.get_layer_features(db, layer, bbox, z)
+
+    features = []
+    for feature in collection["features"]:
+        lon, lat = feature["geometry"]["coordinates"]
+        properties = {k: v for k, v in feature["properties"].items() if k != "layer"}
+        features.append((feature.get("id"), lat, lon, properties))
+
+    return mvt.encode_tile([mvt.encode_layer(layer, features, z, x, y)])
+
+
+# Tiles vetoriais (MVT) das camadas do mapa; servidos do cache em disco quando possível.
+# Renderizados do primário: o cache em disco não expira, então um tile lido de uma réplica
+# atrasada ficaria cacheado depois da invalidação da escrita. Só os misses chegam ao banco.
+@router.get("/tiles/{layer}/{z}/{x}/{y}.mvt", dependencies=[Depends(is_employee)])
+async def get_tile(layer: str, z: int, x: int, y: int, db: AsyncSession = Depends(get_db)):
+    if layer not in geo.LAYERS:
+        raise HTTPException(status_code=404, detail=f"Camada desconhecida: {layer}")
+    if not (0 <= z <= tile_cache.MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile fora dos limites.")
+
+    data = tile_cache.get_tile(layer, z, x, y)
+    if data is None:
+        data = await _render_tile(db, layer, z, x, y)
+        tile_cache.put_tile(layer, z, x, y, data)
+
+    return Response(content=data, media_type=MVT_MEDIA_TYPE)
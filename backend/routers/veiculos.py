@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update
 from sqlalchemy.orm import joinedload, selectinload
 import sys
 from typing import List
-from database import get_db
+from database import get_db, get_read_db
 from .auth import get_current_user, is_employee
 sys.path.append("backend")
 import crud
+import queries
 import schemas
 import models
-from datetime import datetime
+from services import fleet, geofence, tile_cache, track
+from services.cache import response_cache
+from datetime import datetime, timedelta
 
 router = APIRouter()
 
@@ -23,7 +27,7 @@ async def create_vehicle(
     current_user: dict = Depends(get_current_user),
 ):
     # Cria a localização do veículo
-    location_data = vehicle.fk_id_localizacao.dict()
+    location_data = vehicle.fk_id_localizacao.model_dump()
     if isinstance(location_data.get("data_hora"), str):
         location_data["data_hora"] = datetime.strptime(location_data["data_hora"], "%Y-%m-%d").date()
     location = models.VehicleLocation(**location_data)
@@ -32,13 +36,16 @@ async def create_vehicle(
     await db.refresh(location)
     
     # Cria o veículo com a localização associada
-    vehicle_data = vehicle.dict(exclude={"location"})
+    vehicle_data = vehicle.model_dump(exclude={"location"})
     vehicle_data["fk_id_localizacao"] = location.id  # Relaciona a localização com o veículo
     new_vehicle = models.Vehicle(**vehicle_data)
     
     db.add(new_vehicle)
     await db.commit()
     await db.refresh(new_vehicle)
+    tile_cache.invalidate_point("vehicles", location.latitude, location.longitude)
+    await response_cache.invalidate("vehicles")
+    await fleet.sync_vehicles(db, [new_vehicle.id])
     
     return new_vehicle
 
@@ -59,24 +66,21 @@ async def create_vehicle(
 #    return vehicles
 
 @router.get("/vehicles", response_model=List[schemas.Vehicle])
-async def get_all_vehicles(db: AsyncSession = Depends(get_db)):
+async def get_all_vehicles(request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Retorna todos os veículos cadastrados no banco de dados.
     """
-    query = select(models.Vehicle)  # Cria a consulta para selecionar todos os veículos
-    result = await db.execute(query)  # Executa a consulta de forma assíncrona
-    vehicles = result.scalars().all()  # Extrai os resultados
-    return vehicles
+    async def load():
+        return await crud.get_vehicles_rows(db)  # Só as colunas do schema, sem o join da localização
+
+    return await response_cache.respond(request, "vehicles", "all", load, db=db)
 
 
 # Rota para obter um veículo pelo ID
 @router.get("/vehicle/{vehicle_id}", response_model=schemas.Vehicle, dependencies=[Depends(is_employee)])
 async def get_vehicle_by_id(vehicle_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(models.Vehicle)
-        .options(selectinload(models.Vehicle.deliveries))  # Carregar a relação deliveries de forma eficiente
-        .where(models.Vehicle.id == vehicle_id)
-    )
+    # Sem as entregas: o schema não as expõe (o app do motorista usa GET /driver/sync)
+    result = await db.execute(select(models.Vehicle).where(models.Vehicle.id == vehicle_id))
     vehicle = result.scalars().first()
     if not vehicle:
         raise HTTPException(status_code=404, detail="Veículo não encontrado.")
@@ -88,7 +92,7 @@ async def create_vehicle_location(
     location: schemas.VehicleLocationCreate,
     db: AsyncSession = Depends(get_db),
 ):
-    db_location = models.VehicleLocation(**location.dict())
+    db_location = models.VehicleLocation(**location.model_dump())
     db.add(db_location)
     await db.commit()
     await db.refresh(db_location)
@@ -115,14 +119,53 @@ async def update_vehicle_location(
     if not db_location:
         raise HTTPException(status_code=404, detail="Localização não encontrada.")
 
+    old_position = (db_location.latitude, db_location.longitude)
+
     # Atualiza os campos da localização
-    for key, value in location_update.dict(exclude_unset=True).items():
+    for key, value in location_update.model_dump(exclude_unset=True).items():
         setattr(db_location, key, value)
+    vehicle_id = await db.scalar(select(models.Vehicle.id).where(models.Vehicle.fk_id_localizacao == location_id))
+    states = {}
+    if vehicle_id is not None:
+        # Histórico alimenta os perfis de velocidade do ETA; a geocerca detecta chegada/saída
+        await crud.record_location_history(db, vehicle_id, db_location.latitude, db_location.longitude)
+        _, states = await geofence.process_positions(db, [(vehicle_id, db_location.latitude, db_location.longitude, None)])
 
     await db.commit()
+    geofence.apply_states(states)
     await db.refresh(db_location)
+
+    # O veículo sai de um tile e entra em outro
+    tile_cache.invalidate_point("vehicles", *old_position)
+    tile_cache.invalidate_point("vehicles", db_location.latitude, db_location.longitude)
+    if vehicle_id is not None:
+        fleet.move([(vehicle_id, db_location.latitude, db_location.longitude, None)])
     return db_location
 
+# Trilha do veículo no intervalo (padrão: últimas 24 h), simplificada e codificada:
+# polyline em JSON para o mapa ou, com format=binary, (lat, lon, tempo) em deltas varint
+@router.get("/vehicles/{vehicle_id}/track", dependencies=[Depends(get_current_user)])
+async def get_vehicle_track(
+    vehicle_id: int,
+    start: datetime = None,
+    end: datetime = None,
+    tolerance_m: float = Query(track.TOLERANCE_M, ge=0, le=500),
+    format: str = Query("polyline", pattern="^(polyline|binary)$"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    end = track.naive_utc(end) if end else datetime.utcnow()
+    start = track.naive_utc(start) if start else end - timedelta(hours=24)
+    points = await track.get_track(db, vehicle_id, start, end, tolerance_m)
+    if format == "binary":
+        return Response(track.encode_delta_varint(points), media_type="application/octet-stream")
+    return {
+        "vehicle_id": vehicle_id,
+        "start": start,
+        "end": end,
+        "points": len(points),
+        "polyline": track.encode_polyline(points),
+    }
+
 # Rota para o motorista visualizar o veículo associado
 @router.get("/driver/vehicle/", response_model=schemas.Vehicle, dependencies=[Depends(get_current_user)])
 async def get_driver_vehicle(
@@ -132,9 +175,7 @@ async def get_driver_vehicle(
     if not current_user.get("is_driver"):
         raise HTTPException(status_code=403, detail="Acesso permitido apenas para motoristas.")
 
-    result = await db.execute(
-        select(models.Vehicle).join(models.Driver).where(models.Driver.fk_id_usuario == current_user["id"])
-    )
+    result = await db.execute(queries.vehicle_by_driver_user(current_user["id"]))
     vehicle = result.scalars().first()
     if not vehicle:
         raise HTTPException(status_code=404, detail="Nenhum veículo associado encontrado.")
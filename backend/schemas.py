@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 
 
 # Esquemas para a entidade Client (Cliente)
@@ -18,11 +18,12 @@ class ClientCreate(ClientBase):
 
 class Client(ClientBase):
     id: int
-    fk_id_usuario: Optional[int]
+    fk_id_usuario: Optional[int] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     products: Optional[List["Product"]] = None  # Produtos associados
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Esquemas para a entidade DistributionPoint (PontoDistribuicao)
 class DistributionPointBase(BaseModel):
@@ -31,15 +32,27 @@ class DistributionPointBase(BaseModel):
     end_bairro: str
     end_numero: int
     tipo: str
+    raio_m: Optional[float] = None  # Geocerca circular; padrão GEOFENCE_DEFAULT_RADIUS_M
+    poligono: Optional[List[List[float]]] = None  # Geocerca poligonal [[lon, lat], ...]
 
 class DistributionPointCreate(DistributionPointBase):
-    pass
+    @field_validator("poligono")
+    @classmethod
+    def validate_poligono(cls, poligono):
+        if poligono is None:
+            return poligono
+        if len(poligono) < 3:
+            raise ValueError("O polígono precisa de ao menos 3 vértices.")
+        if any(len(vertex) != 2 for vertex in poligono):
+            raise ValueError("Cada vértice do polígono deve ser um par [lon, lat].")
+        return poligono
 
 class DistributionPoint(DistributionPointBase):
     id: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Esquemas para a entidade Product (Produto)
@@ -58,27 +71,35 @@ class ProductCreate(ProductBase):
 
 class Product(ProductBase):
     id: int
-    fk_id_cliente: Optional[int]
+    fk_id_cliente: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
+class ProductStock(BaseModel):
+    fk_id_produto: int
+    disponivel: int  # Saldo reservável (soma dos shards)
+    reservado: int  # Em entregas ainda não concluídas
+    consumido: int  # Em entregas concluídas
+    shards: int
+
+class StockReplenish(BaseModel):
+    quantidade: int = Field(..., ge=1)
 
 
 class VehicleLocationBase(BaseModel):
     latitude: float
     longitude: float
-    data_hora: Optional[datetime]
+    data_hora: Optional[datetime] = None
 
 class VehicleLocationUpdate(BaseModel):
-    latitude: Optional[float]
-    longitude: Optional[float]
-    data_hora: Optional[datetime]
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    data_hora: Optional[datetime] = None
 
 class VehicleLocation(VehicleLocationBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class VehicleLocationCreate(VehicleLocationBase):
@@ -103,10 +124,10 @@ class VehicleCreate(VehicleBase):
 
 class Vehicle(VehicleBase):
     id: int
+    carga: int = 0  # Unidades nas entregas ativas; aceita entregas até a capacidade
     fk_id_localizacao: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Esquemas para a entidade Driver (Motorista)
 class DriverBase(BaseModel):
@@ -120,15 +141,14 @@ class DriverBase(BaseModel):
 class DriverCreate(DriverBase):
     email: str  
     password: str 
-    fk_id_veiculo: Optional[int]
+    fk_id_veiculo: Optional[int] = None
 
 class Driver(DriverBase):
     id: int
-    fk_id_veiculo: Optional[int]
-    fk_id_usuario: Optional[int]
+    fk_id_veiculo: Optional[int] = None
+    fk_id_usuario: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 
@@ -140,14 +160,13 @@ class RouteBase(BaseModel):
     tempo_estimado: int
 
 class RouteCreate(RouteBase):
-    fk_id_entrega: Optional[int]  # Não opcional para criar uma rota
+    fk_id_entrega: Optional[int] = None  # Não opcional para criar uma rota
 
 class Route(RouteBase):
     id: int
-    fk_id_entrega: Optional[int]
+    fk_id_entrega: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class RouteUpdate(BaseModel):
     origem: Optional[str] = None
@@ -156,19 +175,21 @@ class RouteUpdate(BaseModel):
     tempo_estimado: Optional[int] = None
     fk_id_entrega: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Esquemas para a entidade Delivery (Entrega)
 class DeliveryBase(BaseModel):
     status: str = "pending"
     is_delivered: bool = False
+    quantidade: Optional[int] = None
     data_criacao: Optional[datetime] = None
     data_entrega: Optional[datetime] = None
 
 class DeliveryCreate(DeliveryBase):
     fk_id_produto: int
     fk_id_ponto_entrega: int
+    # Unidades reservadas no estoque
+    quantidade: int = Field(1, ge=1)
 
 class Delivery(DeliveryBase):
     id: int
@@ -177,8 +198,7 @@ class Delivery(DeliveryBase):
     data_criacao: Optional[datetime] = None   # Adicionando data_criacao ao schema
     data_entrega: Optional[datetime] = None  # Adicionando data_entrega ao schema
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ProductInDelivery(BaseModel):
     product_id: int
@@ -196,8 +216,52 @@ class DeliveryResponse(DeliveryBase):
     data_criacao: datetime
     data_entrega: Optional[datetime] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class DeliveryEventResponse(BaseModel):
+    id: int
+    fk_id_entrega: int
+    status_anterior: Optional[str] = None
+    status_novo: str
+    chave_idempotencia: Optional[str] = None
+    fk_id_usuario: Optional[int] = None
+    criado_em: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class DeliveryEta(BaseModel):
+    delivery_id: int
+    vehicle_id: int
+    stop_index: int  # 0 = próxima parada do veículo
+    distance_km: float
+    seconds_remaining: int
+    eta: datetime
+    computed_at: datetime
+
+class GeofencePosition(BaseModel):
+    vehicle_id: int
+    latitude: float
+    longitude: float
+    timestamp: Optional[datetime] = None  # Com fuso é convertido; sem fuso é tomado como UTC
+
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_utc(cls, timestamp):
+        # As colunas de data do banco são UTC sem fuso
+        if timestamp is not None and timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return timestamp
+
+class GeofenceEventResponse(BaseModel):
+    id: Optional[int] = None
+    fk_id_veiculo: int
+    fk_id_ponto: int
+    tipo: str
+    latitude: float
+    longitude: float
+    registrado_em: datetime
+
+    model_config = ConfigDict(from_attributes=True)
 
 # Esquemas para a entidade Employee (Funcionario)
 class EmployeeBase(BaseModel):
@@ -213,10 +277,9 @@ class EmployeeCreate(EmployeeBase):
 
 class Employee(EmployeeBase):
     id: int
-    fk_id_usuario: Optional[int]
+    fk_id_usuario: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class VehicleUpdateRequest(BaseModel):
     latitude: float
@@ -226,21 +289,50 @@ class VehicleUpdateRequest(BaseModel):
 class DeliveryDetailsResponse(BaseModel):
     delivery_id: int
     status: str
-    data_criacao: Optional[str]
-    data_entrega: Optional[str]
-    vehicle_id: Optional[int]
-    vehicle_plate: Optional[str]
-    vehicle_model: Optional[str]
-    product_name: Optional[str]
-    product_quantity: Optional[int]
-    distribution_point_name: Optional[str]
-    distribution_point_lat: Optional[float]
-    distribution_point_lon: Optional[float]
-    route_id: Optional[int]
-    route_description: Optional[str]
-    client_id: Optional[int]
-    client_name: Optional[str]
-    client_email: Optional[str]
-
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    data_criacao: Optional[str] = None
+    data_entrega: Optional[str] = None
+    vehicle_id: Optional[int] = None
+    vehicle_plate: Optional[str] = None
+    vehicle_model: Optional[str] = None
+    product_name: Optional[str] = None
+    product_quantity: Optional[int] = None
+    distribution_point_name: Optional[str] = None
+    distribution_point_lat: Optional[float] = None
+    distribution_point_lon: Optional[float] = None
+    route_id: Optional[int] = None
+    route_description: Optional[str] = None
+    client_id: Optional[int] = None
+    client_name: Optional[str] = None
+    client_email: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Esquemas para os relatórios de entregas (rollups diários)
+class DeliveryReportRow(BaseModel):
+    dia: date
+    fk_id_veiculo: Optional[int] = None
+    fk_id_ponto_entrega: Optional[int] = None
+    total: int
+    entregues: int
+    pendentes: int
+    tempo_medio_entrega_s: Optional[float] = None  # média entre data_criacao e data_entrega
+
+class DeliveryReport(BaseModel):
+    inicio: date
+    fim: date
+    total: int
+    entregues: int
+    pendentes: int
+    tempo_medio_entrega_s: Optional[float] = None
+    linhas: List[DeliveryReportRow]
+
+
+# Sugestão do autocomplete (busca por prefixo)
+class SearchSuggestion(BaseModel):
+    id: int
+    nome: str
+
+
+# Resolve as referências adiante ("Product", "Vehicle", "Route") de uma vez, no import
+for _model in (ClientCreate, Client, Delivery, DeliveryResponse):
+    _model.model_rebuild()
@@ -0,0 +1,254 @@
+import hashlib
+import orjson
+import os
+import time
+from collections import OrderedDict, defaultdict
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from services import invalidation, replicas, row_versions
+
+# Configuração via ambiente: CACHE_BACKEND = memory | redis | redis-local
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 60))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+
+
+class LRUBackend:
+    """Cache em processo: LRU com TTL por entrada."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = defaultdict(int)
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters[key]
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] += 1
+        return self._counters[key]
+
+    def clear(self):
+        # As versões continuam crescendo: só as entradas são descartadas
+        self._entries.clear()
+
+
+class LocalRedisStandIn:
+    """
+    Substituto local do cliente redis.asyncio com o subconjunto de comandos usado
+    pelo RedisBackend (get, set com ex, incr). Útil em desenvolvimento e testes.
+    Scripts Lua (eval) são emulados por funções Python registradas com register_script.
+    """
+
+    scripts = {}
+
+    def __init__(self):
+        self._data = {}
+
+    @classmethod
+    def register_script(cls, script: str, fn):
+        """fn(stand_in, keys, argv) faz em Python o mesmo que o script Lua."""
+        cls.scripts[script] = fn
+
+    async def eval(self, script, numkeys, *args):
+        return self.scripts[script](self, list(args[:numkeys]), list(args[numkeys:]))
+
+    async def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key, value, ex=None):
+        self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    async def incr(self, key):
+        value = int((await self.get(key)) or 0) + 1
+        self._data[key] = (str(value).encode(), None)
+        return value
+
+
+class RedisBackend:
+    """Cache compartilhado entre processos; aceita qualquer cliente compatível com redis.asyncio."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str):
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(key, value, ex=ttl)
+
+    async def get_counter(self, key: str) -> int:
+        return int((await self.client.get(key)) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+
+def build_backend(name: str = CACHE_BACKEND):
+    if name == "redis":
+        import redis.asyncio as redis  # Dependência opcional, só quando o backend é usado
+        return RedisBackend(redis.from_url(CACHE_REDIS_URL))
+    if name == "redis-local":
+        return RedisBackend(LocalRedisStandIn())
+    return LRUBackend()
+
+
+_adapters = {}
+
+def get_adapter(schema) -> TypeAdapter:
+    # Um TypeAdapter por tipo (ex.: List[schemas.Product]); o validador/serializador é compilado uma vez
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    return adapter
+
+def serialize(schema, value) -> bytes:
+    """Valida objetos ORM com o schema de resposta e serializa direto para bytes JSON (pydantic-core)."""
+    adapter = get_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca (RFC 9110): W/ não conta, e o ETag da resposta pode ser fraco
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in tags
+
+
+class ResponseCache:
+    """
+    Cache de respostas JSON por namespace (uma entidade: products, clients, ...).
+
+    A invalidação incrementa a versão do namespace, o que torna todas as chaves
+    antigas inalcançáveis sem precisar listá-las; elas expiram pelo TTL/LRU.
+    Com o backend em memória cada processo tem as próprias versões, então a
+    invalidação também é publicada aos outros workers (services/invalidation.py).
+    """
+
+    def __init__(self, backend, ttl: int = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = defaultdict(lambda: {"hits": 0, "misses": 0, "bypasses": 0, "not_modified": 0, "invalidations": 0})
+
+    async def _key(self, namespace: str, key: str) -> str:
+        version = await self.backend.get_counter(f"cache:{namespace}:version")
+        return f"cache:{namespace}:v{version}:{key}"
+
+    async def invalidate(self, *namespaces: str, broadcast: bool = True):
+        for namespace in namespaces:
+            await self.backend.incr(f"cache:{namespace}:version")
+            self.stats[namespace]["invalidations"] += 1
+        if broadcast and isinstance(self.backend, LRUBackend):
+            invalidation.publish("cache", namespaces=list(namespaces))
+
+    async def get_or_set(self, namespace: str, key: str, producer, schema=None):
+        """
+        Retorna (etag, body). Em caso de miss chama o producer (corrotina que
+        retorna os objetos) e serializa o resultado com o schema; sem schema o
+        producer já devolve dados simples (linhas projetadas) e vai direto ao orjson.
+        """
+        cache_key = await self._key(namespace, key)
+        cached = await self.backend.get(cache_key)
+        if cached is not None:
+            self.stats[namespace]["hits"] += 1
+            etag, body = cached.split(b"\n", 1)
+            return etag.decode(), body
+
+        self.stats[namespace]["misses"] += 1
+        etag, body = await self._render(producer, schema)
+        await self.backend.set(cache_key, etag.encode() + b"\n" + body, self.ttl)
+        return etag, body
+
+    async def _render(self, producer, schema=None):
+        value = await producer()
+        body = serialize(schema, value) if schema is not None else orjson.dumps(value)
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"', body
+
+    async def respond(self, request: Request, namespace: str, key: str, producer, schema=None, db=None) -> Response:
+        """
+        Com `db`, o ETag/Last-Modified vem do xid de escrita das linhas (services/row_versions.py)
+        e o 304 sai sem ler o cache nem montar a lista; sem `db`, ou com uma escrita ainda
+        em andamento, o ETag é o hash do corpo.
+
+        Um cliente que acabou de escrever (services/replicas.py: cookie ou X-Read-Primary)
+        lê do primário e não passa pelo cache compartilhado: outro cliente pode ter
+        guardado ali, sob a versão nova, uma lista lida de uma réplica atrasada.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if replicas.replicas and replicas.wants_primary(request.headers, request.cookies):
+            self.stats[namespace]["bypasses"] += 1
+            etag, body = await self._render(producer, schema)
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            if _etag_matches(if_none_match, etag):
+                self.stats[namespace]["not_modified"] += 1
+                return Response(status_code=304, headers=headers)
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        validator = await row_versions.validator(db, namespace, key) if db is not None else None
+        if validator is not None:
+            headers = {**validator.headers(), "Cache-Control": "private, no-cache"}
+            if validator.not_modified(if_none_match, request.headers.get("if-modified-since"), _etag_matches):
+                self.stats[namespace]["not_modified"] += 1
+                return Response(status_code=304, headers=headers)
+            # A versão entra na chave: um corpo cacheado antes da invalidação chegar a
+            # este worker não sai com o validador novo
+            _, body = await self.get_or_set(namespace, f"{key}:r{validator.version}", producer, schema)
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        etag, body = await self.get_or_set(namespace, key, producer, schema)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(if_none_match, etag):
+            self.stats[namespace]["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def metrics(self) -> dict:
+        result = {}
+        for namespace, stats in self.stats.items():
+            lookups = stats["hits"] + stats["misses"]
+            result[namespace] = {**stats, "hit_rate": stats["hits"] / lookups if lookups else None}
+        return result
+
+
+response_cache = ResponseCache(build_backend())
+
+
+@invalidation.handler("cache")
+async def _invalidated_elsewhere(namespaces):
+    await response_cache.invalidate(*namespaces, broadcast=False)
+
+
+@invalidation.on_resync
+def _resync():
+    if isinstance(response_cache.backend, LRUBackend):
+        response_cache.backend.clear()
@@ -0,0 +1,153 @@
+"""
+Compressão de respostas negociada pelo Accept-Encoding: brotli (br) quando o cliente
+aceita e o pacote `brotli` está instalado, senão gzip. Corpos abaixo de
+COMPRESSION_MIN_SIZE vão sem compressão (o cabeçalho custaria mais que o ganho).
+
+CompressionMiddleware aplica a todas as rotas. Respostas em partes (streaming) são
+comprimidas parte a parte, sem juntar o corpo inteiro na memória.
+"""
+import os
+import zlib
+
+try:
+    import brotli  # Dependência opcional: sem ela só gzip
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+# Qualidades altas do brotli são lentas demais para respostas dinâmicas
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") != "0"
+
+# Tipos que comprimem bem; imagens, binários já compactados (trilhas em delta-varint) ficam de fora
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/geo+json", "application/x-protobuf",
+    "application/vnd.mapbox-vector-tile", "application/javascript", "image/svg+xml",
+)
+
+
+def choose_encoding(accept_encoding: str):
+    """'br', 'gzip' ou None, respeitando q=0 e a preferência do servidor por brotli."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name] = q
+    for encoding in (("br",) if brotli else ()) + ("gzip",):
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compressor(encoding: str):
+    """(compress, finish) incrementais: compress(chunk) -> bytes, finish() -> bytes finais."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: formato gzip
+    return c.compress, c.flush
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    compress_chunk, finish = compressor(encoding)
+    return compress_chunk(body) + finish()
+
+
+def _compressible(headers: dict) -> bool:
+    content_type = headers.get(b"content-type", b"").split(b";")[0].strip().decode("latin-1")
+    # text/event-stream precisa de cada evento na hora, sem esperar o compressor
+    return (content_type.startswith("text/") and content_type != "text/event-stream") or content_type in COMPRESSIBLE_TYPES
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compressão (gzip/brotli) conforme o Accept-Encoding.
+
+    O início da resposta fica retido até juntar MIN_SIZE bytes ou o fim do corpo:
+    corpos pequenos saem como estão; os maiores saem comprimidos, em partes se a rota
+    enviar em partes (sem Content-Length). Respostas que já têm Content-Encoding, 204/304
+    e tipos não compressíveis passam direto. ETags fortes viram fracos na versão comprimida.
+    """
+
+    def __init__(self, app, min_size: int = MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None  # mensagem http.response.start retida
+        buffered = []
+        size = 0
+        compress_chunk = finish = None
+        passthrough = False
+
+        async def send_start(compressed: bool):
+            headers = [(k, v) for k, v in start["headers"] if k not in (b"content-length", b"vary")]
+            vary = [v for k, v in start["headers"] if k == b"vary"]
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"]) if vary else b"Accept-Encoding"))
+            if compressed:
+                headers.append((b"content-encoding", encoding.encode()))
+                headers = [
+                    (k, b"W/" + v if k == b"etag" and not v.startswith(b"W/") else v) for k, v in headers
+                ]
+            else:
+                headers.append((b"content-length", str(size).encode()))
+            await send({**start, "headers": headers})
+
+        async def send_wrapper(message):
+            nonlocal start, size, compress_chunk, finish, passthrough
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                if (
+                    message["status"] in (204, 304) or b"content-encoding" in headers or not _compressible(headers)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compress_chunk is None:
+                buffered.append(body)
+                size += len(body)
+                if size < self.min_size:
+                    if more:
+                        return
+                    # Corpo inteiro abaixo do limite: sai sem compressão
+                    await send_start(False)
+                    await send({"type": "http.response.body", "body": b"".join(buffered)})
+                    return
+                compress_chunk, finish = compressor(encoding)
+                await send_start(True)
+                body = b"".join(buffered)
+                buffered.clear()
+
+            data = compress_chunk(body)
+            if more:
+                # Só envia quando o compressor produziu algo; flush por parte pioraria a taxa
+                if data:
+                    await send({"type": "http.response.body", "body": data, "more_body": True})
+                return
+            await send({"type": "http.response.body", "body": data + finish()})
+
+        await self.app(scope, receive, send_wrapper)
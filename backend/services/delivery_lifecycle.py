@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from services import inventory
+from services.rollups import record_delivery_cancelled, record_delivery_completed
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"  # veículo atribuído
+IN_TRANSIT = "in_transit"
+ARRIVED = "arrived"  # veículo dentro da geocerca do destino (services/geofence.py)
+DELIVERED = "delivered"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Status antigos gravados antes da máquina de estados -> status equivalente
+LEGACY_STATUS = {"Em processo": IN_PROGRESS}
+
+# status atual -> status para os quais pode ir
+TRANSITIONS = {
+    PENDING: {IN_PROGRESS, CANCELLED},
+    IN_PROGRESS: {IN_TRANSIT, ARRIVED, FAILED, CANCELLED},
+    IN_TRANSIT: {ARRIVED, DELIVERED, FAILED},
+    ARRIVED: {DELIVERED, FAILED, IN_TRANSIT},
+    FAILED: {IN_PROGRESS, CANCELLED},  # nova tentativa ou desistência
+    DELIVERED: set(),
+    CANCELLED: set(),
+}
+STATUSES = set(TRANSITIONS)
+TERMINAL = {status for status, targets in TRANSITIONS.items() if not targets}
+# Entregas nesses status contam na carga do veículo (Veiculo.carga)
+ACTIVE = {PENDING, IN_PROGRESS, IN_TRANSIT, ARRIVED, *LEGACY_STATUS}
+
+
+def normalize(status: str) -> str:
+    return LEGACY_STATUS.get(status, status)
+
+
+def sources_for(target: str) -> set:
+    """Status (inclusive os legados) a partir dos quais `target` é alcançável."""
+    sources = {status for status, targets in TRANSITIONS.items() if target in targets}
+    sources |= {legacy for legacy, status in LEGACY_STATUS.items() if status in sources}
+    return sources
+
+
+async def _replayed_event(db: AsyncSession, delivery_id: int, idempotency_key: str):
+    result = await db.execute(
+        select(models.DeliveryEvent).where(
+            models.DeliveryEvent.fk_id_entrega == delivery_id,
+            models.DeliveryEvent.chave_idempotencia == idempotency_key,
+        )
+    )
+    return result.scalars().first()
+
+
+async def unload_vehicle(db: AsyncSession, vehicle_id: Optional[int], quantity: Optional[int]):
+    """Tira a quantidade da entrega da carga do veículo, que volta a aceitar entregas (um único UPDATE)."""
+    if vehicle_id is None:
+        return
+    V = models.Vehicle
+    carga = func.greatest(V.carga - (quantity or 0), 0)
+    await db.execute(update(V).where(V.id == vehicle_id).values(carga=carga, is_available=carga < V.capacidade))
+
+
+async def load_vehicle(db: AsyncSession, vehicle_id: Optional[int], quantity: Optional[int]):
+    """Devolve a quantidade à carga (nova tentativa de uma entrega que já era do veículo, sem checar a capacidade)."""
+    if vehicle_id is None:
+        return
+    V = models.Vehicle
+    carga = V.carga + (quantity or 0)
+    await db.execute(update(V).where(V.id == vehicle_id).values(carga=carga, is_available=carga < V.capacidade))
+
+
+async def transition(
+    db: AsyncSession,
+    delivery_id: int,
+    target: str,
+    idempotency_key: Optional[str] = None,
+    user_id: Optional[int] = None,
+):
+    """
+    Move a entrega para `target` se a transição for válida a partir do status atual.
+
+    A linha da entrega é travada (SELECT ... FOR UPDATE) antes da checagem: duas
+    atualizações concorrentes ficam em fila, e a segunda lê o status já gravado pela
+    primeira, recebendo 409 se a transição deixou de valer. O status travado é o
+    anterior do evento e decide a carga do veículo. Com `idempotency_key`, uma
+    retentativa de uma transição já aplicada devolve a entrega sem repetir efeitos.
+    Quem chama faz o commit (evento, rollups e liberação do veículo vão na mesma transação).
+
+    :return: (entrega, aplicada) — aplicada é False quando foi uma retentativa.
+    """
+    if target not in STATUSES:
+        raise HTTPException(status_code=422, detail=f"Status inválido: {target}")
+
+    Delivery = models.Delivery
+    if idempotency_key and await _replayed_event(db, delivery_id, idempotency_key):
+        return await db.get(Delivery, delivery_id), False
+
+    now = datetime.utcnow()
+    values = {"status": target}
+    if target == DELIVERED:
+        values.update(is_delivered=True, data_entrega=now)
+
+    locked = (await db.execute(
+        select(Delivery.status, Delivery.fk_id_veiculo, Delivery.quantidade)
+        .where(Delivery.id == delivery_id)
+        .with_for_update()
+    )).first()
+    if locked is None:
+        raise HTTPException(status_code=404, detail="Entrega não encontrada")
+    if locked.status not in sources_for(target):
+        # Retentativa concorrente com a mesma chave que venceu a corrida
+        if idempotency_key and await _replayed_event(db, delivery_id, idempotency_key):
+            return await db.get(Delivery, delivery_id), False
+        raise HTTPException(
+            status_code=409,
+            detail=f"Transição inválida: {normalize(locked.status)} -> {target}",
+        )
+
+    await db.execute(
+        update(Delivery)
+        .where(Delivery.id == delivery_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+    await db.execute(
+        insert(models.DeliveryEvent)
+        .values(
+            fk_id_entrega=delivery_id,
+            status_anterior=locked.status,
+            status_novo=target,
+            chave_idempotencia=idempotency_key,
+            fk_id_usuario=user_id,
+            criado_em=now,
+        )
+        .on_conflict_do_nothing(constraint="uq_EventoEntrega_chave")
+    )
+
+    delivery = await db.get(Delivery, delivery_id, populate_existing=True)
+    if target == DELIVERED:
+        await record_delivery_completed(db, delivery, now)
+        await inventory.consume(db, delivery_id)
+    elif target == CANCELLED:
+        await record_delivery_cancelled(db, delivery)
+        # Antes do veículo: mesma ordem de locks da criação (estoque, depois veículo)
+        await inventory.release(db, delivery_id)
+    # A carga do veículo acompanha as entregas ativas: sai ao encerrar ou falhar, volta na nova tentativa
+    was_active = normalize(locked.status) in ACTIVE
+    if target not in ACTIVE and was_active:
+        await unload_vehicle(db, locked.fk_id_veiculo, locked.quantidade)
+    elif target in ACTIVE and not was_active:
+        await load_vehicle(db, locked.fk_id_veiculo, locked.quantidade)
+    return delivery, True
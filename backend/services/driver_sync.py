@@ -0,0 +1,136 @@
+"""
+Sincronização incremental do app do motorista (GET /driver/sync).
+
+Entrega, Rota e EventoEntrega guardam em `xid_escrita` a transação que as escreveu
+(migração 0012). A resposta traz em `version` um cursor de transação, que o app devolve
+em `since`; a próxima resposta traz, para o veículo do motorista, o que foi escrito por
+transações a partir dele:
+
+- since=0 (sincronização completa): o veículo e as entregas ainda não encerradas com suas rotas;
+- since>0: entregas e rotas alteradas (inclusive as que acabaram de chegar a um estado
+  final, para o app removê-las) e os eventos de status novos.
+
+As listas vão em formato colunar ({"columns": [...], "rows": [[...], ...]}): os nomes
+dos campos aparecem uma vez por lista, não uma vez por linha.
+
+O cursor nunca passa do xmin do snapshot da leitura (pg_snapshot_xmin), que é menor ou
+igual ao xid de toda transação ainda em andamento: uma transação que confirma depois
+da leitura tem xid >= cursor e entra na próxima sincronização. O preço é reenviar as
+linhas de transações já confirmadas acima do xmin (o app aplica por id). `versao`
+continua nas linhas, mas não serve de cursor: é atribuída na escrita, não no commit.
+"""
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, Text, cast, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from services import delivery_lifecycle
+
+MAX_LIMIT = 1000
+
+D, R, E = models.Delivery, models.Route, models.DeliveryEvent
+P, Pt = models.Product, models.DistributionPoint
+
+DELIVERY_COLUMNS = {
+    "id": D.id, "status": D.status, "versao": D.versao, "data_criacao": D.data_criacao, "data_entrega": D.data_entrega,
+    "produto": P.nome, "ponto_id": Pt.id, "ponto": Pt.nome, "lat": Pt.latitude, "lon": Pt.longitude,
+}
+ROUTE_COLUMNS = {
+    "id": R.id, "entrega_id": R.fk_id_entrega, "versao": R.versao, "origem": R.origem, "destino": R.destino,
+    "distancia_km": R.distancia_km, "tempo_estimado": R.tempo_estimado,
+}
+EVENT_COLUMNS = {
+    "id": E.id, "entrega_id": E.fk_id_entrega, "versao": E.versao,
+    "de": E.status_anterior, "para": E.status_novo, "em": E.criado_em,
+}
+
+
+def _xid(value: int):
+    return cast(cast(literal(value, BigInteger), Text), models.XID8)
+
+
+def _select(columns: dict, xid_column):
+    # xid da linha como bigint no fim, fora das colunas da resposta
+    return select(*(column.label(name) for name, column in columns.items()), cast(cast(xid_column, Text), BigInteger).label("xid"))
+
+
+def _columnar(columns: dict, rows) -> dict:
+    return {"columns": list(columns), "rows": [list(row)[:len(columns)] for row in rows]}
+
+
+async def _vehicle(db: AsyncSession, user_id: int):
+    V = models.Vehicle
+    result = await db.execute(
+        select(V.id, V.placa, V.modelo, V.capacidade, V.is_available)
+        .join(models.Driver, models.Driver.fk_id_veiculo == V.id)
+        .where(models.Driver.fk_id_usuario == user_id)
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Nenhum veículo associado encontrado.")
+    return row
+
+
+async def sync(db: AsyncSession, user_id: int, since: int = 0, limit: int = 500) -> dict:
+    limit = max(1, min(limit, MAX_LIMIT))
+    # Um snapshot só para todas as consultas e para o xmin que vira o cursor
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    xmin = await db.scalar(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+    vehicle = await _vehicle(db, user_id)
+
+    deliveries = (
+        _select(DELIVERY_COLUMNS, D.xid_escrita)
+        .join(P, D.fk_id_produto == P.id, isouter=True)
+        .join(Pt, D.fk_id_ponto_entrega == Pt.id, isouter=True)
+        .where(D.fk_id_veiculo == vehicle.id)
+    )
+    routes = (
+        _select(ROUTE_COLUMNS, R.xid_escrita)
+        .join(D, R.fk_id_entrega == D.id)
+        .where(D.fk_id_veiculo == vehicle.id)
+    )
+    events = (
+        _select(EVENT_COLUMNS, E.xid_escrita)
+        .join(D, E.fk_id_entrega == D.id)
+        .where(D.fk_id_veiculo == vehicle.id)
+    )
+    if since == 0:
+        # Completa: só o que ainda está aberto (não o histórico inteiro do veículo)
+        open_statuses = tuple(delivery_lifecycle.ACTIVE | {delivery_lifecycle.FAILED})
+        deliveries = deliveries.where(D.status.in_(open_statuses))
+        routes = routes.where(D.status.in_(open_statuses))
+    queries = {
+        "deliveries": (DELIVERY_COLUMNS, deliveries, D.xid_escrita, D.versao),
+        "routes": (ROUTE_COLUMNS, routes, R.xid_escrita, R.versao),
+    }
+    if since > 0:
+        queries["events"] = (EVENT_COLUMNS, events, E.xid_escrita, E.versao)
+
+    changes = {"events": (EVENT_COLUMNS, [])}
+    full = []
+    for name, (columns, query, xid_column, version_column) in queries.items():
+        rows = (await db.execute(
+            query.where(xid_column >= _xid(since)).order_by(xid_column, version_column).limit(limit)
+        )).all()
+        if len(rows) == limit:
+            # Lista cheia: completa as linhas da última transação, para a página terminar
+            # numa fronteira de transação (mesmo que uma transação sozinha passe do limite)
+            last = rows[-1].xid
+            rows += (await db.execute(
+                query.where(xid_column == _xid(last), version_column > rows[-1].versao).order_by(version_column)
+            )).all()
+            full.append(last)
+        changes[name] = (columns, rows)
+
+    # Tudo abaixo do cursor foi entregue: nas listas cheias, até a última transação
+    # lida; nas outras, tudo. E o cursor não passa de transações em andamento (xmin)
+    cursor = min([last + 1 for last in full] + [xmin])
+    cursor = max(cursor, since)
+
+    return {
+        "version": cursor,
+        "full": since == 0,
+        # Se o xmin segura o cursor, a próxima página seria a mesma: o app tenta mais tarde
+        "has_more": bool(full) and cursor > since,
+        "vehicle": dict(vehicle._mapping),
+        **{name: _columnar(columns, rows) for name, (columns, rows) in changes.items()},
+    }
@@ -0,0 +1,250 @@
+"""
+Previsão de chegada (ETA) das entregas em andamento.
+
+A cada ETA_REFRESH_SECONDS um único ciclo calcula o ETA de todas as entregas ativas
+com arrays numpy: posição atual do veículo -> paradas restantes na ordem de
+atendimento, com a velocidade de cada trecho tirada de perfis históricos por hora
+do dia e célula da grade (HistoricoLocalizacao). O resultado fica em memória por
+entrega, então a leitura do rastreamento é um acesso a dicionário.
+
+Com vários workers só um deles calcula (services/leader.py) e publica o resultado em
+partes pelo canal de invalidação; os demais montam o mesmo dicionário ao receber a
+última parte do ciclo.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import case, func, select
+import models
+from services import delivery_lifecycle, invalidation, leader, track
+from services.geodesy import haversine_km_array
+
+ETA_REFRESH_SECONDS = float(os.getenv("ETA_REFRESH_SECONDS", 5))  # 0 desliga o cálculo neste processo
+PROFILE_REFRESH_SECONDS = float(os.getenv("ETA_PROFILE_REFRESH_SECONDS", 900))
+PROFILE_HISTORY_DAYS = int(os.getenv("ETA_PROFILE_HISTORY_DAYS", 14))
+
+CELL_DEG = 0.05  # ~5 km: área usada no perfil de velocidade
+DEFAULT_SPEED_KMH = 25.0
+ROAD_FACTOR = 1.3  # distância em linha reta -> distância por ruas
+DWELL_SECONDS = 180  # tempo parado em cada entrega anterior
+MIN_SAMPLES = 5  # amostras mínimas para confiar na mediana de uma célula/hora
+# Segmentos descartados ao montar o perfil: GPS parado, lacunas longas e saltos
+MIN_SEGMENT_S, MAX_SEGMENT_S = 5, 900
+MIN_SPEED_KMH, MAX_SPEED_KMH = 2.0, 130.0
+
+ACTIVE_STATUSES = tuple(delivery_lifecycle.ACTIVE - {delivery_lifecycle.PENDING})
+
+logger = logging.getLogger("eta")
+
+ETAS_PER_MESSAGE = 100  # O payload do NOTIFY é limitado a 8000 bytes
+ETA_FIELDS = ("delivery_id", "vehicle_id", "stop_index", "distance_km", "seconds_remaining", "eta")
+
+# delivery_id -> último ETA calculado
+_etas = {}
+# Ciclo recebido do líder ainda incompleto: (computed_at, {parte: linhas})
+_pending = (None, {})
+_leadership = leader.Leadership("eta", leader.ETA_LOCK)
+
+
+def _cell_keys(hours, lats, lons):
+    # (hora, i, j) empacotados em um int64 para busca vetorizada com searchsorted
+    i = np.floor(np.asarray(lats) / CELL_DEG).astype(np.int64) + 4096
+    j = np.floor(np.asarray(lons) / CELL_DEG).astype(np.int64) + 4096
+    return (np.asarray(hours, dtype=np.int64) << 26) | (i << 13) | j
+
+
+def _grouped_median(keys, values):
+    """Mediana de `values` por chave; devolve (chaves únicas, medianas, contagens)."""
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    unique, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    return unique, values[starts + counts // 2], counts
+
+
+class SpeedProfile:
+    """Velocidade típica (km/h) por hora do dia e célula, com a mediana da hora como reserva."""
+
+    def __init__(self, cell_keys=None, cell_speeds=None, hourly=None):
+        self.cell_keys = cell_keys if cell_keys is not None else np.empty(0, dtype=np.int64)
+        self.cell_speeds = cell_speeds if cell_speeds is not None else np.empty(0)
+        self.hourly = hourly if hourly is not None else np.full(24, DEFAULT_SPEED_KMH)
+
+    @classmethod
+    def from_history(cls, vehicle_ids, lats, lons, timestamps):
+        """Monta o perfil a partir de posições ordenadas por (veículo, tempo); timestamps em segundos."""
+        if len(vehicle_ids) < 2:
+            return cls()
+        dt = np.diff(timestamps)
+        km = haversine_km_array(lats[:-1], lons[:-1], lats[1:], lons[1:])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speed = km / dt * 3600
+        valid = (
+            (vehicle_ids[1:] == vehicle_ids[:-1])
+            & (dt >= MIN_SEGMENT_S) & (dt <= MAX_SEGMENT_S)
+            & (speed >= MIN_SPEED_KMH) & (speed <= MAX_SPEED_KMH)
+        )
+        if not valid.any():
+            return cls()
+
+        speed = speed[valid]
+        hours = ((timestamps[:-1][valid] // 3600) % 24).astype(np.int64)
+        mid_lat = ((lats[:-1] + lats[1:]) / 2)[valid]
+        mid_lon = ((lons[:-1] + lons[1:]) / 2)[valid]
+
+        hourly = np.full(24, float(np.median(speed)))
+        hour_keys, hour_speeds, hour_counts = _grouped_median(hours, speed)
+        enough = hour_counts >= MIN_SAMPLES
+        hourly[hour_keys[enough]] = hour_speeds[enough]
+
+        keys, speeds, counts = _grouped_median(_cell_keys(hours, mid_lat, mid_lon), speed)
+        enough = counts >= MIN_SAMPLES
+        return cls(keys[enough], speeds[enough], hourly)
+
+    def lookup(self, hour: int, lats, lons):
+        hours = np.full(len(lats), hour, dtype=np.int64)
+        speeds = self.hourly[hours]
+        if len(self.cell_keys):
+            keys = _cell_keys(hours, lats, lons)
+            pos = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+            found = self.cell_keys[pos] == keys
+            speeds = np.where(found, self.cell_speeds[pos], speeds)
+        return speeds
+
+
+async def load_speed_profile(db) -> SpeedProfile:
+    H = models.LocationHistory
+    since = datetime.utcnow() - timedelta(days=PROFILE_HISTORY_DAYS)
+    result = await db.execute(
+        select(H.fk_id_veiculo, H.latitude, H.longitude, func.extract("epoch", H.registrado_em))
+        .where(H.registrado_em >= since)
+    )
+    # Histórico antigo já foi compactado (services/track.py): os pontos simplificados mantêm o tempo
+    rows = result.all() + await track.compacted_points_since(db, since)
+    if not rows:
+        return SpeedProfile()
+    vehicle_ids, lats, lons, timestamps = (np.asarray(col) for col in zip(*rows))
+    vehicle_ids, timestamps = vehicle_ids.astype(np.int64), timestamps.astype(float)
+    order = np.lexsort((timestamps, vehicle_ids))
+    return await asyncio.to_thread(
+        SpeedProfile.from_history,
+        vehicle_ids[order], lats.astype(float)[order], lons.astype(float)[order], timestamps[order],
+    )
+
+
+def compute_etas(rows, profile: SpeedProfile, now: datetime) -> dict:
+    """
+    rows: (delivery_id, vehicle_id, vehicle_lat, vehicle_lon, dest_lat, dest_lon) já na
+    ordem de atendimento de cada veículo. Cada trecho vai da parada anterior (ou da posição
+    do veículo, na primeira) até o destino; o ETA é a soma acumulada dentro do veículo.
+    """
+    if not rows:
+        return {}
+    delivery_ids, vehicle_ids, v_lat, v_lon, d_lat, d_lon = (np.asarray(col) for col in zip(*rows))
+    v_lat, v_lon, d_lat, d_lon = (a.astype(float) for a in (v_lat, v_lon, d_lat, d_lon))
+
+    first = np.ones(len(vehicle_ids), dtype=bool)
+    first[1:] = vehicle_ids[1:] != vehicle_ids[:-1]
+    from_lat = np.where(first, v_lat, np.roll(d_lat, 1))
+    from_lon = np.where(first, v_lon, np.roll(d_lon, 1))
+
+    leg_km = haversine_km_array(from_lat, from_lon, d_lat, d_lon) * ROAD_FACTOR
+    speeds = profile.lookup(now.hour, (from_lat + d_lat) / 2, (from_lon + d_lon) / 2)
+    leg_s = leg_km / speeds * 3600 + np.where(first, 0, DWELL_SECONDS)
+
+    # Soma acumulada por veículo: cumsum global menos o acumulado até o início do grupo
+    cum_s, cum_km = np.cumsum(leg_s), np.cumsum(leg_km)
+    offset_s = np.maximum.accumulate(np.where(first, cum_s - leg_s, 0))
+    offset_km = np.maximum.accumulate(np.where(first, cum_km - leg_km, 0))
+    index = np.arange(len(first))
+    group_start = np.maximum.accumulate(np.where(first, index, 0))
+    seconds = cum_s - offset_s
+    distance = cum_km - offset_km
+
+    computed_at = now.isoformat()
+    return {
+        int(delivery_ids[k]): {
+            "delivery_id": int(delivery_ids[k]),
+            "vehicle_id": int(vehicle_ids[k]),
+            "stop_index": int(index[k] - group_start[k]),
+            "distance_km": round(float(distance[k]), 3),
+            "seconds_remaining": int(seconds[k]),
+            "eta": (now + timedelta(seconds=float(seconds[k]))).isoformat(),
+            "computed_at": computed_at,
+        }
+        for k in range(len(delivery_ids))
+    }
+
+
+async def refresh_etas(db, profile: SpeedProfile):
+    global _etas
+    D, V, L, P = models.Delivery, models.Vehicle, models.VehicleLocation, models.DistributionPoint
+    # A entrega em trânsito (ou já no destino) é a parada atual; as demais seguem a ordem de criação
+    current = D.status.in_((delivery_lifecycle.ARRIVED, delivery_lifecycle.IN_TRANSIT))
+    result = await db.execute(
+        select(D.id, V.id, L.latitude, L.longitude, P.latitude, P.longitude)
+        .join(V, D.fk_id_veiculo == V.id)
+        .join(L, V.fk_id_localizacao == L.id)
+        .join(P, D.fk_id_ponto_entrega == P.id)
+        .where(
+            D.status.in_(ACTIVE_STATUSES),
+            L.latitude.isnot(None), P.latitude.isnot(None),
+        )
+        .order_by(V.id, case((current, 0), else_=1), D.data_criacao, D.id)
+    )
+    # Troca o dicionário inteiro: leituras concorrentes nunca veem um ciclo pela metade
+    _etas = compute_etas(result.all(), profile, datetime.utcnow())
+
+
+def get_eta(delivery_id: int):
+    return _etas.get(delivery_id)
+
+
+def _publish_etas():
+    rows = [[entry[field] for field in ETA_FIELDS] for entry in _etas.values()]
+    computed_at = next(iter(_etas.values()))["computed_at"] if _etas else datetime.utcnow().isoformat()
+    parts = max((len(rows) + ETAS_PER_MESSAGE - 1) // ETAS_PER_MESSAGE, 1)
+    for part in range(parts):
+        invalidation.publish(
+            "etas", computed_at=computed_at, part=part, parts=parts,
+            rows=rows[part * ETAS_PER_MESSAGE:(part + 1) * ETAS_PER_MESSAGE],
+        )
+
+
+@invalidation.handler("etas")
+def _apply_etas(computed_at, part, parts, rows):
+    global _etas, _pending
+    if _pending[0] != computed_at:
+        _pending = (computed_at, {})
+    _pending[1][part] = rows
+    if len(_pending[1]) == parts:
+        # Ciclo completo: troca o dicionário inteiro, como no líder (parte perdida: fica o anterior)
+        _etas = {
+            row[0]: {**dict(zip(ETA_FIELDS, row)), "computed_at": computed_at}
+            for chunk in _pending[1].values() for row in chunk
+        }
+        _pending = (None, {})
+
+
+async def run_eta_loop(session_factory, interval: float = ETA_REFRESH_SECONDS):
+    """Só o processo eleito calcula; os outros recebem o resultado por _apply_etas."""
+    profile, profile_loaded_at = SpeedProfile(), None
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                if await _leadership.acquire():
+                    async with session_factory() as db:
+                        if profile_loaded_at is None or started - profile_loaded_at > PROFILE_REFRESH_SECONDS:
+                            profile, profile_loaded_at = await load_speed_profile(db), started
+                        await refresh_etas(db, profile)
+                    _publish_etas()
+                else:
+                    profile_loaded_at = None  # Ao assumir, recarrega o perfil
+            except Exception:
+                logger.exception("falha ao recalcular ETAs")
+            await asyncio.sleep(max(interval - (time.monotonic() - started), 0.5))
+    finally:
+        await _leadership.release()
@@ -0,0 +1,264 @@
+"""
+Estado da frota em memória: capacidade, carga, disponibilidade e posição de cada veículo.
+
+Os dados ficam em arrays numpy paralelos (um slot por veículo, id -> slot num dict), então
+a escolha de veículos para uma entrega e o painel da frota são operações vetorizadas
+sobre alguns arrays, sem consultar o banco. O banco continua sendo a autoridade: a
+criação da entrega reserva a capacidade com o UPDATE condicional de queries.insert_delivery,
+e o estado aqui só ordena os candidatos.
+
+O estado é montado do banco na inicialização de cada processo; depois só o processo
+eleito (services/leader.py) o refaz a cada FLEET_REFRESH_SECONDS e publica as linhas
+lidas aos demais. Entre uma reconstrução e outra ele é atualizado pelos eventos: depois do commit de uma
+entrega (criação ou mudança de status) a carga do veículo é relida do banco, e cada
+posição recebida move o veículo. As duas mudanças são publicadas aos outros workers
+(services/invalidation.py) com valores absolutos, então aplicar a mesma mensagem duas
+vezes não acumula erro.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import timezone
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from services import invalidation, leader
+from services.geodesy import haversine_km_array
+
+FLEET_REFRESH_SECONDS = float(os.getenv("FLEET_REFRESH_SECONDS", 60))
+POSITIONS_PER_MESSAGE = 100  # O payload do NOTIFY é limitado a 8000 bytes
+
+IDLE, LOADED, FULL, UNAVAILABLE = range(4)
+STATUS_NAMES = ("idle", "loaded", "full", "unavailable")
+
+logger = logging.getLogger("fleet")
+
+
+class FleetState:
+    """Arrays paralelos por slot; cresce dobrando, como uma lista."""
+
+    def __init__(self, size_hint: int = 0):
+        n = max(size_hint, 64)
+        self.ids = np.zeros(n, dtype=np.int64)
+        self.capacity = np.zeros(n, dtype=np.int32)
+        self.load = np.zeros(n, dtype=np.int32)
+        self.available = np.zeros(n, dtype=bool)
+        self.lat = np.full(n, np.nan)
+        self.lon = np.full(n, np.nan)
+        self.moved_at = np.zeros(n)  # epoch da última posição recebida; 0 = posição lida do banco
+        self.slots = {}
+        self.size = 0
+
+    def _grow(self):
+        n = len(self.ids) * 2
+        for name, fill in (("ids", 0), ("capacity", 0), ("load", 0), ("available", False),
+                           ("lat", np.nan), ("lon", np.nan), ("moved_at", 0)):
+            old = getattr(self, name)
+            new = np.full(n, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def slot(self, vehicle_id: int) -> int:
+        slot = self.slots.get(vehicle_id)
+        if slot is None:
+            if self.size == len(self.ids):
+                self._grow()
+            slot = self.slots[vehicle_id] = self.size
+            self.ids[slot] = vehicle_id
+            self.size += 1
+        return slot
+
+    def set_vehicle(self, vehicle_id: int, capacity, load, available, lat=None, lon=None):
+        """Capacidade e carga do banco; a posição do banco só vale se nenhuma chegou por evento."""
+        slot = self.slot(vehicle_id)
+        self.capacity[slot] = capacity or 0
+        self.load[slot] = load or 0
+        self.available[slot] = bool(available)
+        if self.moved_at[slot] == 0 and lat is not None and lon is not None:
+            self.lat[slot], self.lon[slot] = lat, lon
+
+    def move(self, vehicle_id: int, lat: float, lon: float, when: float):
+        slot = self.slots.get(vehicle_id)
+        if slot is None or when < self.moved_at[slot]:
+            return  # Veículo ainda desconhecido (entra na próxima reconstrução) ou posição fora de ordem
+        self.lat[slot], self.lon[slot], self.moved_at[slot] = lat, lon, when
+
+    def status(self) -> np.ndarray:
+        n = self.size
+        load, capacity = self.load[:n], self.capacity[:n]
+        return np.select(
+            [load >= capacity, ~self.available[:n], load > 0],
+            [FULL, UNAVAILABLE, LOADED],
+            default=IDLE,
+        )
+
+    def nearest(self, lat: float, lon: float, quantity: int, k: int) -> list:
+        """Ids dos `k` veículos disponíveis mais próximos com capacidade restante para `quantity`."""
+        n = self.size
+        fits = (
+            self.available[:n]
+            & (self.capacity[:n] - self.load[:n] >= quantity)
+            & ~np.isnan(self.lat[:n])
+        )
+        candidates = np.flatnonzero(fits)
+        if candidates.size == 0:
+            return []
+        distance = haversine_km_array(lat, lon, self.lat[candidates], self.lon[candidates])
+        if candidates.size > k:
+            best = np.argpartition(distance, k)[:k]
+            candidates, distance = candidates[best], distance[best]
+        return self.ids[candidates[np.argsort(distance)]].tolist()
+
+    def summary(self) -> dict:
+        n = self.size
+        counts = np.bincount(self.status(), minlength=len(STATUS_NAMES))
+        capacity = int(self.capacity[:n].sum())
+        load = int(self.load[:n].sum())
+        return {
+            "vehicles": n,
+            **{name: int(count) for name, count in zip(STATUS_NAMES, counts)},
+            "capacity": capacity,
+            "load": load,
+            "utilization": load / capacity if capacity else None,
+        }
+
+    def rows(self, status: str = None) -> dict:
+        """Veículos em formato colunar, opcionalmente só os de um status."""
+        n = self.size
+        codes = self.status()
+        selected = np.flatnonzero(codes == STATUS_NAMES.index(status)) if status else np.arange(n)
+        lat, lon = self.lat[selected], self.lon[selected]
+        columns = {
+            "id": self.ids[selected].tolist(),
+            "status": [STATUS_NAMES[code] for code in codes[selected]],
+            "capacidade": self.capacity[selected].tolist(),
+            "carga": self.load[selected].tolist(),
+            "restante": (self.capacity[selected] - self.load[selected]).tolist(),
+            "lat": np.where(np.isnan(lat), None, lat).tolist(),
+            "lon": np.where(np.isnan(lon), None, lon).tolist(),
+        }
+        return {"columns": list(columns), "rows": [list(row) for row in zip(*columns.values())]}
+
+
+_state = FleetState()
+_built_at = None
+_leadership = leader.Leadership("fleet", leader.FLEET_LOCK)
+
+
+def ready() -> bool:
+    return _built_at is not None
+
+
+def _vehicles_query():
+    V, L = models.Vehicle, models.VehicleLocation
+    return (
+        select(V.id, V.capacidade, V.carga, V.is_available, L.latitude, L.longitude)
+        .join(L, V.fk_id_localizacao == L.id, isouter=True)
+    )
+
+
+async def rebuild(db: AsyncSession) -> list:
+    """Monta o estado inteiro do banco; posições recebidas por evento são mantidas. Retorna as linhas lidas."""
+    global _state, _built_at
+    rows = [list(row) for row in (await db.execute(_vehicles_query())).all()]
+    old, state = _state, FleetState(len(rows))
+    for vehicle_id, capacity, load, available, lat, lon in rows:
+        state.set_vehicle(vehicle_id, capacity, load, available, lat, lon)
+        old_slot = old.slots.get(vehicle_id)
+        if old_slot is not None and old.moved_at[old_slot] > 0:
+            state.move(vehicle_id, old.lat[old_slot], old.lon[old_slot], old.moved_at[old_slot])
+    _state, _built_at = state, time.monotonic()
+    return rows
+
+
+async def sync_vehicles(db: AsyncSession, vehicle_ids):
+    """Relê do banco capacidade e carga dos veículos (depois do commit de uma entrega) e publica."""
+    vehicle_ids = [vehicle_id for vehicle_id in set(vehicle_ids) if vehicle_id is not None]
+    if not vehicle_ids:
+        return
+    rows = (await db.execute(_vehicles_query().where(models.Vehicle.id.in_(vehicle_ids)))).all()
+    vehicles = [list(row) for row in rows]
+    _apply_vehicles(vehicles)
+    invalidation.publish("fleet_vehicles", vehicles=vehicles)
+
+
+def move(positions):
+    """Aplica e publica posições [(vehicle_id, lat, lon, quando)]; quando é datetime UTC sem fuso ou None (agora)."""
+    now = time.time()
+    moved = [
+        [vehicle_id, lat, lon, when.replace(tzinfo=timezone.utc).timestamp() if when else now]
+        for vehicle_id, lat, lon, when in positions
+        if lat is not None and lon is not None
+    ]
+    _apply_positions(moved)
+    for i in range(0, len(moved), POSITIONS_PER_MESSAGE):
+        invalidation.publish("fleet_positions", positions=moved[i:i + POSITIONS_PER_MESSAGE])
+
+
+@invalidation.handler("fleet_vehicles")
+def _apply_vehicles(vehicles):
+    for vehicle_id, capacity, load, available, lat, lon in vehicles:
+        _state.set_vehicle(vehicle_id, capacity, load, available, lat, lon)
+
+
+@invalidation.handler("fleet_rebuilt")
+def _rebuilt_elsewhere(vehicles):
+    global _built_at
+    _apply_vehicles(vehicles)
+    _built_at = time.monotonic()
+
+
+@invalidation.handler("fleet_positions")
+def _apply_positions(positions):
+    for vehicle_id, lat, lon, when in positions:
+        _state.move(vehicle_id, lat, lon, when)
+
+
+@invalidation.on_resync
+async def _resync():
+    # Mensagens podem ter se perdido com o canal caído: refaz o estado do banco
+    from database import async_sessionmaker
+
+    async with async_sessionmaker() as db:
+        await rebuild(db)
+
+
+def nearest(lat: float, lon: float, quantity: int, k: int) -> list:
+    return _state.nearest(lat, lon, quantity, k)
+
+
+def snapshot(status: str = None) -> dict:
+    return {
+        "built_seconds_ago": time.monotonic() - _built_at if _built_at is not None else None,
+        "leader": _leadership.held,
+        "summary": _state.summary(),
+        "vehicles": _state.rows(status),
+    }
+
+
+async def run_fleet_loop(session_factory, interval: float = FLEET_REFRESH_SECONDS):
+    """
+    Monta o estado na inicialização; depois, a cada `interval`, o processo eleito o refaz
+    e publica as linhas (0: só na inicialização).
+    """
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                if not ready():
+                    async with session_factory() as db:
+                        await rebuild(db)
+                elif await _leadership.acquire():
+                    async with session_factory() as db:
+                        vehicles = await rebuild(db)
+                    for i in range(0, len(vehicles), POSITIONS_PER_MESSAGE):
+                        invalidation.publish("fleet_rebuilt", vehicles=vehicles[i:i + POSITIONS_PER_MESSAGE])
+            except Exception:
+                logger.exception("falha ao montar o estado da frota")
+            if interval <= 0 and ready():
+                return
+            await asyncio.sleep(max(interval - (time.monotonic() - started), 1.0))
+    finally:
+        await _leadership.release()
@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from sqlalchemy import func, select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# A partir deste zoom os pontos são enviados individualmente, sem agrupamento
+CLUSTER_MAX_ZOOM = 16
+# Células da grade de agrupamento por tile de 256px (8 -> células de ~32px)
+CELLS_PER_TILE = 8
+# Limite de features por camada em uma resposta, mesmo sem agrupamento
+MAX_FEATURES = 5000
+
+
+@dataclass(frozen=True)
+class BBox:
+    min_lon: float
+    min_lat: float
+    max_lon: float
+    max_lat: float
+
+    @classmethod
+    def parse(cls, value: str) -> "BBox":
+        """
+        Lê uma bbox no formato "min_lon,min_lat,max_lon,max_lat".
+
+        :raises ValueError: Se o formato ou os limites forem inválidos.
+        """
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(","))
+        except ValueError:
+            raise ValueError("bbox deve ter o formato min_lon,min_lat,max_lon,max_lat")
+        if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+            raise ValueError("bbox fora dos limites ou com mínimo maior que o máximo")
+        return cls(min_lon, min_lat, max_lon, max_lat)
+
+
+# Cada camada é um SELECT com as colunas id, nome, lat e lon
+def _clients_layer():
+    Client = models.Client
+    return select(
+        Client.id.label("id"), Client.nome.label("nome"),
+        Client.latitude.label("lat"), Client.longitude.label("lon"),
+    )
+
+def _distribution_points_layer():
+    Point = models.DistributionPoint
+    return select(
+        Point.id.label("id"), Point.nome.label("nome"),
+        Point.latitude.label("lat"), Point.longitude.label("lon"),
+    )
+
+def _vehicles_layer():
+    Vehicle, Location = models.Vehicle, models.VehicleLocation
+    return select(
+        Vehicle.id.label("id"), Vehicle.placa.label("nome"),
+        Location.latitude.label("lat"), Location.longitude.label("lon"),
+    ).join(Location, Vehicle.fk_id_localizacao == Location.id)
+
+# Produtos entregues ficam no ponto de entrega da entrega
+def _delivered_products_layer():
+    Delivery, Product, Point = models.Delivery, models.Product, models.DistributionPoint
+    return (
+        select(
+            Delivery.id.label("id"), Product.nome.label("nome"),
+            Point.latitude.label("lat"), Point.longitude.label("lon"),
+        )
+        .join(Product, Delivery.fk_id_produto == Product.id)
+        .join(Point, Delivery.fk_id_ponto_entrega == Point.id)
+        .where(or_(Delivery.is_delivered.is_(True), Delivery.status == "delivered"))
+    )
+
+LAYERS = {
+    "clients": _clients_layer,
+    "distribution_points": _distribution_points_layer,
+    "vehicles": _vehicles_layer,
+    "delivered_products": _delivered_products_layer,
+}
+
+
+def cell_size(zoom: int) -> float:
+    """Tamanho (em graus) da célula de agrupamento para o zoom informado."""
+    return 360.0 / (2 ** zoom * CELLS_PER_TILE)
+
+
+def _point_feature(layer: str, id: int, nome: str, lat: float, lon: float) -> dict:
+    return {
+        "type": "Feature",
+        "id": id,
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": {"layer": layer, "id": id, "nome": nome},
+    }
+
+
+def _cluster_feature(layer: str, count: int, lat: float, lon: float) -> dict:
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": {"layer": layer, "cluster": True, "point_count": count},
+    }
+
+
+async def get_layer_features(db: AsyncSession, layer: str, bbox: BBox, zoom: int) -> dict:
+    """
+    Retorna uma FeatureCollection GeoJSON da camada dentro da bbox.
+
+    Abaixo de CLUSTER_MAX_ZOOM os pontos são agrupados no banco em uma grade
+    proporcional ao zoom, então o tamanho da resposta depende da área visível e
+    não da quantidade de registros.
+
+    :raises KeyError: Se a camada não existir.
+    """
+    base = LAYERS[layer]().subquery()
+    in_bbox = (
+        base.c.lat.between(bbox.min_lat, bbox.max_lat),
+        base.c.lon.between(bbox.min_lon, bbox.max_lon),
+    )
+
+    if zoom >= CLUSTER_MAX_ZOOM:
+        result = await db.execute(
+            select(base.c.id, base.c.nome, base.c.lat, base.c.lon)
+            .where(*in_bbox)
+            .order_by(base.c.id)
+            .limit(MAX_FEATURES)
+        )
+        features = [_point_feature(layer, *row) for row in result.all()]
+        return {"type": "FeatureCollection", "features": features, "truncated": len(features) == MAX_FEATURES}
+
+    size = cell_size(zoom)
+    gx = func.floor(base.c.lon / size)
+    gy = func.floor(base.c.lat / size)
+    result = await db.execute(
+        select(
+            func.count().label("count"),
+            func.min(base.c.id).label("id"),
+            func.min(base.c.nome).label("nome"),
+            func.avg(base.c.lat).label("lat"),
+            func.avg(base.c.lon).label("lon"),
+        )
+        .where(*in_bbox)
+        .group_by(gx, gy)
+        .limit(MAX_FEATURES)
+    )
+
+    features = []
+    for row in result.all():
+        if row.count == 1:
+            features.append(_point_feature(layer, row.id, row.nome, row.lat, row.lon))
+        else:
+            features.append(_cluster_feature(layer, row.count, row.lat, row.lon))
+    return {"type": "FeatureCollection", "features": features, "truncated": len(features) == MAX_FEATURES}
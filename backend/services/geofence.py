@@ -0,0 +1,255 @@
+"""
+Geocercas dos pontos de distribuição e detecção de chegada/saída dos veículos.
+
+As cercas (círculo de raio_m ou polígono) ficam em memória num índice de grade:
+cada cerca é registrada em todas as células que sua caixa envolvente toca, e uma
+posição só é testada contra as cercas da sua célula. Cada veículo guarda o conjunto
+de cercas em que está; a diferença entre o conjunto anterior e o novo gera os
+eventos de chegada (arrival) e saída (departure).
+
+O índice e o estado dos veículos são do processo. Com vários workers, cada mudança de
+conjunto de um veículo e cada alteração de cerca é publicada aos demais
+(services/invalidation.py); entre a publicação e a entrega dois workers podem emitir
+o mesmo evento, e as transições de status continuam únicas pela checagem do status atual.
+"""
+import math
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from services import delivery_lifecycle, invalidation
+from services.geodesy import haversine_km
+
+DEFAULT_RADIUS_M = float(os.getenv("GEOFENCE_DEFAULT_RADIUS_M", 150))
+RELOAD_SECONDS = float(os.getenv("GEOFENCE_RELOAD_SECONDS", 60))
+# GEOFENCE_AUTO_TRANSITIONS=0 só registra os eventos, sem mudar o status das entregas
+AUTO_TRANSITIONS = os.getenv("GEOFENCE_AUTO_TRANSITIONS", "1") == "1"
+# Histerese: para sair de uma cerca circular o veículo precisa se afastar além de raio * fator
+EXIT_FACTOR = 1.2
+CELL_DEG = 0.01  # ~1,1 km
+METERS_PER_DEG = 111_320.0
+
+ARRIVAL = "arrival"
+DEPARTURE = "departure"
+
+
+def _point_in_polygon(lon: float, lat: float, polygon) -> bool:
+    # Ray casting; polygon = [[lon, lat], ...] (fechado ou não)
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        xi, yi = polygon[i]
+        xj, yj = polygon[j]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _usable_polygon(polygon):
+    """Vértices [(lon, lat)] com ao menos 3 pares numéricos, ou None (polígono ausente ou malformado)."""
+    if not isinstance(polygon, (list, tuple)) or len(polygon) < 3:
+        return None
+    try:
+        return [(float(lon), float(lat)) for lon, lat in polygon]
+    except (TypeError, ValueError):
+        return None
+
+
+class Fence:
+    __slots__ = ("id", "lat", "lon", "radius_m", "polygon", "bbox")
+
+    def __init__(self, fence_id: int, lat, lon, radius_m=None, polygon=None):
+        self.id = fence_id
+        self.lat, self.lon = lat, lon
+        self.radius_m = radius_m or DEFAULT_RADIUS_M
+        self.polygon = _usable_polygon(polygon)
+        if self.polygon:
+            lons = [p[0] for p in self.polygon]
+            lats = [p[1] for p in self.polygon]
+            self.bbox = (min(lats), min(lons), max(lats), max(lons))
+        else:
+            dlat = self.radius_m * EXIT_FACTOR / METERS_PER_DEG
+            dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+            self.bbox = (lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+    def contains(self, lat: float, lon: float, was_inside: bool = False) -> bool:
+        if self.polygon:
+            return _point_in_polygon(lon, lat, self.polygon)
+        limit_m = self.radius_m * (EXIT_FACTOR if was_inside else 1.0)
+        return haversine_km(self.lat, self.lon, lat, lon) * 1000 <= limit_m
+
+
+def _cell(lat: float, lon: float):
+    return int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG))
+
+
+class FenceIndex:
+    """Índice de grade uniforme: célula -> cercas cuja caixa envolvente toca a célula."""
+
+    def __init__(self, fences=()):
+        self.cells = defaultdict(list)
+        self.size = 0
+        for fence in fences:
+            self.add(fence)
+
+    def add(self, fence: Fence):
+        min_lat, min_lon, max_lat, max_lon = fence.bbox
+        (i0, j0), (i1, j1) = _cell(min_lat, min_lon), _cell(max_lat, max_lon)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self.cells[(i, j)].append(fence)
+        self.size += 1
+
+    def containing(self, lat: float, lon: float, inside_before=frozenset()) -> frozenset:
+        return frozenset(
+            fence.id for fence in self.cells.get(_cell(lat, lon), ())
+            if fence.contains(lat, lon, fence.id in inside_before)
+        )
+
+
+_index = FenceIndex()
+_loaded_at = None
+# vehicle_id -> ids das cercas em que o veículo está
+_inside = {}
+
+
+async def ensure_loaded(db: AsyncSession, force: bool = False):
+    """Recarrega as cercas do banco a cada GEOFENCE_RELOAD_SECONDS (o índice novo substitui o antigo inteiro)."""
+    global _index, _loaded_at
+    if not force and _loaded_at is not None and time.monotonic() - _loaded_at < RELOAD_SECONDS:
+        return
+    P = models.DistributionPoint
+    result = await db.execute(
+        select(P.id, P.latitude, P.longitude, P.raio_m, P.poligono)
+        .where(or_(P.latitude.isnot(None), P.poligono.isnot(None)))
+    )
+    # Pontos sem geometria utilizável (ainda não geocodificados e sem polígono válido) ficam de fora
+    _index = FenceIndex(
+        Fence(point_id, lat, lon, radius_m, polygon)
+        for point_id, lat, lon, radius_m, polygon in result.all()
+        if _usable_polygon(polygon) or (lat is not None and lon is not None)
+    )
+    _loaded_at = time.monotonic()
+
+
+def invalidate(broadcast: bool = True):
+    """Força o recarregamento das cercas na próxima posição (ponto criado, geocodificado ou alterado)."""
+    global _loaded_at
+    _loaded_at = None
+    if broadcast:
+        invalidation.publish("geofences")
+
+
+@invalidation.on_resync
+@invalidation.handler("geofences")
+def _fences_changed_elsewhere():
+    invalidate(broadcast=False)
+
+
+@invalidation.handler("geofence_vehicle")
+def _vehicle_moved_elsewhere(vehicle_id, fences):
+    _inside[vehicle_id] = frozenset(fences)
+
+
+def evaluate(vehicle_id: int, lat: float, lon: float, pending: dict):
+    """
+    Devolve [(tipo, fence_id)] e anota o novo conjunto do veículo em `pending`, sem tocar
+    no estado do processo (ver apply_states). A primeira posição de um veículo (ex.: depois
+    de reiniciar o processo) só inicializa o estado, sem eventos.
+    """
+    before = pending.get(vehicle_id, _inside.get(vehicle_id))
+    now_inside = _index.containing(lat, lon, before or frozenset())
+    pending[vehicle_id] = now_inside
+    if before is None:
+        return []
+    return [(ARRIVAL, fence_id) for fence_id in now_inside - before] + \
+           [(DEPARTURE, fence_id) for fence_id in before - now_inside]
+
+
+def apply_states(states: dict):
+    """
+    Aplica os conjuntos devolvidos por process_positions e publica os que mudaram. Só depois
+    do commit: se a transação falhar, a próxima posição gera os eventos de novo.
+    """
+    for vehicle_id, fences in states.items():
+        if _inside.get(vehicle_id) != fences:
+            _inside[vehicle_id] = fences
+            invalidation.publish("geofence_vehicle", vehicle_id=vehicle_id, fences=sorted(fences))
+
+
+async def _apply_transitions(db: AsyncSession, events: list):
+    """
+    Chegada ao ponto de destino -> arrived. Saída de qualquer outra cerca (ex.: depósito)
+    com a entrega ainda em in_progress -> in_transit. Transições que perderam a corrida
+    para o motorista (409) são ignoradas.
+    """
+    D = delivery_lifecycle
+    Delivery = models.Delivery
+    targets = []
+
+    arrivals = {(e["fk_id_veiculo"], e["fk_id_ponto"]): e["id"] for e in events if e["tipo"] == ARRIVAL}
+    if arrivals:
+        result = await db.execute(
+            select(Delivery.id, Delivery.fk_id_veiculo, Delivery.fk_id_ponto_entrega).where(
+                tuple_(Delivery.fk_id_veiculo, Delivery.fk_id_ponto_entrega).in_(list(arrivals)),
+                Delivery.status.in_(D.sources_for(D.ARRIVED)),
+            )
+        )
+        targets += [(delivery_id, D.ARRIVED, arrivals[(vehicle_id, point_id)]) for delivery_id, vehicle_id, point_id in result.all()]
+
+    departures = {(e["fk_id_veiculo"], e["fk_id_ponto"]): e["id"] for e in events if e["tipo"] == DEPARTURE}
+    if departures:
+        result = await db.execute(
+            select(Delivery.id, Delivery.fk_id_veiculo, Delivery.fk_id_ponto_entrega).where(
+                Delivery.fk_id_veiculo.in_({vehicle_id for vehicle_id, _ in departures}),
+                Delivery.status.in_({D.IN_PROGRESS, *D.LEGACY_STATUS}),
+            )
+        )
+        for delivery_id, vehicle_id, point_id in result.all():
+            event_id = next(
+                (eid for (vid, fence_id), eid in departures.items() if vid == vehicle_id and fence_id != point_id),
+                None,
+            )
+            if event_id is not None:
+                targets.append((delivery_id, D.IN_TRANSIT, event_id))
+
+    for delivery_id, status, event_id in targets:
+        try:
+            await D.transition(db, delivery_id, status, idempotency_key=f"geofence:{event_id}")
+        except HTTPException:
+            continue
+
+
+async def process_positions(db: AsyncSession, positions):
+    """
+    Avalia um lote de posições [(vehicle_id, lat, lon, quando)] contra as cercas, grava os
+    eventos gerados e aplica as transições automáticas. Devolve (eventos, estados); quem
+    chama faz o commit e depois passa os estados a apply_states.
+    """
+    await ensure_loaded(db)
+    events = []
+    states = {}
+    for vehicle_id, lat, lon, when in positions:
+        for kind, fence_id in evaluate(vehicle_id, lat, lon, states):
+            events.append({
+                "fk_id_veiculo": vehicle_id, "fk_id_ponto": fence_id, "tipo": kind,
+                "latitude": lat, "longitude": lon, "registrado_em": when or datetime.utcnow(),
+            })
+    if not events:
+        return [], states
+
+    result = await db.execute(insert(models.GeofenceEvent).returning(models.GeofenceEvent.id, sort_by_parameter_order=True), events)
+    for event, event_id in zip(events, result.scalars().all()):
+        event["id"] = event_id
+    if AUTO_TRANSITIONS:
+        await _apply_transitions(db, events)
+    return events, states
+
+
+def stats() -> dict:
+    return {"fences": _index.size, "cells": len(_index.cells), "tracked_vehicles": len(_inside)}
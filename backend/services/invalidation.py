@@ -0,0 +1,154 @@
+"""
+Coerência do estado em memória entre processos (gunicorn com N workers e o worker da outbox).
+
+Cada processo tem estado próprio: as versões do cache de respostas em memória, o índice
+de n-gramas da busca, as geocercas carregadas e as cercas em que cada veículo está.
+Quem muda um dado aplica a mudança localmente e a publica com NOTIFY no canal
+INVALIDATION_CHANNEL; os demais processos escutam o canal (LISTEN) numa conexão asyncpg
+dedicada e aplicam a mesma mudança pelo handler registrado para o tipo da mensagem.
+
+A entrega é de melhor esforço: com a conexão caída as mensagens se perdem e a coerência
+fica para o TTL do cache / GEOFENCE_RELOAD_SECONDS. Ao reconectar, os handlers de
+`on_resync` descartam tudo o que pode ter ficado velho nesse intervalo.
+"""
+import asyncio
+import logging
+import os
+import uuid
+import orjson
+
+INVALIDATION_ENABLED = os.getenv("INVALIDATION_ENABLED", "1") == "1"
+CHANNEL = os.getenv("INVALIDATION_CHANNEL", "gis_invalidation")
+RECONNECT_SECONDS = 5
+
+# Identifica o processo: o NOTIFY também chega a quem publicou, que já aplicou a mudança
+ORIGIN = uuid.uuid4().hex
+
+logger = logging.getLogger("invalidation")
+
+HANDLERS = {}
+RESYNC = []
+_conn = None
+_send_lock = asyncio.Lock()
+_tasks = set()
+_stats = {"published": 0, "received": 0, "dropped": 0, "reconnects": 0}
+
+
+def handler(kind: str):
+    """Registra fn(**dados) (síncrona ou corrotina) para as mensagens de outros processos do tipo `kind`."""
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def on_resync(fn):
+    """Registra fn() para descartar o estado local depois de uma reconexão (mensagens podem ter se perdido)."""
+    RESYNC.append(fn)
+    return fn
+
+
+def _spawn(coro):
+    # Guarda a referência: tarefas sem referência podem ser coletadas antes de terminar
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def publish(kind: str, **data):
+    """Envia a mudança aos outros processos sem esperar o NOTIFY; fora de um event loop não faz nada."""
+    if not INVALIDATION_ENABLED:
+        return
+    try:
+        _spawn(_send(orjson.dumps({"kind": kind, "origin": ORIGIN, **data}).decode()))
+    except RuntimeError:
+        pass
+
+
+async def _send(payload: str):
+    conn = _conn
+    if conn is None or conn.is_closed():
+        _stats["dropped"] += 1
+        return
+    try:
+        # Uma conexão asyncpg não executa comandos concorrentes
+        async with _send_lock:
+            await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+        _stats["published"] += 1
+    except Exception as exc:
+        _stats["dropped"] += 1
+        logger.warning("falha ao publicar invalidação: %r", exc)
+
+
+def _apply(fn, data: dict):
+    try:
+        result = fn(**data)
+        if asyncio.iscoroutine(result):
+            _spawn(result)
+    except Exception:
+        logger.exception("falha ao aplicar invalidação")
+
+
+def _on_notify(conn, pid, channel, payload):
+    message = orjson.loads(payload)
+    if message.pop("origin", None) == ORIGIN:
+        return
+    fn = HANDLERS.get(message.pop("kind", None))
+    if fn is None:
+        return
+    _stats["received"] += 1
+    _apply(fn, message)
+
+
+def _asyncpg_dsn(url: str) -> str:
+    # postgresql+asyncpg://... (SQLAlchemy) -> postgresql://... (asyncpg)
+    scheme, rest = url.split("://", 1)
+    return scheme.split("+", 1)[0] + "://" + rest
+
+
+async def run_listener(dsn: str = None):
+    """Mantém a conexão de LISTEN/NOTIFY aberta, reconectando após falhas, até ser cancelada."""
+    global _conn
+    import asyncpg
+    from database import DATABASE_URL
+
+    dsn = dsn or _asyncpg_dsn(DATABASE_URL)
+    connected_before = False
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn)
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            await conn.add_listener(CHANNEL, _on_notify)
+            _conn = conn
+            if connected_before:
+                _stats["reconnects"] += 1
+                for fn in RESYNC:
+                    _apply(fn, {})
+            connected_before = True
+            await closed.wait()
+            logger.warning("conexão de invalidação encerrada; reconectando")
+        except asyncio.CancelledError:
+            _conn = None
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+            raise
+        except Exception as exc:
+            logger.warning("canal de invalidação indisponível: %r", exc)
+        _conn = None
+        await asyncio.sleep(RECONNECT_SECONDS)
+
+
+def start_listener():
+    """Tarefa do listener para o lifespan da API e o worker; None com INVALIDATION_ENABLED=0."""
+    return asyncio.create_task(run_listener()) if INVALIDATION_ENABLED else None
+
+
+def stats() -> dict:
+    return {
+        **_stats,
+        "enabled": INVALIDATION_ENABLED,
+        "connected": _conn is not None and not _conn.is_closed(),
+        "handlers": sorted(HANDLERS),
+    }
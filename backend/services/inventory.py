@@ -0,0 +1,149 @@
+"""
+Reservas de estoque por entrega.
+
+O saldo reservável de cada produto fica em EstoqueShard, dividido em STOCK_SHARDS
+linhas. Uma reserva é um UPDATE condicional (quantidade >= pedida) em um shard com
+saldo, escolhido a partir de um shard aleatório e pulando os que estão travados por
+outra transação (SKIP LOCKED): pedidos simultâneos do mesmo produto caem em linhas
+diferentes em vez de esperar um pelo lock do outro até o commit.
+
+Quando nenhum shard sozinho tem o saldo (ou todos os que têm estão travados), a
+reserva trava os shards do produto em ordem e divide a quantidade entre eles. As
+partes ficam em ReservaEstoque; o cancelamento devolve cada parte ao seu shard e a
+entrega concluída as marca como consumidas. Quem chama faz o commit.
+"""
+import os
+import random
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+STOCK_SHARDS = int(os.getenv("STOCK_SHARDS", 8))
+
+RESERVED = "reservada"
+CONSUMED = "consumida"
+RELEASED = "liberada"
+
+S, R = models.StockShard, models.StockReservation
+
+
+def split(quantity: int, shards: int = STOCK_SHARDS) -> list:
+    """Divide a quantidade entre os shards; o resto vai para os primeiros."""
+    base, rest = divmod(max(quantity, 0), shards)
+    return [base + (1 if shard < rest else 0) for shard in range(shards)]
+
+
+async def add_stock(db: AsyncSession, product_id: int, quantity: int):
+    """Soma `quantity` ao saldo, distribuída entre os shards (cria os que faltarem)."""
+    stmt = pg_insert(S).values([
+        {"fk_id_produto": product_id, "shard": shard, "quantidade": part}
+        for shard, part in enumerate(split(quantity))
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[S.fk_id_produto, S.shard],
+        set_={"quantidade": S.quantidade + stmt.excluded.quantidade},
+    ))
+
+
+async def _reserve_one_shard(db: AsyncSession, product_id: int, quantity: int):
+    start = random.randrange(STOCK_SHARDS)
+    pick = (
+        select(S.fk_id_produto, S.shard)
+        .where(S.fk_id_produto == product_id, S.quantidade >= quantity)
+        .order_by((S.shard - start + STOCK_SHARDS) % STOCK_SHARDS)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .cte("pick")
+    )
+    result = await db.execute(
+        update(S)
+        .where(S.fk_id_produto == pick.c.fk_id_produto, S.shard == pick.c.shard, S.quantidade >= quantity)
+        .values(quantidade=S.quantidade - quantity)
+        .returning(S.shard)
+    )
+    return result.scalar()
+
+
+async def _reserve_spread(db: AsyncSession, product_id: int, quantity: int) -> list:
+    # Ordem fixa de travamento (por shard): duas reservas espalhadas não entram em deadlock
+    rows = (await db.execute(
+        select(S.shard, S.quantidade)
+        .where(S.fk_id_produto == product_id, S.quantidade > 0)
+        .order_by(S.shard)
+        .with_for_update()
+    )).all()
+    if sum(row.quantidade for row in rows) < quantity:
+        raise HTTPException(status_code=409, detail="Estoque insuficiente para o produto.")
+
+    pieces, remaining = [], quantity
+    for row in sorted(rows, key=lambda row: row.quantidade, reverse=True):
+        take = min(row.quantidade, remaining)
+        pieces.append((row.shard, take))
+        remaining -= take
+        if remaining == 0:
+            break
+    for shard, take in pieces:
+        await db.execute(
+            update(S)
+            .where(S.fk_id_produto == product_id, S.shard == shard)
+            .values(quantidade=S.quantidade - take)
+        )
+    return pieces
+
+
+async def reserve(db: AsyncSession, product_id: int, quantity: int) -> list:
+    """
+    Tira `quantity` do saldo do produto. Retorna as partes [(shard, quantidade)] para
+    record_reservation; 409 se o saldo não basta.
+    """
+    shard = await _reserve_one_shard(db, product_id, quantity)
+    if shard is not None:
+        return [(shard, quantity)]
+    return await _reserve_spread(db, product_id, quantity)
+
+
+async def record_reservation(db: AsyncSession, delivery_id: int, product_id: int, pieces: list):
+    await db.execute(insert(R).values([
+        {"fk_id_entrega": delivery_id, "fk_id_produto": product_id, "shard": shard, "quantidade": part, "status": RESERVED}
+        for shard, part in pieces
+    ]))
+
+
+async def release(db: AsyncSession, delivery_id: int):
+    """Devolve ao saldo as partes ainda reservadas da entrega (idempotente)."""
+    released = (
+        update(R)
+        .where(R.fk_id_entrega == delivery_id, R.status == RESERVED)
+        .values(status=RELEASED)
+        .returning(R.fk_id_produto, R.shard, R.quantidade)
+        .cte("released")
+    )
+    await db.execute(
+        update(S)
+        .where(S.fk_id_produto == released.c.fk_id_produto, S.shard == released.c.shard)
+        .values(quantidade=S.quantidade + released.c.quantidade)
+    )
+
+
+async def consume(db: AsyncSession, delivery_id: int):
+    """Entrega concluída: as partes reservadas saem do estoque de vez."""
+    await db.execute(
+        update(R).where(R.fk_id_entrega == delivery_id, R.status == RESERVED).values(status=CONSUMED)
+    )
+
+
+async def stock(db: AsyncSession, product_id: int) -> dict:
+    available = await db.scalar(select(func.coalesce(func.sum(S.quantidade), 0)).where(S.fk_id_produto == product_id))
+    shards = await db.scalar(select(func.count()).select_from(S).where(S.fk_id_produto == product_id))
+    totals = dict((await db.execute(
+        select(R.status, func.sum(R.quantidade)).where(R.fk_id_produto == product_id).group_by(R.status)
+    )).all())
+    return {
+        "fk_id_produto": product_id,
+        "disponivel": available,
+        "reservado": totals.get(RESERVED, 0),
+        "consumido": totals.get(CONSUMED, 0),
+        "shards": shards,
+    }
@@ -0,0 +1,68 @@
+"""
+Eleição de um único processo para as tarefas periódicas que leem tabelas inteiras (ETA, frota).
+
+Sob o gunicorn cada worker roda o lifespan; sem eleição, cada um repetiria as mesmas
+consultas e a carga no banco cresceria com o número de workers. O líder de uma tarefa é
+o processo que segura o advisory lock de sessão da chave dela, numa conexão própria
+mantida aberta: se o processo morre ou a conexão cai, o Postgres libera o lock e outro
+worker assume no ciclo seguinte. O líder publica o resultado pelo canal de
+services/invalidation.py e os demais só o aplicam.
+
+Com INVALIDATION_ENABLED=0 o resultado não teria como chegar aos outros processos,
+então todos se consideram líderes (cada um calcula o seu, como antes).
+"""
+import logging
+from sqlalchemy.sql import text
+from services import invalidation
+
+# Chaves do espaço de um argumento (bigint), separado das chaves (veículo, trecho) de services/track.py
+ETA_LOCK = 0x6769735F657461  # "gis_eta"
+FLEET_LOCK = 0x6769735F666C74  # "gis_flt"
+
+logger = logging.getLogger("leader")
+
+
+class Leadership:
+    def __init__(self, name: str, key: int):
+        self.name = name
+        self.key = key
+        self._conn = None
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None
+
+    async def acquire(self) -> bool:
+        """True se este processo é o líder; quando não é, tenta assumir."""
+        if not invalidation.INVALIDATION_ENABLED:
+            return True
+        from database import engine
+
+        try:
+            if self._conn is not None:
+                # Confirma que a conexão (e com ela o lock) continua viva
+                await self._conn.execute(text("SELECT 1"))
+                return True
+            conn = await engine.connect()
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}):
+                self._conn = conn
+                logger.info("este processo assumiu a tarefa %s", self.name)
+                return True
+            await conn.close()
+            return False
+        except Exception as exc:
+            logger.warning("falha na eleição da tarefa %s: %r", self.name, exc)
+            await self.release()
+            return False
+
+    async def release(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            # Descarta a conexão em vez de devolvê-la ao pool: fechá-la libera o lock
+            await conn.invalidate()
+            await conn.close()
+        except Exception:
+            pass
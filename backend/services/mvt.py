@@ -0,0 +1,130 @@
+import math
+import struct
+
+# Codificador mínimo de Mapbox Vector Tiles (spec 2.1) para camadas de pontos.
+# Escreve o protobuf direto, sem depender de bibliotecas externas.
+
+EXTENT = 4096
+POINT = 1
+MOVE_TO = 1
+
+
+def tile_bounds(z: int, x: int, y: int):
+    """
+    Retorna (min_lon, min_lat, max_lon, max_lat) do tile z/x/y (Web Mercator, y para baixo).
+    """
+    n = 2 ** z
+
+    def lat(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def tile_for_point(z: int, lat: float, lon: float):
+    """Retorna (x, y) do tile que contém o ponto no zoom z."""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    lat_rad = math.radians(lat)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _to_tile_coords(z: int, x: int, y: int, lat: float, lon: float, extent: int):
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    px = ((lon + 180.0) / 360.0 * n - x) * extent
+    py = ((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n - y) * extent
+    return int(round(px)), int(round(py))
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(field: int, value: int) -> bytes:
+    return _key(field, 0) + _varint(value)
+
+
+def _packed(field: int, values) -> bytes:
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+
+def _encode_value(value) -> bytes:
+    if isinstance(value, bool):
+        return _varint_field(7, int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _varint_field(5, value)
+        return _varint_field(6, _zigzag(value))
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack("<d", value)
+    return _bytes_field(1, str(value).encode("utf-8"))
+
+
+def encode_layer(name: str, features, z: int, x: int, y: int, extent: int = EXTENT) -> bytes:
+    """
+    Codifica uma camada de pontos.
+
+    :param features: Iterável de (id, lat, lon, properties); id pode ser None.
+    :return: Bytes da mensagem Layer (vazio se nenhum ponto cair dentro do tile).
+    """
+    keys, values = {}, {}
+    encoded_features = []
+
+    for feature_id, lat, lon, properties in features:
+        px, py = _to_tile_coords(z, x, y, lat, lon, extent)
+        if not (0 <= px <= extent and 0 <= py <= extent):
+            continue
+
+        tags = []
+        for k, v in properties.items():
+            if v is None:
+                continue
+            tags.append(keys.setdefault(k, len(keys)))
+            tags.append(values.setdefault((type(v), v), len(values)))
+
+        feature = b""
+        if feature_id is not None:
+            feature += _varint_field(1, feature_id)
+        if tags:
+            feature += _packed(2, tags)
+        feature += _varint_field(3, POINT)
+        feature += _packed(4, [(MOVE_TO & 0x7) | (1 << 3), _zigzag(px), _zigzag(py)])
+        encoded_features.append(feature)
+
+    if not encoded_features:
+        return b""
+
+    layer = _varint_field(15, 2) + _bytes_field(1, name.encode("utf-8"))
+    layer += b"".join(_bytes_field(2, f) for f in encoded_features)
+    layer += b"".join(_bytes_field(3, k.encode("utf-8")) for k in keys)
+    layer += b"".join(_bytes_field(4, _encode_value(v)) for _, v in values)
+    layer += _varint_field(5, extent)
+    return layer
+
+
+def encode_tile(layers) -> bytes:
+    """Monta o Tile a partir de mensagens Layer já codificadas (as vazias são ignoradas)."""
+    return b"".join(_bytes_field(3, layer) for layer in layers if layer)
@@ -0,0 +1,188 @@
+"""
+Outbox transacional: efeitos colaterais lentos de uma escrita (geocodificação,
+invalidações em outros processos, notificações) viram linhas na tabela Outbox,
+gravadas na mesma transação da escrita. Se a transação faz rollback o trabalho
+some junto; se faz commit, o worker (worker.py) garante a execução com retentativas.
+
+    await outbox.enqueue(db, "geocode_client", {"client_id": client.id})
+    await db.commit()
+
+Handlers são registrados com @handler("tipo") e recebem (db, payload). Devem ser
+idempotentes: um job pode rodar mais de uma vez se o worker cair no meio.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from services import geofence, tile_cache
+from services.add_to_latlong import get_lat_long_from_address
+from services.cache import response_cache
+
+logger = logging.getLogger("outbox")
+
+# Tempo que um job fica reservado para um worker; depois disso volta para a fila (worker morto)
+LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 300))
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 600
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+HANDLERS = {}
+
+
+def handler(job_type: str):
+    def register(fn):
+        HANDLERS[job_type] = fn
+        return fn
+    return register
+
+
+async def enqueue(db: AsyncSession, job_type: str, payload: dict, delay_seconds: float = 0, max_attempts: int = 5):
+    """Adiciona o job na sessão; quem chama faz o commit junto com a escrita que o originou."""
+    if job_type not in HANDLERS:
+        raise ValueError(f"Tipo de job desconhecido: {job_type}")
+    job = models.OutboxJob(
+        tipo=job_type,
+        payload=payload,
+        status=PENDING,
+        max_tentativas=max_attempts,
+        disponivel_em=datetime.utcnow() + timedelta(seconds=delay_seconds),
+    )
+    db.add(job)
+    return job
+
+
+def backoff_seconds(attempt: int) -> float:
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempt - 1), BACKOFF_MAX_SECONDS)
+
+
+async def claim(db: AsyncSession, limit: int):
+    """
+    Reserva até `limit` jobs prontos. FOR UPDATE SKIP LOCKED deixa vários workers
+    disputarem a fila sem se bloquear; jobs running com lease vencido são retomados.
+    """
+    Job = models.OutboxJob
+    now = datetime.utcnow()
+    ready = (
+        select(Job.id)
+        .where(Job.status.in_((PENDING, RUNNING)), Job.disponivel_em <= now)
+        .order_by(Job.disponivel_em, Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(Job)
+        .where(Job.id.in_(ready))
+        .values(
+            status=RUNNING,
+            tentativas=Job.tentativas + 1,
+            disponivel_em=now + timedelta(seconds=LEASE_SECONDS),
+        )
+        .returning(Job.id, Job.tipo, Job.payload, Job.tentativas, Job.max_tentativas)
+        .execution_options(synchronize_session=False)
+    )
+    jobs = result.all()
+    await db.commit()
+    return jobs
+
+
+async def run_job(session_factory, job):
+    """Executa um job reservado em uma sessão própria e registra o resultado."""
+    Job = models.OutboxJob
+    fn = HANDLERS.get(job.tipo)
+    async with session_factory() as db:
+        try:
+            if fn is None:
+                raise LookupError(f"Nenhum handler para {job.tipo}")
+            await fn(db, job.payload)
+            await db.execute(
+                update(Job).where(Job.id == job.id)
+                .values(status=DONE, concluido_em=datetime.utcnow(), ultimo_erro=None)
+            )
+            await db.commit()
+        except Exception as exc:
+            await db.rollback()
+            dead = job.tentativas >= job.max_tentativas or fn is None
+            logger.warning("job %s (%s) falhou na tentativa %s: %r", job.id, job.tipo, job.tentativas, exc)
+            await db.execute(
+                update(Job).where(Job.id == job.id).values(
+                    status=DEAD if dead else PENDING,
+                    disponivel_em=datetime.utcnow() + timedelta(seconds=backoff_seconds(job.tentativas)),
+                    ultimo_erro=repr(exc)[:1000],
+                )
+            )
+            await db.commit()
+
+
+async def stats(db: AsyncSession) -> dict:
+    Job = models.OutboxJob
+    result = await db.execute(select(Job.status, func.count()).group_by(Job.status))
+    counts = dict(result.all())
+    oldest = await db.scalar(select(func.min(Job.criado_em)).where(Job.status == PENDING))
+    return {
+        "counts": {status: counts.get(status, 0) for status in (PENDING, RUNNING, DONE, DEAD)},
+        "oldest_pending": oldest,
+    }
+
+
+async def list_dead(db: AsyncSession, limit: int = 50):
+    Job = models.OutboxJob
+    result = await db.execute(select(Job).where(Job.status == DEAD).order_by(Job.id.desc()).limit(limit))
+    return result.scalars().all()
+
+
+async def retry(db: AsyncSession, job_id: int) -> bool:
+    """Devolve um job da dead-letter para a fila, zerando as tentativas."""
+    Job = models.OutboxJob
+    result = await db.execute(
+        update(Job).where(Job.id == job_id, Job.status == DEAD)
+        .values(status=PENDING, tentativas=0, disponivel_em=datetime.utcnow())
+        .returning(Job.id)
+    )
+    retried = result.first() is not None
+    await db.commit()
+    return retried
+
+
+async def purge_done(db: AsyncSession, older_than_days: int = 7) -> int:
+    Job = models.OutboxJob
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    result = await db.execute(
+        Job.__table__.delete().where(Job.status == DONE, Job.concluido_em < cutoff)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+# Handlers
+
+async def _geocode(db: AsyncSession, model, layer: str, namespaces: tuple, entity_id: int):
+    entity = await db.get(model, entity_id)
+    if entity is None or entity.latitude is not None:
+        return  # Removido ou já geocodificado (job repetido)
+    # O geocodificador é síncrono (rede): roda fora do event loop
+    latitude, longitude = await asyncio.to_thread(
+        get_lat_long_from_address, entity.end_rua, entity.end_bairro, entity.end_numero
+    )
+    entity.latitude, entity.longitude = latitude, longitude
+    await db.commit()
+    tile_cache.invalidate_point(layer, latitude, longitude)
+    await response_cache.invalidate(*namespaces)
+
+
+@handler("geocode_client")
+async def geocode_client(db: AsyncSession, payload: dict):
+    await _geocode(db, models.Client, "clients", ("clients",), payload["client_id"])
+
+
+@handler("geocode_distribution_point")
+async def geocode_distribution_point(db: AsyncSession, payload: dict):
+    await _geocode(db, models.DistributionPoint, "distribution_points", ("distribution_points",), payload["point_id"])
+    geofence.invalidate()
@@ -0,0 +1,161 @@
+import contextvars
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import random
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import event
+
+try:
+    from pyinstrument import Profiler  # Opcional: árvore de chamadas com suporte a async
+except ImportError:
+    Profiler = None
+
+# PROFILE_SAMPLE_RATE: fração das requisições perfiladas (0 desliga a amostragem)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", 50))
+# Funcionários podem pedir o profile de uma requisição específica com este header
+PROFILE_HEADER = b"x-profile"
+MAX_SQL_PER_PROFILE = 500
+
+_current = contextvars.ContextVar("current_profile", default=None)
+_ids = itertools.count(1)
+profiles = deque(maxlen=PROFILE_MAX_STORED)
+# Só um profiler de chamadas pode estar ativo por thread; requisições perfiladas em paralelo ficam só com o SQL
+_profiler_busy = False
+
+
+def install_sql_hooks(engine):
+    """Registra no engine os eventos que anotam o SQL executado durante uma requisição perfilada."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        if profile is None:
+            return
+        starts = conn.info.get("profile_query_start")
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000 if starts else 0.0
+        if len(profile["sql"]) < MAX_SQL_PER_PROFILE:
+            profile["sql"].append({"statement": statement, "parameters": repr(parameters)[:500], "ms": round(elapsed_ms, 3)})
+
+
+def _is_employee_token(headers) -> bool:
+    from jose import JWTError, jwt
+    from routers.auth import SECRET_KEY, ALGORITHM
+
+    authorization = headers.get(b"authorization", b"").decode()
+    if not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    return bool(payload.get("is_employee"))
+
+
+class _CProfileRunner:
+    # Alternativa sem dependências; perfila a thread inteira, então requisições concorrentes aparecem juntas
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self) -> str:
+        self.profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        return out.getvalue()
+
+
+class _PyinstrumentRunner:
+    def __init__(self):
+        self.profiler = Profiler(async_mode="enabled")
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self) -> str:
+        self.profiler.stop()
+        return self.profiler.output_text(unicode=True)
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila requisições amostradas (PROFILE_SAMPLE_RATE) ou
+    marcadas com o header X-Profile por um funcionário, guardando as últimas
+    PROFILE_MAX_STORED em memória. Fora da amostragem custa um random() por requisição.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            return True
+        headers = scope.get("headers") or ()
+        if not any(name == PROFILE_HEADER for name, _ in headers):
+            return False
+        return _is_employee_token(dict(headers))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = {
+            "id": next(_ids),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode(),
+            "started_at": datetime.utcnow().isoformat(),
+            "status": None,
+            "sql": [],
+        }
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile["status"] = message["status"]
+            await send(message)
+
+        global _profiler_busy
+        runner = None
+        if not _profiler_busy:
+            runner = _PyinstrumentRunner() if Profiler else _CProfileRunner()
+            _profiler_busy = True
+            runner.start()
+
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if runner is not None:
+                profile["call_tree"] = runner.stop()
+                _profiler_busy = False
+            else:
+                profile["call_tree"] = None
+            profile["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            profile["sql_count"] = len(profile["sql"])
+            profile["sql_ms"] = round(sum(q["ms"] for q in profile["sql"]), 3)
+            _current.reset(token)
+            profiles.append(profile)
+
+
+def list_profiles():
+    summary_keys = ("id", "method", "path", "status", "started_at", "duration_ms", "sql_count", "sql_ms")
+    return [{k: p.get(k) for k in summary_keys} for p in reversed(profiles)]
+
+
+def get_profile(profile_id: int):
+    return next((p for p in profiles if p["id"] == profile_id), None)
@@ -0,0 +1,19 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Respostas por projeção: o SELECT traz só as colunas que o schema de resposta
+# expõe e as linhas viram dicts, sem hidratar objetos ORM nem validar no Pydantic.
+
+
+def schema_columns(model, schema, exclude=()):
+    """Colunas do model correspondentes aos campos do schema (campos aninhados ficam de fora)."""
+    table_columns = model.__table__.columns
+    return [
+        getattr(model, name).label(name)
+        for name in schema.model_fields
+        if name not in exclude and name in table_columns
+    ]
+
+
+async def fetch_rows(db: AsyncSession, stmt) -> list:
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings()]
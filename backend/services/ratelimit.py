@@ -0,0 +1,208 @@
+"""
+Controle de admissão dos endpoints caros (bcrypt, geocodificação, posições).
+
+Cada regra combina:
+- token bucket por chave (id do usuário do JWT ou IP do cliente): `burst` requisições
+  de uma vez e `rate` por segundo em regime; acima disso 429 com Retry-After;
+- limite de requisições simultâneas da rota no worker: acima dele 503 imediato,
+  para que uma rajada em um endpoint não ocupe o worker inteiro.
+
+As duas checagens acontecem antes de a requisição chegar à rota. Os buckets ficam em
+memória (RATE_LIMIT_BACKEND=memory) ou compartilhados entre workers via Redis
+(redis | redis-local), com o mesmo script atômico.
+"""
+import math
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+import orjson
+from services.cache import CACHE_REDIS_URL, LocalRedisStandIn
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Atrás de um proxy confiável, o IP do cliente vem do X-Forwarded-For
+TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+MAX_MEMORY_KEYS = 100_000
+
+# Por worker: requisições em andamento e contadores por regra (GET /admin/ratelimit)
+_in_flight = defaultdict(int)
+_stats = defaultdict(lambda: {"allowed": 0, "limited": 0, "shed": 0})
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    method: str
+    path: str  # prefixo do caminho
+    rate: float  # tokens por segundo
+    burst: int
+    concurrency: int
+    by_ip: bool = False  # endpoints sem usuário autenticado (login, cadastro)
+
+
+RULES = [
+    # bcrypt: caro por definição, e alvo de força bruta
+    Rule("login", "POST", "/auth/login", rate=10 / 60, burst=10, concurrency=8, by_ip=True),
+    Rule("create_clients", "POST", "/create_clients", rate=1, burst=5, concurrency=8),
+    # Geocodificação e escolha de veículo
+    Rule("create_delivery", "POST", "/create_delivery", rate=1, burst=10, concurrency=16),
+    # Rastreadores: alta frequência, mas barato por requisição
+    Rule("vehicle_location", "PUT", "/vehicle_location/", rate=5, burst=20, concurrency=64),
+    Rule("geofence_positions", "POST", "/geofence/positions", rate=2, burst=10, concurrency=16),
+]
+
+
+def match_rule(method: str, path: str):
+    for rule in RULES:
+        if rule.method == method and path.startswith(rule.path):
+            return rule
+    return None
+
+
+def _refill(tokens: float, last: float, now: float, rate: float, burst: int):
+    tokens = min(burst, tokens + max(0.0, now - last) * rate)
+    if tokens >= 1:
+        return tokens - 1, True, 0.0
+    return tokens, False, (1 - tokens) / rate
+
+
+class MemoryBuckets:
+    """Buckets no processo (LRU limitado a MAX_MEMORY_KEYS chaves)."""
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int):
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (burst, now))
+        tokens, allowed, retry_after = _refill(tokens, last, now, rate, burst)
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > MAX_MEMORY_KEYS:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+TOKEN_BUCKET_LUA = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+local allowed, retry = 0, 0
+if tokens >= 1 then tokens = tokens - 1; allowed = 1 else retry = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+
+def _token_bucket_stand_in(client, keys, argv):
+    rate, burst, now = float(argv[0]), int(argv[1]), float(argv[2])
+    tokens, last = client._data.get(keys[0], ((burst, now), None))[0]
+    tokens, allowed, retry_after = _refill(tokens, last, now, rate, burst)
+    client._data[keys[0]] = ((tokens, now), None)
+    return [int(allowed), str(retry_after)]
+
+
+LocalRedisStandIn.register_script(TOKEN_BUCKET_LUA, _token_bucket_stand_in)
+
+
+class RedisBuckets:
+    """Buckets compartilhados entre workers; a leitura e a escrita do bucket são um único EVAL."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def take(self, key: str, rate: float, burst: int):
+        allowed, retry_after = await self.client.eval(TOKEN_BUCKET_LUA, 1, f"rl:{key}", rate, burst, time.time())
+        return bool(int(allowed)), float(retry_after)
+
+
+def build_buckets(name: str = RATE_LIMIT_BACKEND):
+    if name == "redis":
+        import redis.asyncio as redis  # Dependência opcional, como no cache
+        return RedisBuckets(redis.from_url(CACHE_REDIS_URL))
+    if name == "redis-local":
+        return RedisBuckets(LocalRedisStandIn())
+    return MemoryBuckets()
+
+
+def _client_key(scope, headers: dict, rule: Rule) -> str:
+    if not rule.by_ip:
+        user_id = _token_user_id(headers)
+        if user_id is not None:
+            return f"user:{user_id}"
+    if TRUST_PROXY and b"x-forwarded-for" in headers:
+        return "ip:" + headers[b"x-forwarded-for"].decode().split(",")[0].strip()
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _token_user_id(headers: dict):
+    # Token com assinatura válida: um JWT forjado não pode escolher o próprio bucket
+    from jose import JWTError, jwt
+    from routers.auth import SECRET_KEY, ALGORITHM
+
+    authorization = headers.get(b"authorization", b"").decode()
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("id")
+    except JWTError:
+        return None
+
+
+async def _reject(send, status: int, detail: str, retry_after: float):
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI: aplica RULES antes da rota; requisições fora das regras passam direto."""
+
+    def __init__(self, app, buckets=None):
+        self.app = app
+        self.buckets = buckets or build_buckets()
+
+    async def __call__(self, scope, receive, send):
+        rule = match_rule(scope.get("method"), scope.get("path", "")) if scope["type"] == "http" and RATE_LIMIT_ENABLED else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        stats = _stats[rule.name]
+        if _in_flight[rule.name] >= rule.concurrency:
+            stats["shed"] += 1
+            await _reject(send, 503, "Servidor ocupado, tente novamente", 1)
+            return
+
+        key = _client_key(scope, dict(scope.get("headers") or ()), rule)
+        allowed, retry_after = await self.buckets.take(f"{rule.name}:{key}", rule.rate, rule.burst)
+        if not allowed:
+            stats["limited"] += 1
+            await _reject(send, 429, f"Muitas requisições, tente novamente em {math.ceil(retry_after)} s", retry_after)
+            return
+
+        stats["allowed"] += 1
+        _in_flight[rule.name] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight[rule.name] -= 1
+
+
+def metrics() -> dict:
+    return {
+        rule.name: {**_stats[rule.name], "in_flight": _in_flight[rule.name], "concurrency": rule.concurrency}
+        for rule in RULES
+    }
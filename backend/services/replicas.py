@@ -0,0 +1,159 @@
+"""
+Roteamento de leituras para réplicas (streaming replication do Postgres).
+
+REPLICA_URLS lista as réplicas separadas por vírgula; sem ela tudo vai para o primário.
+As rotas de leitura pesada (listas, relatórios, mapa, busca, trilhas) usam
+`get_read_db`, que escolhe em rodízio uma réplica saudável com atraso até
+REPLICA_MAX_LAG_SECONDS e cai no primário quando nenhuma serve. Escritas continuam em
+`get_db`, sempre no primário.
+
+Leitura das próprias escritas: toda requisição de escrita bem-sucedida grava o cookie
+READ_PRIMARY_COOKIE, e por REPLICA_STICKY_SECONDS as leituras desse cliente vão ao
+primário (ex.: a lista de entregas logo depois do create_delivery). O header
+`X-Read-Primary: 1` força o primário em uma requisição.
+
+O cache de respostas pode guardar uma lista lida de uma réplica atrasada; o atraso
+máximo tolerado e o TTL do cache limitam o quanto ela fica velha para os outros
+clientes. Quem está marcado para ler do primário não usa o cache (services/cache.py).
+Os tiles, cacheados em disco sem TTL, são renderizados do primário (routers/tiles.py).
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from http.cookies import SimpleCookie
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import text
+from database import ENGINE_OPTIONS
+
+REPLICA_URLS = [url.strip() for url in os.getenv("REPLICA_URLS", "").split(",") if url.strip()]
+MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 2))
+LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", 1))
+STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+READ_PRIMARY_COOKIE = "read_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Réplica em dia (tudo que recebeu já foi aplicado) tem atraso 0, mesmo com o primário ocioso
+LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+logger = logging.getLogger("replicas")
+
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_async_engine(url, pool_pre_ping=True, **ENGINE_OPTIONS)
+        self.sessionmaker = sessionmaker(
+            bind=self.engine, class_=AsyncSession, expire_on_commit=False, autocommit=False, autoflush=False
+        )
+        # Até a primeira checagem a réplica não recebe leituras
+        self.lag = None
+        self.error = None
+        self.reads = 0
+
+    @property
+    def usable(self) -> bool:
+        return self.lag is not None and self.lag <= MAX_LAG_SECONDS
+
+    async def check(self):
+        try:
+            async with self.engine.connect() as conn:
+                self.lag = float((await conn.execute(LAG_SQL)).scalar())
+            self.error = None
+        except Exception as exc:
+            self.lag, self.error = None, repr(exc)
+
+
+replicas = [Replica(f"replica{i}", url) for i, url in enumerate(REPLICA_URLS)]
+_round_robin = itertools.count()
+_stats = {"replica": 0, "primary_sticky": 0, "primary_fallback": 0}
+
+
+async def run_lag_monitor(interval: float = LAG_CHECK_SECONDS):
+    """Mede o atraso de todas as réplicas a cada `interval` segundos (tarefa do lifespan)."""
+    while True:
+        await asyncio.gather(*(replica.check() for replica in replicas))
+        for replica in replicas:
+            if not replica.usable:
+                logger.warning("réplica %s fora do rodízio (atraso %s, erro %s)", replica.name, replica.lag, replica.error)
+        await asyncio.sleep(interval)
+
+
+def start_lag_monitor():
+    return asyncio.create_task(run_lag_monitor()) if replicas else None
+
+
+def wants_primary(headers, cookies) -> bool:
+    if headers.get("x-read-primary") == "1":
+        return True
+    try:
+        return float(cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pick(headers, cookies):
+    """sessionmaker de uma réplica utilizável, ou None para usar o primário."""
+    if not replicas:
+        return None
+    if wants_primary(headers, cookies):
+        _stats["primary_sticky"] += 1
+        return None
+    usable = [replica for replica in replicas if replica.usable]
+    if not usable:
+        _stats["primary_fallback"] += 1
+        return None
+    replica = usable[next(_round_robin) % len(usable)]
+    replica.reads += 1
+    _stats["replica"] += 1
+    return replica.sessionmaker
+
+
+class ReadYourWritesMiddleware:
+    """Middleware ASGI: escritas bem-sucedidas marcam o cliente para ler do primário por STICKY_SECONDS."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[READ_PRIMARY_COOKIE] = str(int(time.time()) + STICKY_SECONDS)
+                cookie[READ_PRIMARY_COOKIE]["max-age"] = STICKY_SECONDS
+                cookie[READ_PRIMARY_COOKIE]["path"] = "/"
+                cookie[READ_PRIMARY_COOKIE]["httponly"] = True
+                cookie[READ_PRIMARY_COOKIE]["samesite"] = "Lax"
+                header = cookie.output(header="").strip().encode()
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", header)]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def stats() -> dict:
+    return {
+        **_stats,
+        "max_lag_seconds": MAX_LAG_SECONDS,
+        "replicas": [
+            {"name": r.name, "lag": r.lag, "usable": r.usable, "reads": r.reads, "error": r.error}
+            for r in replicas
+        ],
+    }
+
+
+async def dispose():
+    for replica in replicas:
+        await replica.engine.dispose()
@@ -0,0 +1,83 @@
+from datetime import datetime
+from sqlalchemy import delete, func, select, case, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# Os rollups são atualizados na mesma transação da entrega: quem chama faz o commit.
+ROLLUPS = (
+    (models.DeliveryVehicleDailyRollup, "fk_id_veiculo"),
+    (models.DeliveryPointDailyRollup, "fk_id_ponto_entrega"),
+)
+
+
+async def _bump(db: AsyncSession, delivery: models.Delivery, **deltas):
+    """
+    Soma os deltas nas linhas (veículo, dia) e (ponto, dia) da entrega via upsert.
+
+    :param delivery: Entrega com data_criacao, fk_id_veiculo e fk_id_ponto_entrega preenchidos.
+    :param deltas: Incrementos por coluna (total, entregues, pendentes, soma_tempo_entrega_s).
+    """
+    dia = (delivery.data_criacao or datetime.utcnow()).date()
+
+    for model, key in ROLLUPS:
+        key_value = getattr(delivery, key)
+        if key_value is None:
+            continue
+
+        stmt = insert(model).values(**{key: key_value, "dia": dia}, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key, "dia"],
+            set_={col: getattr(model, col) + stmt.excluded[col] for col in deltas},
+        )
+        await db.execute(stmt)
+
+
+async def record_delivery_created(db: AsyncSession, delivery: models.Delivery):
+    await _bump(db, delivery, total=1, pendentes=1)
+
+
+async def record_delivery_completed(db: AsyncSession, delivery: models.Delivery, delivered_at: datetime):
+    lead_time = 0.0
+    if delivery.data_criacao:
+        lead_time = max((delivered_at - delivery.data_criacao).total_seconds(), 0.0)
+    await _bump(db, delivery, entregues=1, pendentes=-1, soma_tempo_entrega_s=lead_time)
+
+
+async def record_delivery_cancelled(db: AsyncSession, delivery: models.Delivery):
+    # Cancelada sai das pendentes sem contar como entregue (falhas continuam pendentes: podem ser retomadas)
+    await _bump(db, delivery, pendentes=-1)
+
+
+async def rebuild_rollups(db: AsyncSession):
+    """
+    Recalcula todos os rollups a partir da tabela Entrega (backfill ou correção).
+    Faz um único INSERT ... SELECT agrupado por tabela, sem trazer linhas para o Python.
+    """
+    Delivery = models.Delivery
+    delivered = Delivery.status == "delivered"
+    pending = Delivery.status.notin_(("delivered", "cancelled"))
+    lead_time = func.extract("epoch", Delivery.data_entrega - Delivery.data_criacao)
+
+    for model, key in ROLLUPS:
+        key_col = getattr(Delivery, key)
+        dia = func.date(Delivery.data_criacao)
+        query = (
+            select(
+                key_col,
+                dia,
+                func.count(),
+                func.sum(case((delivered, 1), else_=0)),
+                func.sum(case((pending, 1), else_=0)),
+                func.coalesce(func.sum(case((delivered, func.greatest(lead_time, 0)), else_=literal(0.0))), 0.0),
+            )
+            .where(key_col.isnot(None), Delivery.data_criacao.isnot(None))
+            .group_by(key_col, dia)
+        )
+        await db.execute(delete(model))
+        await db.execute(
+            insert(model).from_select(
+                [key, "dia", "total", "entregues", "pendentes", "soma_tempo_entrega_s"], query
+            )
+        )
+    await db.commit()
@@ -0,0 +1,92 @@
+"""
+Validadores HTTP (ETag/Last-Modified) das listas cacheadas, derivados das escritas nas linhas.
+
+Cliente, Produto, Veiculo e PontoDistribuicao têm `xid_escrita` (transação que escreveu
+a linha, migração 0013) e `atualizado_em` (migração 0009). O maior xid das tabelas de
+uma lista identifica o estado delas em qualquer worker, ao contrário das versões de
+namespace do cache em memória, que são por processo. Uma consulta por índice
+(ORDER BY xid_escrita DESC LIMIT 1) basta para responder 304 sem montar a lista.
+
+O máximo só vale como validador se estiver abaixo do xmin do snapshot da mesma consulta
+(pg_snapshot_xmin): toda transação ainda em andamento tem xid maior ou igual a ele, e
+ao confirmar sobe o máximo e muda o ETag. Com uma escrita em andamento abaixo do máximo
+não há validador e a resposta leva o ETag do corpo (services/cache.py).
+"""
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from sqlalchemy import BigInteger, Text, cast, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# Tabelas de que cada namespace do cache depende (clientes listam seus produtos)
+NAMESPACE_MODELS = {
+    "clients": (models.Client, models.Product),
+    "products": (models.Product,),
+    "vehicles": (models.Vehicle,),
+    "distribution_points": (models.DistributionPoint,),
+}
+
+
+class Validator:
+    __slots__ = ("version", "etag", "last_modified", "modified_at")
+
+    def __init__(self, namespace: str, key: str, version: int, modified_at):
+        # Fraco: o mesmo estado sai com codificações diferentes (services/compression.py)
+        self.version = version
+        digest = hashlib.blake2b(key.encode(), digest_size=4).hexdigest()
+        self.etag = f'W/"{namespace}.{version}.{digest}"'
+        self.modified_at = modified_at.replace(tzinfo=timezone.utc, microsecond=0)
+        self.last_modified = format_datetime(self.modified_at, usegmt=True)
+
+    def headers(self) -> dict:
+        return {"ETag": self.etag, "Last-Modified": self.last_modified}
+
+    def not_modified(self, if_none_match: str, if_modified_since: str, etag_matches) -> bool:
+        # If-None-Match tem precedência; If-Modified-Since só vale sem ele (RFC 9110)
+        if if_none_match:
+            return etag_matches(if_none_match, self.etag)
+        if not if_modified_since:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return self.modified_at <= since
+
+
+def _bigint(xid):
+    # xid8 não tem cast direto para bigint (models.XID8)
+    return cast(cast(xid, Text), BigInteger)
+
+
+def latest_statement(model_list):
+    """Maior (xid, atualizado_em) entre as tabelas, mais o xmin do snapshot da própria consulta."""
+    parts = [
+        select(_bigint(M.xid_escrita).label("xid"), M.atualizado_em.label("atualizado_em"))
+        .order_by(M.xid_escrita.desc(), M.atualizado_em.desc())
+        .limit(1)
+        for M in model_list
+    ]
+    latest = (parts[0] if len(parts) == 1 else union_all(*(p.subquery().select() for p in parts))).subquery()
+    return (
+        select(
+            latest.c.xid, latest.c.atualizado_em,
+            _bigint(func.pg_snapshot_xmin(func.pg_current_snapshot())).label("xmin"),
+        )
+        .order_by(latest.c.xid.desc(), latest.c.atualizado_em.desc())
+        .limit(1)
+    )
+
+
+async def validator(db: AsyncSession, namespace: str, key: str):
+    """Validator do estado atual das tabelas do namespace, ou None (tabelas vazias ou escrita em andamento)."""
+    model_list = NAMESPACE_MODELS.get(namespace)
+    if model_list is None:
+        return None
+    row = (await db.execute(latest_statement(model_list))).first()
+    if row is None or row.xid >= row.xmin:
+        return None
+    return Validator(namespace, key, row.xid, row.atualizado_em)
@@ -0,0 +1,199 @@
+import bisect
+import os
+from collections import Counter
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+import models
+from services import invalidation
+
+# SEARCH_BACKEND = pg_trgm (índices GIN no Postgres) | memory (índice de n-gramas em processo)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "pg_trgm")
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Entidades pesquisáveis pelo nome e o carregamento necessário para os schemas de resposta
+ENTITIES = {
+    "clients": (models.Client, (joinedload(models.Client.products),)),
+    "products": (models.Product, ()),
+}
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def trigrams(value: str) -> set:
+    """Trigramas no mesmo formato do pg_trgm: palavras em minúsculas com dois espaços antes e um depois."""
+    result = set()
+    for word in value.lower().split():
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class NgramIndex:
+    """
+    Índice de trigramas em memória para quando o pg_trgm não está disponível.
+    Guarda listas invertidas trigrama -> ids e uma lista ordenada para busca por prefixo.
+    """
+
+    def __init__(self):
+        self.names = {}
+        self.postings = {}
+        self.sorted_names = []  # (nome em minúsculas, id)
+
+    def add(self, id: int, name: str):
+        if not name:
+            return
+        if id in self.names:
+            self.remove(id)
+        self.names[id] = name
+        for gram in trigrams(name):
+            self.postings.setdefault(gram, set()).add(id)
+        bisect.insort(self.sorted_names, (name.lower(), id))
+
+    def remove(self, id: int):
+        name = self.names.pop(id, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            self.postings.get(gram, set()).discard(id)
+        i = bisect.bisect_left(self.sorted_names, (name.lower(), id))
+        if i < len(self.sorted_names) and self.sorted_names[i] == (name.lower(), id):
+            del self.sorted_names[i]
+
+    def search(self, query: str, limit: int):
+        """Ordena por: prefixo, depois similaridade de trigramas (Jaccard, como o pg_trgm)."""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        lowered = query.lower()
+        scored = []
+        for id, count in shared.items():
+            name = self.names[id]
+            similarity = count / (len(query_grams) + len(trigrams(name)) - count)
+            lower_name = name.lower()
+            if similarity < 0.3 and lowered not in lower_name:
+                continue
+            scored.append((not lower_name.startswith(lowered), -similarity, lower_name, id))
+        scored.sort()
+        return [id for *_, id in scored[:limit]]
+
+    def prefix(self, query: str, limit: int):
+        lowered = query.lower()
+        start = bisect.bisect_left(self.sorted_names, (lowered,))
+        result = []
+        for name, id in self.sorted_names[start:start + limit]:
+            if not name.startswith(lowered):
+                break
+            result.append(id)
+        return result
+
+
+_memory_indexes = {}
+
+async def _memory_index(db: AsyncSession, entity: str) -> NgramIndex:
+    # Construído na primeira busca e mantido por index_name() nos cadastros
+    index = _memory_indexes.get(entity)
+    if index is None:
+        model, _ = ENTITIES[entity]
+        index = NgramIndex()
+        result = await db.execute(select(model.id, model.nome))
+        for id, name in result.all():
+            index.add(id, name)
+        _memory_indexes[entity] = index
+    return index
+
+
+def index_name(entity: str, id: int, name: str, broadcast: bool = True):
+    """Atualiza o índice em memória (se já construído) após um cadastro, neste e nos outros workers."""
+    index = _memory_indexes.get(entity)
+    if index is not None:
+        index.add(id, name)
+    if broadcast and SEARCH_BACKEND == "memory":
+        invalidation.publish("search", entity=entity, id=id, name=name)
+
+
+@invalidation.handler("search")
+def _indexed_elsewhere(entity, id, name):
+    index_name(entity, id, name, broadcast=False)
+
+
+@invalidation.on_resync
+def _resync():
+    # Reconstruído na próxima busca
+    _memory_indexes.clear()
+
+
+async def _load_in_order(db: AsyncSession, entity: str, ids):
+    if not ids:
+        return []
+    model, options = ENTITIES[entity]
+    result = await db.execute(select(model).options(*options).where(model.id.in_(ids)))
+    by_id = {obj.id: obj for obj in result.unique().scalars().all()}
+    return [by_id[id] for id in ids if id in by_id]
+
+
+async def search(db: AsyncSession, entity: str, query: str, limit: int = DEFAULT_LIMIT):
+    """
+    Busca aproximada pelo nome, ordenada por relevância (prefixo primeiro, depois similaridade).
+
+    :param entity: "clients" ou "products".
+    :return: Objetos ORM na ordem de relevância (no máximo `limit`).
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    query = query.strip()
+    if not query:
+        return []
+
+    if SEARCH_BACKEND == "memory":
+        index = await _memory_index(db, entity)
+        return await _load_in_order(db, entity, index.search(query, limit))
+
+    model, options = ENTITIES[entity]
+    name = model.nome
+    pattern = _escape_like(query.lower())
+    # ILIKE '%q%' e o operador % usam o índice GIN gin_trgm_ops
+    stmt = (
+        select(model.id)
+        .where(or_(name.ilike(f"%{pattern}%"), name.op("%")(query)))
+        .order_by(
+            func.lower(name).like(f"{pattern}%").desc(),
+            func.similarity(name, query).desc(),
+            name,
+        )
+        .limit(limit)
+    )
+    ids = (await db.execute(stmt)).scalars().all()
+    return await _load_in_order(db, entity, ids)
+
+
+async def autocomplete(db: AsyncSession, entity: str, query: str, limit: int = DEFAULT_LIMIT):
+    """
+    Sugestões por prefixo do nome: retorna apenas (id, nome), em ordem alfabética.
+    No Postgres usa o índice B-tree em lower(nome) text_pattern_ops.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    query = query.strip()
+    if not query:
+        return []
+
+    model, _ = ENTITIES[entity]
+    if SEARCH_BACKEND == "memory":
+        index = await _memory_index(db, entity)
+        return [{"id": id, "nome": index.names[id]} for id in index.prefix(query, limit)]
+
+    lowered = func.lower(model.nome)
+    stmt = (
+        select(model.id, model.nome)
+        .where(lowered.like(f"{_escape_like(query.lower())}%"))
+        .order_by(lowered)
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return [{"id": id, "nome": name} for id, name in result.all()]
@@ -0,0 +1,36 @@
+import os
+import time
+from contextlib import contextmanager
+
+# STARTUP_PROFILE=1 imprime o tempo de cada fase da inicialização do worker
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+
+
+class StartupProfile:
+    def __init__(self, enabled: bool = STARTUP_PROFILE):
+        self.enabled = enabled
+        self.started_at = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - start) * 1000))
+
+    def report(self) -> dict:
+        total_ms = (time.perf_counter() - self.started_at) * 1000
+        result = {"total_ms": round(total_ms, 1), "phases": {name: round(ms, 1) for name, ms in self.phases}}
+        if self.enabled:
+            for name, ms in self.phases:
+                print(f"[startup] {name}: {ms:.1f} ms")
+            print(f"[startup] total até o worker aceitar requisições: {total_ms:.1f} ms")
+        return result
+
+
+startup_profile = StartupProfile()
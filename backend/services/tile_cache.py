@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+from services.mvt import tile_for_point
+
+# Cache em disco dos tiles: {TILE_CACHE_DIR}/{camada}/{z}/{x}/{y}.mvt
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gis_isi_tiles"))
+MAX_ZOOM = 22
+
+
+def _tile_path(layer: str, z: int, x: int, y: int) -> str:
+    return os.path.join(TILE_CACHE_DIR, layer, str(z), str(x), f"{y}.mvt")
+
+
+def get_tile(layer: str, z: int, x: int, y: int):
+    """Retorna os bytes do tile em cache ou None (um tile vazio é cacheado como b"")."""
+    try:
+        with open(_tile_path(layer, z, x, y), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def put_tile(layer: str, z: int, x: int, y: int, data: bytes):
+    # Escreve em arquivo temporário e renomeia, para nunca servir um tile pela metade
+    path = _tile_path(layer, z, x, y)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def invalidate_point(layer: str, lat: float, lon: float):
+    """
+    Remove, em todos os zooms, o tile da camada que contém o ponto.
+    Cada tile só agrega os pontos da própria área, então nenhum outro tile muda.
+    """
+    if lat is None or lon is None:
+        return
+    for z in range(MAX_ZOOM + 1):
+        x, y = tile_for_point(z, lat, lon)
+        try:
+            os.remove(_tile_path(layer, z, x, y))
+        except FileNotFoundError:
+            pass
+
+
+def invalidate_layer(layer: str):
+    shutil.rmtree(os.path.join(TILE_CACHE_DIR, layer), ignore_errors=True)
@@ -0,0 +1,291 @@
+"""
+Trilhas dos veículos: simplificação, codificação compacta e map-matching opcional.
+
+O histórico bruto (HistoricoLocalizacao) é compactado em trechos de TRACK_SEGMENT_HOURS
+por veículo (TrilhaCompactada) depois de TRACK_RAW_RETENTION_HOURS:
+
+- Douglas-Peucker com tolerância em metros remove os pontos quase colineares;
+- a geometria vira uma polyline (algoritmo do Google, 1e-5 graus), que o mapa decodifica;
+- o blob `dados` guarda os mesmos pontos com o tempo, em deltas zigzag-varint
+  (lat, lon em 1e-5 graus e segundos), de onde o ETA ainda tira velocidades.
+
+Com OSRM_URL definido os pontos simplificados são ajustados à malha viária
+(serviço /match do OSRM) antes de codificar.
+"""
+import asyncio
+import logging
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+TOLERANCE_M = float(os.getenv("TRACK_TOLERANCE_M", 10))
+RAW_RETENTION_HOURS = float(os.getenv("TRACK_RAW_RETENTION_HOURS", 24))
+SEGMENT_HOURS = float(os.getenv("TRACK_SEGMENT_HOURS", 1))
+OSRM_URL = os.getenv("OSRM_URL")  # ex.: http://router.project-osrm.org (vazio desliga o map-matching)
+OSRM_MAX_POINTS = 100  # limite de coordenadas por chamada ao /match
+PRECISION = 1e5
+
+logger = logging.getLogger("track")
+
+
+# Simplificação
+
+def douglas_peucker(points, tolerance_m: float = TOLERANCE_M):
+    """
+    points: [(lat, lon, ...)]; devolve o subconjunto que mantém a forma dentro de
+    `tolerance_m`. Iterativo (sem recursão) e com projeção equiretangular local,
+    suficiente para trechos urbanos.
+    """
+    n = len(points)
+    if n < 3:
+        return list(points)
+    lat0 = math.radians(sum(p[0] for p in points) / n)
+    kx = 111_320.0 * math.cos(lat0)
+    ky = 110_540.0
+    xy = [(p[1] * kx, p[0] * ky) for p in points]
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        (x1, y1), (x2, y2) = xy[start], xy[end]
+        dx, dy = x2 - x1, y2 - y1
+        norm = math.hypot(dx, dy)
+        max_dist, index = 0.0, None
+        for i in range(start + 1, end):
+            px, py = xy[i]
+            if norm == 0:
+                dist = math.hypot(px - x1, py - y1)
+            else:
+                dist = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / norm
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance_m:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [p for p, kept in zip(points, keep) if kept]
+
+
+# Polyline (Google Encoded Polyline Algorithm)
+
+def _encode_signed(value: int, out: list):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(points) -> str:
+    out, prev_lat, prev_lon = [], 0, 0
+    for p in points:
+        lat, lon = round(p[0] * PRECISION), round(p[1] * PRECISION)
+        _encode_signed(lat - prev_lat, out)
+        _encode_signed(lon - prev_lon, out)
+        prev_lat, prev_lon = lat, lon
+    return "".join(out)
+
+
+def decode_polyline(encoded: str):
+    points, index, lat, lon = [], 0, 0, 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / PRECISION, lon / PRECISION))
+    return points
+
+
+# Blob binário: (lat, lon, epoch) em deltas zigzag-varint
+
+def _write_varint(value: int, out: bytearray):
+    value = (value << 1) ^ (value >> 63)  # zigzag
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int):
+    result = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        shift += 7
+        if b < 0x80:
+            break
+    return (result >> 1) ^ -(result & 1), pos
+
+
+def encode_delta_varint(points) -> bytes:
+    """points: [(lat, lon, epoch_s)] -> bytes; o primeiro ponto vai absoluto, os demais como deltas."""
+    out = bytearray()
+    prev = (0, 0, 0)
+    for lat, lon, ts in points:
+        current = (round(lat * PRECISION), round(lon * PRECISION), int(ts))
+        for value, previous in zip(current, prev):
+            _write_varint(value - previous, out)
+        prev = current
+    return bytes(out)
+
+
+def decode_delta_varint(data: bytes):
+    points, pos, values = [], 0, [0, 0, 0]
+    while pos < len(data):
+        for k in range(3):
+            delta, pos = _read_varint(data, pos)
+            values[k] += delta
+        points.append((values[0] / PRECISION, values[1] / PRECISION, values[2]))
+    return points
+
+
+# Map-matching (opcional, OSRM)
+
+def _osrm_match_chunk(points):
+    import requests
+
+    coords = ";".join(f"{lon:.6f},{lat:.6f}" for lat, lon, _ in points)
+    timestamps = ";".join(str(int(ts)) for _, _, ts in points)
+    response = requests.get(
+        f"{OSRM_URL.rstrip('/')}/match/v1/driving/{coords}",
+        params={"timestamps": timestamps, "overview": "false", "tidy": "true"},
+        timeout=10,
+    )
+    response.raise_for_status()
+    tracepoints = response.json().get("tracepoints") or []
+    # Pontos sem correspondência (None) mantêm a posição original
+    return [
+        (tp["location"][1], tp["location"][0], ts) if tp else (lat, lon, ts)
+        for (lat, lon, ts), tp in zip(points, tracepoints)
+    ] if len(tracepoints) == len(points) else points
+
+
+async def map_match(points):
+    """Ajusta os pontos à malha viária; sem OSRM_URL (ou com falha no serviço) devolve os pontos originais."""
+    if not OSRM_URL or len(points) < 2:
+        return points, False
+    matched = []
+    try:
+        for i in range(0, len(points), OSRM_MAX_POINTS):
+            matched += await asyncio.to_thread(_osrm_match_chunk, points[i:i + OSRM_MAX_POINTS])
+    except Exception as exc:
+        logger.warning("map-matching indisponível: %r", exc)
+        return points, False
+    return matched, True
+
+
+# Persistência
+
+async def _raw_points(db: AsyncSession, vehicle_id: int, start: datetime, end: datetime):
+    H = models.LocationHistory
+    result = await db.execute(
+        select(H.latitude, H.longitude, func.extract("epoch", H.registrado_em))
+        .where(H.fk_id_veiculo == vehicle_id, H.registrado_em >= start, H.registrado_em < end)
+        .order_by(H.registrado_em)
+    )
+    return [(lat, lon, float(ts)) for lat, lon, ts in result.all()]
+
+
+async def compact(db: AsyncSession, now: datetime = None, tolerance_m: float = TOLERANCE_M) -> int:
+    """
+    Compacta o histórico bruto mais antigo que TRACK_RAW_RETENTION_HOURS em trechos de
+    TRACK_SEGMENT_HOURS por veículo e apaga as linhas brutas. Os pontos são lidos e
+    simplificados (e ajustados no OSRM, que pode levar segundos) fora de transação; a
+    escrita é uma transação curta por trecho, reservada com um advisory lock (veículo,
+    trecho): com vários workers, o que não consegue o lock pula o trecho, e se as linhas
+    brutas já não são as lidas (outro worker compactou o trecho) a transação é desfeita.
+    Retorna o número de trechos gravados.
+    """
+    H = models.LocationHistory
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=RAW_RETENTION_HOURS)
+    segment_s = int(SEGMENT_HOURS * 3600)
+    bucket = func.floor(func.extract("epoch", H.registrado_em) / segment_s)
+    result = await db.execute(
+        select(H.fk_id_veiculo, bucket).where(H.registrado_em < cutoff).group_by(H.fk_id_veiculo, bucket)
+    )
+    written = 0
+    for vehicle_id, bucket_index in result.all():
+        start = datetime.utcfromtimestamp(int(bucket_index) * segment_s)
+        end = min(start + timedelta(seconds=segment_s), cutoff)
+        await db.rollback()
+        raw = await _raw_points(db, vehicle_id, start, end)
+        await db.rollback()  # Nenhuma transação aberta durante a simplificação e o OSRM
+        if not raw:
+            continue
+        simplified = douglas_peucker(raw, tolerance_m)
+        simplified, matched = await map_match(simplified)
+
+        claimed = await db.scalar(select(func.pg_try_advisory_xact_lock(vehicle_id, int(bucket_index))))
+        if not claimed:
+            await db.rollback()
+            continue
+        deleted = await db.execute(
+            delete(H).where(H.fk_id_veiculo == vehicle_id, H.registrado_em >= start, H.registrado_em < end)
+        )
+        if deleted.rowcount != len(raw):
+            await db.rollback()
+            continue
+        db.add(models.CompactTrack(
+            fk_id_veiculo=vehicle_id,
+            inicio=datetime.utcfromtimestamp(raw[0][2]),
+            fim=datetime.utcfromtimestamp(raw[-1][2]),
+            pontos_originais=len(raw),
+            pontos=len(simplified),
+            tolerancia_m=tolerance_m,
+            map_matched=matched,
+            polyline=encode_polyline(simplified),
+            dados=encode_delta_varint(simplified),
+        ))
+        await db.commit()
+        written += 1
+    return written
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Converte datas com fuso para UTC sem fuso, como as colunas; datas sem fuso já são UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def get_track(db: AsyncSession, vehicle_id: int, start: datetime, end: datetime, tolerance_m: float = TOLERANCE_M):
+    """
+    Pontos (lat, lon, epoch) do veículo no intervalo: trechos já compactados mais o
+    histórico bruto recente, simplificado na hora com a mesma tolerância.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    T = models.CompactTrack
+    result = await db.execute(
+        select(T.dados).where(T.fk_id_veiculo == vehicle_id, T.fim >= start, T.inicio < end).order_by(T.inicio)
+    )
+    # Datas do banco são UTC sem fuso: converte como UTC, não como hora local
+    start_ts, end_ts = (d.replace(tzinfo=timezone.utc).timestamp() for d in (start, end))
+    points = [
+        p for (data,) in result.all() for p in decode_delta_varint(data)
+        if start_ts <= p[2] < end_ts
+    ]
+    raw = await _raw_points(db, vehicle_id, start, end)
+    return points + douglas_peucker(raw, tolerance_m)
+
+
+async def compacted_points_since(db: AsyncSession, since: datetime):
+    """(vehicle_id, lat, lon, epoch) de todos os trechos compactados desde `since` (perfis de velocidade do ETA)."""
+    T = models.CompactTrack
+    result = await db.execute(select(T.fk_id_veiculo, T.dados).where(T.fim >= since))
+    return [(vehicle_id, *p) for vehicle_id, data in result.all() for p in decode_delta_varint(data)]
@@ -0,0 +1,94 @@
+"""
+Worker da outbox: drena a tabela Outbox fora dos processos da API.
+
+    python worker.py                      # WORKER_CONCURRENCY=8, WORKER_POLL_SECONDS=1
+
+Pode rodar em várias réplicas: a reserva usa FOR UPDATE SKIP LOCKED e a compactação
+das trilhas reserva cada trecho com um advisory lock (services/track.py).
+SIGTERM/SIGINT param de buscar jobs e esperam os que estão em execução.
+"""
+import asyncio
+import logging
+import os
+import signal
+from database import async_sessionmaker, engine
+from services import invalidation, outbox, track
+
+CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", 8))
+POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", 1))
+PURGE_EVERY_SECONDS = 3600
+# Compactação do histórico de posições (services/track.py); 0 desliga
+TRACK_COMPACT_EVERY_SECONDS = float(os.getenv("TRACK_COMPACT_EVERY_SECONDS", 600))
+
+logger = logging.getLogger("worker")
+
+
+async def compact_tracks(stop: asyncio.Event):
+    """Compacta as trilhas a cada TRACK_COMPACT_EVERY_SECONDS, fora do laço dos jobs (chamadas ao OSRM demoram)."""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), TRACK_COMPACT_EVERY_SECONDS)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            async with async_sessionmaker() as db:
+                segments = await track.compact(db)
+            if segments:
+                logger.info("%s trechos de trilha compactados", segments)
+        except Exception:
+            logger.exception("falha ao compactar trilhas")
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Os handlers invalidam caches dos workers da API (ex.: ponto geocodificado)
+    invalidation_task = invalidation.start_listener()
+    compact_task = asyncio.create_task(compact_tracks(stop)) if TRACK_COMPACT_EVERY_SECONDS else None
+
+    # No máximo CONCURRENCY jobs simultâneos; só reserva o que consegue executar agora
+    running = set()
+    last_purge = loop.time()
+
+    logger.info("worker iniciado (concorrência %s)", CONCURRENCY)
+    while not stop.is_set():
+        if len(running) >= CONCURRENCY:
+            await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            continue
+
+        async with async_sessionmaker() as db:
+            jobs = await outbox.claim(db, CONCURRENCY - len(running))
+        for job in jobs:
+            task = asyncio.create_task(outbox.run_job(async_sessionmaker, job))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        if loop.time() - last_purge > PURGE_EVERY_SECONDS:
+            async with async_sessionmaker() as db:
+                await outbox.purge_done(db)
+            last_purge = loop.time()
+
+        if not jobs:
+            try:
+                await asyncio.wait_for(stop.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+    if compact_task:
+        # Um trecho interrompido no meio é desfeito pelo rollback e refeito na próxima execução
+        compact_task.cancel()
+        await asyncio.gather(compact_task, return_exceptions=True)
+    if invalidation_task:
+        invalidation_task.cancel()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(main())
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react'
 import { Map, useMapsLibrary, useMap } from '@vis.gl/react-google-maps'
+import { decodePolyline } from '@/lib/polyline'
 
 export interface Driver {
   id: number
@@ -44,6 +45,8 @@ export interface DeliveryDetails {
 
 interface DeliveryMapProps {
   delivery: DeliveryDetails
+  // Trilha percorrida pelo veículo (polyline de /vehicles/{id}/track)
+  track?: string
   routeIndex: number
   setRouteInfo: (
     routes: google.maps.DirectionsRoute[],
@@ -53,6 +56,7 @@ interface DeliveryMapProps {
 
 const DeliveryMapComponent: React.FC<DeliveryMapProps> = ({
   delivery,
+  track,
   routeIndex,
   setRouteInfo,
 }) => {
@@ -67,6 +71,7 @@ const DeliveryMapComponent: React.FC<DeliveryMapProps> = ({
         routeIndex={routeIndex}
         setRouteInfo={setRouteInfo}
       />
+      {track && <Track encoded={track} />}
     </Map>
   )
 }
@@ -146,4 +151,22 @@ const Directions: React.FC<DirectionsProps> = ({
   return null
 }
 
+const Track: React.FC<{ encoded: string }> = ({ encoded }) => {
+  const map = useMap()
+
+  useEffect(() => {
+    if (!map) return
+    const polyline = new google.maps.Polyline({
+      map,
+      path: decodePolyline(encoded),
+      strokeColor: '#2563eb',
+      strokeOpacity: 0.8,
+      strokeWeight: 4,
+    })
+    return () => polyline.setMap(null)
+  }, [map, encoded])
+
+  return null
+}
+
 export default DeliveryMapComponent
@@ -0,0 +1,26 @@
+// Decodifica uma Encoded Polyline (precisão 1e-5), formato das trilhas em /vehicles/{id}/track
+export function decodePolyline(encoded: string): google.maps.LatLngLiteral[] {
+  const points: google.maps.LatLngLiteral[] = []
+  let index = 0
+  let lat = 0
+  let lng = 0
+
+  const next = () => {
+    let result = 0
+    let shift = 0
+    let b: number
+    do {
+      b = encoded.charCodeAt(index++) - 63
+      result |= (b & 0x1f) << shift
+      shift += 5
+    } while (b >= 0x20)
+    return result & 1 ? ~(result >> 1) : result >> 1
+  }
+
+  while (index < encoded.length) {
+    lat += next()
+    lng += next()
+    points.push({ lat: lat / 1e5, lng: lng / 1e5 })
+  }
+  return points
+}
@@ -168,6 +168,7 @@ const RegisterProduct: React.FC = () => {
       await createDelivery({
         fk_id_produto: registeredProduct.id,
         fk_id_ponto_entrega: fk_id_ponto_distribuicao,
+        quantidade: data.quantidade_estoque,
       })
       navigate('/adm')
     } catch (error) {
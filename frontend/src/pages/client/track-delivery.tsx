@@ -1,12 +1,14 @@
-import React, { useState } from 'react'
+import React, { useEffect, useState } from 'react'
 import { Card } from '@/components/ui/card'
 import { Badge } from '@/components/ui/badge'
 import { Truck, User, Package, MapPin, Warehouse } from 'lucide-react'
 import DeliveryMap from '@/components/delivery-map'
 import { Button } from '@/components/ui/button'
+import { fetchVehicleTrack } from '@/services/api'
 
 const TrackDelivery: React.FC = () => {
   const [routeIndex, setRouteIndex] = useState(0)
+  const [track, setTrack] = useState<string>()
   const [routes, setRoutes] = useState<google.maps.DirectionsRoute[]>([])
   const [selectedRoute, setSelectedRoute] = useState<{
     summary: string
@@ -61,12 +63,26 @@ const TrackDelivery: React.FC = () => {
     },
   }
 
+  // Trilha já percorrida pelo veículo (compactada no servidor)
+  useEffect(() => {
+    let active = true
+    fetchVehicleTrack(delivery.vehicle.id)
+      .then((result) => {
+        if (active) setTrack(result.polyline)
+      })
+      .catch((error) => console.error(error))
+    return () => {
+      active = false
+    }
+  }, [delivery.vehicle.id])
+
   return (
     <div className="flex flex-col lg:flex-row min-h-screen bg-gray-100 px-8 gap-6">
       {/* Map Section */}
       <div className="w-full h-96 lg:h-auto max-h-screen flex-1 lg:sticky lg:top-0 lg:py-8">
         <DeliveryMap
           delivery={delivery}
+          track={track}
           routeIndex={routeIndex}
           setRouteInfo={setRouteInfo}
         />
@@ -2,6 +2,8 @@ import axios from 'axios'
 
 const API = axios.create({
   baseURL: 'http://localhost:8000',
+  // Envia o cookie de leitura no primário depois das escritas (réplicas de leitura)
+  withCredentials: true,
   headers: {
     Authorization: `Bearer ${localStorage.getItem('token')}`,
   },
@@ -55,6 +57,7 @@ export interface Delivery {
   fk_id_veiculo?: number
   fk_id_produto?: number
   fk_id_ponto_entrega?: number
+  quantidade?: number
   status: string
   is_delivered: boolean
   vehicle?: Vehicle
@@ -68,6 +71,7 @@ export interface Vehicle {
   placa: string
   modelo: string
   capacidade: number
+  carga?: number
   fk_id_localizacao?: number
   is_available: boolean
   drivers?: Driver[]
@@ -247,3 +251,61 @@ export const createDelivery = async (data: any): Promise<Delivery> => {
   const response = await API.post<Delivery>('/create_delivery', data)
   return response.data
 }
+
+// Trilha do veículo (simplificada e codificada como polyline)
+export interface VehicleTrack {
+  vehicle_id: number
+  start: string
+  end: string
+  points: number
+  polyline: string
+}
+
+export const fetchVehicleTrack = async (
+  vehicleId: number,
+  params?: { start?: string; end?: string; tolerance_m?: number }
+): Promise<VehicleTrack> => {
+  const response = await API.get<VehicleTrack>(`/vehicles/${vehicleId}/track`, {
+    params,
+  })
+  return response.data
+}
+
+// Sincronização do app do motorista: listas colunares com o que mudou desde `since`
+export interface ColumnarRows {
+  columns: string[]
+  rows: unknown[][]
+}
+
+export interface DriverSync {
+  version: number
+  full: boolean
+  has_more: boolean
+  vehicle: { id: number; placa: string; modelo: string; capacidade: number; is_available: boolean }
+  deliveries: ColumnarRows
+  routes: ColumnarRows
+  events: ColumnarRows
+}
+
+export const fetchDriverSync = async (since = 0): Promise<DriverSync> => {
+  // O navegador descomprime gzip/brotli de forma transparente
+  const response = await API.get<DriverSync>('/driver/sync', { params: { since } })
+  return response.data
+}
+
+export const columnarToObjects = <T = Record<string, unknown>>({ columns, rows }: ColumnarRows): T[] =>
+  rows.map((row) => Object.fromEntries(columns.map((column, i) => [column, row[i]])) as T)
+
+// Painel da frota: estado em memória do backend (capacidade, carga e posição por veículo)
+export type FleetStatus = 'idle' | 'loaded' | 'full' | 'unavailable'
+
+export interface FleetState {
+  built_seconds_ago: number | null
+  summary: { vehicles: number; capacity: number; load: number; utilization: number | null } & Record<FleetStatus, number>
+  vehicles: ColumnarRows
+}
+
+export const fetchFleetState = async (status?: FleetStatus): Promise<FleetState> => {
+  const response = await API.get<FleetState>('/fleet/state', { params: { status } })
+  return response.data
+}